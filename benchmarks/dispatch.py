@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+"""
+Microbenchmark of per-node handler dispatch of TranslateVisitor and
+ECMAVisitor on a generated 50k statements module.
+
+"before" measures the old name based lookup (string format plus
+getattr per node), "after" measures the class keyed dispatch tables.
+
+Usage: python benchmarks/dispatch.py [statements]
+"""
+
+import ast
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from cobra.base import parse
+from cobra.base import translate
+from cobra.compiler import ECMAVisitor
+from cobra.translator import TranslateVisitor
+
+
+def make_module(statements:int) -> str:
+    lines = []
+    for i in range(statements):
+        lines.append("var_{0} = (var_{0} + {1}) * 2".format(i % 100, i))
+    return "\n".join(lines)
+
+
+def walk_ecma(node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(child for child in node if child is not None)
+
+
+def translate_before(visitor, nodes):
+    for node in nodes:
+        name = node.__class__.__name__
+        getattr(visitor, "_enter_{}".format(name), None)
+        getattr(visitor, "_exit_{}".format(name), None)
+        getattr(visitor, "_translate_{}".format(name), None)
+
+
+def translate_after(visitor, nodes):
+    for node in nodes:
+        visitor._enter_table[node.__class__]
+        visitor._exit_table[node.__class__]
+        visitor._translate_table[node.__class__]
+
+
+def compile_before(visitor, nodes):
+    for node in nodes:
+        getattr(visitor, 'visit_%s' % node.__class__.__name__, visitor.generic_visit)
+
+
+def compile_after(visitor, nodes):
+    for node in nodes:
+        visitor._visit_table[node.__class__]
+
+
+def report(title, before, after, nodes, repeat=5):
+    before_time = min(timeit.repeat(lambda: before(nodes), number=1, repeat=repeat))
+    after_time = min(timeit.repeat(lambda: after(nodes), number=1, repeat=repeat))
+    print("{}: {} nodes".format(title, len(nodes)))
+    print("    before: {:8.1f} ns/node".format(before_time / len(nodes) * 1e9))
+    print("    after:  {:8.1f} ns/node".format(after_time / len(nodes) * 1e9))
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    python_tree = parse(make_module(statements))
+    python_nodes = list(ast.walk(python_tree))
+    ecma_nodes = list(walk_ecma(translate(python_tree, debug=False)))
+
+    translator = TranslateVisitor(debug=False)
+    report("TranslateVisitor",
+           lambda nodes: translate_before(translator, nodes),
+           lambda nodes: translate_after(translator, nodes),
+           python_nodes)
+
+    compiler = ECMAVisitor()
+    report("ECMAVisitor",
+           lambda nodes: compile_before(compiler, nodes),
+           lambda nodes: compile_after(compiler, nodes),
+           ecma_nodes)
+
+
+if __name__ == "__main__":
+    main()
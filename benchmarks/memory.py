@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+"""
+Memory benchmark of the ecma ast built by the translator for a
+generated module, measured with tracemalloc.
+
+"before" uses the same node classes with a per-instance __dict__
+(how nodes were defined before __slots__), "after" uses the slotted
+classes of cobra.ast.
+
+Usage: python benchmarks/memory.py [functions]
+"""
+
+import contextlib
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from cobra import ast as ecma_ast
+from cobra import optimizer
+from cobra import utils
+from cobra.ast import Node
+from cobra.base import parse
+from cobra.base import translate
+
+
+def make_module(functions:int) -> str:
+    lines = []
+    for i in range(functions):
+        lines.append("def function_{}(a, b):".format(i))
+        lines.append("    x = (a + b) * {}".format(i))
+        lines.append("    for item in b:")
+        lines.append("        console.log(item, x, 'value')")
+        lines.append("    return [x for x in a if x > {}]".format(i))
+    return "\n".join(lines)
+
+
+def count_nodes(node):
+    total = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ecma_ast.Node):
+            total += 1
+            stack.extend(node)
+    return total
+
+
+def without_slots(cls, replaced):
+    slots = cls.__dict__.get("__slots__", ())
+    attrs = {key: value for key, value in vars(cls).items()
+                if key not in slots and key not in ("__slots__", "__dict__", "__weakref__")}
+    bases = tuple(replaced.get(base, base) for base in cls.__bases__)
+    return type(cls.__name__, bases, attrs)
+
+
+@contextlib.contextmanager
+def dict_based_nodes():
+    """
+    Temporary replace node classes of cobra.ast with
+    copies of them without __slots__ (also on the class
+    keyed tables, so that both trees are the same).
+    """
+    classes = [value for value in vars(ecma_ast).values()
+                if isinstance(value, type) and issubclass(value, Node)]
+    classes.sort(key=lambda cls: len(cls.__mro__))
+
+    replaced = {}
+    for cls in classes:
+        replaced[cls] = without_slots(cls, replaced)
+        setattr(ecma_ast, cls.__name__, replaced[cls])
+    utils.SetOfNodes = ecma_ast.SetOfNodes
+
+    statement_lists = dict(optimizer.STATEMENT_LISTS)
+    for cls, field in statement_lists.items():
+        optimizer.STATEMENT_LISTS[replaced[cls]] = field
+
+    try:
+        yield
+    finally:
+        for cls in classes:
+            setattr(ecma_ast, cls.__name__, cls)
+        utils.SetOfNodes = ecma_ast.SetOfNodes
+
+        optimizer.STATEMENT_LISTS.clear()
+        optimizer.STATEMENT_LISTS.update(statement_lists)
+
+
+def measure(python_tree):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        ecma_tree = translate(python_tree, debug=False)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return count_nodes(ecma_tree), current, peak
+
+
+def report(title, nodes, current, peak):
+    print("{}: {} nodes".format(title, nodes))
+    print("    retained: {:10.1f} bytes/node".format(current / nodes))
+    print("    peak:     {:10.1f} MiB".format(peak / 1024 / 1024))
+
+
+def main():
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    python_tree = parse(make_module(functions))
+
+    with dict_based_nodes():
+        before = measure(python_tree)
+    after = measure(python_tree)
+
+    # Both runs must build the same tree to be comparable
+    assert before[0] == after[0], "node counts differ: {} != {}".format(before[0], after[0])
+
+    report("before (__dict__)", *before)
+    report("after (__slots__)", *after)
+
+
+if __name__ == "__main__":
+    main()
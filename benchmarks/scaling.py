@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+"""
+Translation time per assignment of a function with 1k and
+with 100k assignments. Constant time bookkeeping keeps it
+about the same; quadratic growth would be ~100x slower.
+
+Usage: python benchmarks/scaling.py [small] [large]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from cobra.base import parse
+from cobra.base import translate
+
+
+def make_function(statements:int) -> str:
+    return "def func():\n" + "\n".join("    var_{0} = {0}".format(i)
+                                       for i in range(statements))
+
+
+def translate_time(statements:int, repeat:int) -> float:
+    python_tree = parse(make_function(statements))
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        translate(python_tree, debug=False)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    small = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    large = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+
+    small_time = translate_time(small, repeat=3) / small
+    large_time = translate_time(large, repeat=1) / large
+    print("{:>8} assignments: {:8.2f} us/assignment".format(small, small_time * 1e6))
+    print("{:>8} assignments: {:8.2f} us/assignment".format(large, large_time * 1e6))
+    print("ratio: {:.2f}".format(large_time / small_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import functools
+
+from concurrent.futures import ThreadPoolExecutor
+
+from . import base
+
+
+DEFAULT_MAX_PENDING = 64
+
+
+class AsyncCompiler(object):
+    """
+    Compile python sources from asyncio code without blocking
+    the event loop.
+
+    Sources are compiled in executor (a thread or process pool
+    executor, by default a thread pool). Identical concurrent
+    requests (same source and options) are compiled only once
+    and at most max_pending compilations are submitted to the
+    executor at once; the other requests wait without blocking.
+
+    Cancelling a request does not affect other requests waiting
+    for the same compilation, and the compilation itself is
+    cancelled when no request waits for it anymore (a running
+    compilation can't be interrupted, but its result is dropped).
+    """
+
+    def __init__(self, executor=None, max_pending:int=DEFAULT_MAX_PENDING):
+        self.executor = ThreadPoolExecutor() if executor is None else executor
+        self.max_pending = max_pending
+        self._loop = None
+        self._semaphore = None
+        self._inflight = {}
+
+    def _bind(self, loop):
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+            self._inflight = {}
+
+    def _key(self, data:str, translate_options:dict, compile_options:dict) -> tuple:
+        return (data,
+                tuple(sorted(translate_options.items())),
+                tuple(sorted(compile_options.items())))
+
+    def _forget(self, key:tuple, task):
+        entry = self._inflight.get(key)
+        if entry is not None and entry[0] is task:
+            del self._inflight[key]
+
+    async def _run(self, data:str, translate_options:dict, compile_options:dict) -> str:
+        async with self._semaphore:
+            return await self._loop.run_in_executor(self.executor, base.compile, data,
+                                                    translate_options, compile_options)
+
+    async def compile(self, data:str, translate_options=None, compile_options=None) -> str:
+        translate_options = translate_options or {}
+        compile_options = compile_options or {}
+        self._bind(asyncio.get_event_loop())
+
+        key = self._key(data, translate_options, compile_options)
+        entry = self._inflight.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(self._run(data, translate_options, compile_options))
+            entry = self._inflight[key] = [task, 0]
+            task.add_done_callback(functools.partial(self._forget, key))
+
+        entry[1] += 1
+        try:
+            return await asyncio.shield(entry[0])
+        except asyncio.CancelledError:
+            if not entry[0].done() and entry[1] == 1:
+                self._forget(key, entry[0])
+                entry[0].cancel()
+            raise
+        finally:
+            entry[1] -= 1
+
+    async def compile_many(self, sources:list, translate_options=None, compile_options=None,
+                           return_exceptions=False) -> list:
+        return await asyncio.gather(*[self.compile(data, translate_options, compile_options)
+                                      for data in sources],
+                                    return_exceptions=return_exceptions)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+_default_compiler = None
+
+
+def _get_compiler(compiler=None) -> AsyncCompiler:
+    global _default_compiler
+
+    if compiler is not None:
+        return compiler
+
+    if _default_compiler is None:
+        _default_compiler = AsyncCompiler()
+    return _default_compiler
+
+
+async def compile_async(data:str, translate_options=None, compile_options=None,
+                        compiler:AsyncCompiler=None) -> str:
+    """
+    Given a string with python source code, returns
+    the compiled javascript code without blocking the
+    event loop (see AsyncCompiler).
+    """
+    compiler = _get_compiler(compiler)
+    return await compiler.compile(data, translate_options, compile_options)
+
+
+async def compile_many_async(sources:list, translate_options=None, compile_options=None,
+                             compiler:AsyncCompiler=None, return_exceptions=False) -> list:
+    """
+    Given a list of python sources, returns the list of
+    compiled javascript codes without blocking the event
+    loop (see AsyncCompiler).
+    """
+    compiler = _get_compiler(compiler)
+    return await compiler.compile_many(sources, translate_options, compile_options,
+                                       return_exceptions=return_exceptions)
@@ -26,16 +26,33 @@ __author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
 
 
 class Node(object):
+    __slots__ = ("_parens", "_mangle_candidate")
+
+    # Names of the attributes that holds child nodes, in
+    # source order. Each attribute holds a node, a list
+    # of nodes or None.
+    _fields = ()
+
+    # Constructor of the nodes holding a plain list of
+    # childs, the only ones with a _children_list slot.
     def __init__(self, children=None):
         self._children_list = [] if children is None else children
 
     def __iter__(self):
-        for child in self.children():
-            if child is not None:
-                yield child
+        for name in self._fields:
+            value = getattr(self, name)
+            if value is None:
+                continue
+
+            if type(value) is list:
+                for child in value:
+                    if child is not None:
+                        yield child
+            else:
+                yield value
 
     def children(self):
-        return self._children_list
+        return list(self)
 
     def to_ecma(self):
         # Can't import at module level as ecmavisitor depends
@@ -45,317 +62,324 @@ class Node(object):
         return visitor.visit(self)
 
 class SetOfNodes(Node):
-    pass
+    __slots__ = ("_children_list",)
+    _fields = ("_children_list",)
 
 class Program(Node):
-    pass
+    __slots__ = ("_children_list",)
+    _fields = ("_children_list",)
 
 class Block(Node):
-    pass
+    __slots__ = ("_children_list",)
+    _fields = ("_children_list",)
 
 class Boolean(Node):
+    __slots__ = ("value",)
+    _fields = ()
+
     def __init__(self, value):
         self.value = value
 
-    def children(self):
-        return []
-
 class Null(Node):
+    __slots__ = ("value",)
+    _fields = ()
+
     def __init__(self, value):
         self.value = value
 
-    def children(self):
-        return []
-
 class Number(Node):
+    __slots__ = ("value",)
+    _fields = ()
+
     def __init__(self, value):
         self.value = value
 
-    def children(self):
-        return []
-
 class Identifier(Node):
+    __slots__ = ("value",)
+    _fields = ()
+
     def __init__(self, value):
         self.value = value
 
-    def children(self):
-        return []
-
 class String(Node):
+    __slots__ = ("value",)
+    _fields = ()
+
     def __init__(self, value):
         self.value = value
 
-    def children(self):
-        return []
-
 class Regex(Node):
+    __slots__ = ("value",)
+    _fields = ()
+
     def __init__(self, value):
         self.value = value
 
-    def children(self):
-        return []
-
 class Array(Node):
+    __slots__ = ("items",)
+    _fields = ("items",)
+
     def __init__(self, items):
         self.items = items
 
-    def children(self):
-        return self.items
-
 class Object(Node):
+    __slots__ = ("properties",)
+    _fields = ("properties",)
+
     def __init__(self, properties=None):
         self.properties = [] if properties is None else properties
 
-    def children(self):
-        return self.properties
-
 class NewExpr(Node):
+    __slots__ = ("identifier", "args")
+    _fields = ("identifier", "args")
+
     def __init__(self, identifier, args=None):
         self.identifier = identifier
         self.args = [] if args is None else args
 
-    def children(self):
-        return [self.identifier, self.args]
-
 class FunctionCall(Node):
+    __slots__ = ("identifier", "args", "_comprehension")
+    _fields = ("identifier", "args")
+
     def __init__(self, identifier, args=None):
         self.identifier = identifier
         self.args = [] if args is None else args
 
-    def children(self):
-        return [self.identifier] + self.args
-
 class BracketAccessor(Node):
+    __slots__ = ("node", "expr")
+    _fields = ("node", "expr")
+
     def __init__(self, node, expr):
         self.node = node
         self.expr = expr
 
-    def children(self):
-        return [self.node, self.expr]
-
 class DotAccessor(Node):
+    __slots__ = ("node", "identifier")
+    _fields = ("node", "identifier")
+
     def __init__(self, node, identifier):
         self.node = node
         self.identifier = identifier
 
-    def children(self):
-        return [self.node, self.identifier]
-
 class Assign(Node):
+    __slots__ = ("op", "left", "right")
+    _fields = ("left", "right")
+
     def __init__(self, op, left, right):
         self.op = op
         self.left = left
         self.right = right
 
-    def children(self):
-        return [self.left, self.right]
-
 class GetPropAssign(Node):
+    __slots__ = ("prop_name", "elements")
+    _fields = ("prop_name", "elements")
+
     def __init__(self, prop_name, elements):
         """elements - function body"""
         self.prop_name = prop_name
         self.elements = elements
 
-    def children(self):
-        return [self.prop_name] + self.elements
-
 class SetPropAssign(Node):
+    __slots__ = ("prop_name", "parameters", "elements")
+    _fields = ("prop_name", "parameters", "elements")
+
     def __init__(self, prop_name, parameters, elements):
         """elements - function body"""
         self.prop_name = prop_name
         self.parameters = parameters
         self.elements = elements
 
-    def children(self):
-        return [self.prop_name] + self.parameters + self.elements
-
 class VarStatement(Node):
-    pass
+    __slots__ = ("_children_list",)
+    _fields = ("_children_list",)
 
 class VarDecl(Node):
+    __slots__ = ("identifier", "initializer")
+    _fields = ("identifier", "initializer")
+
     def __init__(self, identifier, initializer=None):
         self.identifier = identifier
         self.identifier._mangle_candidate = True
         self.initializer = initializer
 
-    def children(self):
-        return [self.identifier, self.initializer]
-
 class UnaryOp(Node):
+    __slots__ = ("op", "value", "postfix")
+    _fields = ("value",)
+
     def __init__(self, op, value, postfix=False):
         self.op = op
         self.value = value
         self.postfix = postfix
 
-    def children(self):
-        return [self.value]
-
 class BinOp(Node):
+    __slots__ = ("op", "left", "right")
+    _fields = ("left", "right")
+
     def __init__(self, op, left, right):
         self.op = op
         self.left = left
         self.right = right
 
-    def children(self):
-        return [self.left, self.right]
-
 class Conditional(Node):
     """Conditional Operator ( ? : )"""
+    __slots__ = ("predicate", "consequent", "alternative")
+    _fields = ("predicate", "consequent", "alternative")
+
     def __init__(self, predicate, consequent, alternative):
         self.predicate = predicate
         self.consequent = consequent
         self.alternative = alternative
 
-    def children(self):
-        return [self.predicate, self.consequent, self.alternative]
-
 class If(Node):
+    __slots__ = ("predicate", "consequent", "alternative")
+    _fields = ("predicate", "consequent", "alternative")
+
     def __init__(self, predicate, consequent, alternative=None):
         self.predicate = predicate
         self.consequent = consequent
         self.alternative = alternative
 
-    def children(self):
-        return [self.predicate, self.consequent, self.alternative]
-
 class DoWhile(Node):
+    __slots__ = ("predicate", "statement")
+    _fields = ("predicate", "statement")
+
     def __init__(self, predicate, statement):
         self.predicate = predicate
         self.statement = statement
 
-    def children(self):
-        return [self.predicate, self.statement]
-
 class While(Node):
+    __slots__ = ("predicate", "statement")
+    _fields = ("predicate", "statement")
+
     def __init__(self, predicate, statement):
         self.predicate = predicate
         self.statement = statement
 
-    def children(self):
-        return [self.predicate, self.statement]
-
 class For(Node):
+    __slots__ = ("init", "cond", "count", "statement")
+    _fields = ("init", "cond", "count", "statement")
+
     def __init__(self, init, cond, count, statement):
         self.init = init
         self.cond = cond
         self.count = count
         self.statement = statement
 
-    def children(self):
-        return [self.init, self.cond, self.count, self.statement]
-
 class ForIn(Node):
+    __slots__ = ("item", "iterable", "statement")
+    _fields = ("item", "iterable", "statement")
+
     def __init__(self, item, iterable, statement):
         self.item = item
         self.iterable = iterable
         self.statement = statement
 
-    def children(self):
-        return [self.item, self.iterable, self.statement]
-
 class Continue(Node):
+    __slots__ = ("identifier",)
+    _fields = ("identifier",)
+
     def __init__(self, identifier=None):
         self.identifier = identifier
 
-    def children(self):
-        return [self.identifier]
-
 class Break(Node):
+    __slots__ = ("identifier",)
+    _fields = ("identifier",)
+
     def __init__(self, identifier=None):
         self.identifier = identifier
 
-    def children(self):
-        return [self.identifier]
-
 class Return(Node):
+    __slots__ = ("expr",)
+    _fields = ("expr",)
+
     def __init__(self, expr=None):
         self.expr = expr
 
-    def children(self):
-        return [self.expr]
-
 class With(Node):
+    __slots__ = ("expr", "statement")
+    _fields = ("expr", "statement")
+
     def __init__(self, expr, statement):
         self.expr = expr
         self.statement = statement
 
-    def children(self):
-        return [self.expr, self.statement]
-
 class Switch(Node):
+    __slots__ = ("expr", "cases", "default")
+    _fields = ("expr", "cases", "default")
+
     def __init__(self, expr, cases, default=None):
         self.expr = expr
         self.cases = cases
         self.default = default
 
-    def children(self):
-        return [self.expr] + self.cases + [self.default]
-
 class Case(Node):
+    __slots__ = ("expr", "elements")
+    _fields = ("expr", "elements")
+
     def __init__(self, expr, elements):
         self.expr = expr
         self.elements = elements if elements is not None else []
 
-    def children(self):
-        return [self.expr] + self.elements
-
 class Default(Node):
+    __slots__ = ("elements",)
+    _fields = ("elements",)
+
     def __init__(self, elements):
         self.elements = elements if elements is not None else []
 
-    def children(self):
-        return self.elements
-
 class Label(Node):
+    __slots__ = ("identifier", "statement")
+    _fields = ("identifier", "statement")
+
     def __init__(self, identifier, statement):
         self.identifier = identifier
         self.statement = statement
 
-    def children(self):
-        return [self.identifier, self.statement]
-
 class Throw(Node):
+    __slots__ = ("expr",)
+    _fields = ("expr",)
+
     def __init__(self, expr):
         self.expr = expr
 
-    def children(self):
-        return [self.expr]
-
 class Try(Node):
+    __slots__ = ("statements", "catch", "fin")
+    _fields = ("statements", "catch", "fin")
+
     def __init__(self, statements, catch=None, fin=None):
         self.statements = statements
         self.catch = catch
         self.fin = fin
 
-    def children(self):
-        return [self.statements] + [self.catch, self.fin]
-
 class Catch(Node):
+    __slots__ = ("identifier", "elements")
+    _fields = ("identifier", "elements")
+
     def __init__(self, identifier, elements):
         self.identifier = identifier
         # CATCH identifiers are subject to name mangling. we need to mark them.
         self.identifier._mangle_candidate = True
         self.elements = elements
 
-    def children(self):
-        return [self.identifier, self.elements]
-
 class Finally(Node):
+    __slots__ = ("elements",)
+    _fields = ("elements",)
+
     def __init__(self, elements):
         self.elements = elements
 
-    def children(self):
-        return self.elements
-
 class Debugger(Node):
+    __slots__ = ("value",)
+    _fields = ()
+
     def __init__(self, value):
         self.value = value
 
-    def children(self):
-        return []
-
 
 class FuncBase(Node):
+    __slots__ = ("identifier", "parameters", "elements")
+    _fields = ("identifier", "parameters", "elements")
+
     def __init__(self, identifier, parameters, elements):
         self.identifier = identifier
         self.parameters = parameters if parameters is not None else []
@@ -370,49 +394,47 @@ class FuncBase(Node):
         for param in self.parameters:
             param._mangle_candidate = True
 
-    def children(self):
-        return [self.identifier] + self.parameters + self.elements
-
 class FuncDecl(FuncBase):
-    pass
+    __slots__ = ()
 
 # The only difference is that function expression might not have an identifier
 class FuncExpr(FuncBase):
-    pass
+    __slots__ = ("_identifier",)
 
 
 class Comma(Node):
+    __slots__ = ("left", "right")
+    _fields = ("left", "right")
+
     def __init__(self, left, right):
         self.left = left
         self.right = right
 
-    def children(self):
-        return [self.left, self.right]
-
 class EmptyStatement(Node):
+    __slots__ = ("value",)
+    _fields = ()
+
     def __init__(self, value):
         self.value = value
 
-    def children(self):
-        return []
-
 class ExprStatement(Node):
+    __slots__ = ("expr", "_func_expr", "_inline_statements")
+    _fields = ("expr",)
+
     def __init__(self, expr):
         self.expr = expr
 
-    def children(self):
-        return [self.expr]
-
 class Elision(Node):
+    __slots__ = ("value",)
+    _fields = ()
+
     def __init__(self, value):
         self.value = value
 
-    def children(self):
-        return []
-
 class This(Node):
+    __slots__ = ()
+    _fields = ()
+
     def __init__(self):
         pass
 
-    def children(self):
-        return []
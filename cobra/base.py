@@ -2,16 +2,46 @@
 
 import argparse
 import ast
+import collections
 import functools
 import io
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import queue
 import sys
+import threading
+
+from concurrent.futures import Future
 
 from . import ast as ecma_ast
+from . import cache as compile_cache
 from . import compiler
+from . import optimizer
+from . import parallel
+from . import stats as compile_stats
+from . import tracing
 from . import translator
 from . import utils
 
 
+class CompileError(RuntimeError):
+    """
+    Raised when one or more files fails to compile.
+
+    The ``errors`` attribute holds a list of (path, message)
+    tuples and ``output`` the compiled code of the files
+    that compiled successfully.
+    """
+
+    def __init__(self, errors:list, output=None):
+        self.errors = errors
+        self.output = output
+        super().__init__("\n".join("{}: {}".format(path, message)
+                                   for path, message in errors))
+
+
 def parse(data:str) -> object:
     """
     Given a string with python source code,
@@ -30,16 +60,65 @@ def translate(data:object, **kwargs) -> object:
     return translator.TranslateVisitor(**kwargs).translate(data)
 
 
-def compile(data:str, translate_options=None, compile_options=None) -> str:
+def compile(data:str, translate_options=None, compile_options=None, output=None,
+            cache=None, jobs=1, stats=False) -> str:
+    """
+    Given a string with python source code, returns
+    the compiled javascript code.
+
+    If output is specified (any text stream or a list),
+    the compiled code is written into it as it is
+    generated and nothing is returned.
+
+    If cache is specified (a cobra.cache.DiskCache or
+    cobra.cache.MemoryCache instance), the compiled code is
+    looked up on it before compile and stored on it after
+    compile.
+
+    With jobs greater than 1, chunks of top level statements
+    of big modules are translated in parallel by a pool of
+    processes (see cobra.parallel); the output is the same.
+
+    With stats, returns a tuple of the compiled code (None if
+    output is specified) and a json serializable dict with
+    timing, memory and node statistics of each stage (see
+    cobra.stats.CompileStats; stages run twice, timed and then
+    with memory tracing). Cache and jobs are not used.
+    """
+
     if translate_options is None:
         translate_options = {}
 
     if compile_options is None:
         compile_options = {}
 
+    if stats:
+        return _compile_with_stats(data, translate_options, compile_options, output)
+
+    if cache is not None:
+        key = cache.key(data, translate_options, compile_options)
+        result = cache.get(key)
+        if result is None:
+            result = compile(data, translate_options, compile_options, jobs=jobs)
+            cache.set(key, result)
+
+        if output is None:
+            return result
+
+        _write_chunk(output, result)
+        return
+
     # Normalize
     data = utils.normalize(data)
 
+    if jobs > 1:
+        result = parallel.compile_parallel(data, translate_options, compile_options, jobs=jobs)
+        if output is None:
+            return result
+
+        _write_chunk(output, result)
+        return
+
     # Parse python to ast
     python_tree = parse(data)
 
@@ -47,57 +126,724 @@ def compile(data:str, translate_options=None, compile_options=None) -> str:
     ecma_tree = translate(python_tree, **translate_options)
 
     # Compile js ast to js string
-    return compiler.ECMAVisitor(**compile_options).visit(ecma_tree)
+    visitor = compiler.ECMAVisitor(**compile_options)
+    if output is None:
+        return visitor.visit(ecma_tree)
+
+    visitor.write(ecma_tree, output)
+
+
+def _run_stages(stage, data:str, translate_options:dict, compile_options:dict, write,
+                optimized_nodes:dict) -> tuple:
+    """
+    Compile running each stage within the stage context
+    manager factory, returns the python and ecma trees.
+    """
+    with stage("normalize"):
+        data = utils.normalize(data)
+
+    with stage("parse"):
+        python_tree = parse(data)
+
+    with stage("translate"):
+        ecma_tree = translate(python_tree, **dict(translate_options, optimize=False))
+
+    if translate_options.get("optimize", False):
+        with stage("optimize"):
+            ecma_tree = optimizer.optimize(ecma_tree, optimized_nodes,
+                                           translate_options.get("module_as_closure", False))
+
+    with stage("emit"):
+        compiler.ECMAVisitor(**compile_options).write(ecma_tree, write)
+
+    return python_tree, ecma_tree
+
+
+def _compile_with_stats(data:str, translate_options:dict, compile_options:dict,
+                        output=None) -> tuple:
+    stats = compile_stats.CompileStats()
+
+    chunks = [] if output is None else output
+    writer = compile_stats.CountingWriter(functools.partial(_write_chunk, chunks))
+    python_tree, ecma_tree = _run_stages(stats.stage, data, translate_options, compile_options,
+                                         writer, stats.optimized_nodes)
+
+    # Peak memory is measured by a second run, memory tracing
+    # would distort the times of the first one.
+    _run_stages(stats.trace_memory, data, translate_options, compile_options,
+                compile_stats.CountingWriter(lambda chunk: None), {})
+
+    stats.output_bytes = writer.size
+    stats.count_python_nodes(python_tree)
+    stats.count_ecma_nodes(ecma_tree)
+
+    result = "".join(chunks) if output is None else None
+    return result, stats.as_dict()
 
 
 def _read_file(path:str):
     with io.open(path, "rt") as f:
         return f.read()
 
-def _compile_files(paths:list, join=False, translate_options=None, compile_options=None) -> str:
-    _compile = functools.partial(compile, translate_options=translate_options,
-                                compile_options=compile_options)
-    if join:
-        return _compile("\n".join(_read_file(path) for path in paths))
-    return "\n\n".join(_compile(_read_file(path)) for path in paths)
+def _write_chunk(output, chunk:str):
+    if isinstance(output, list):
+        output.append(chunk)
+    else:
+        output.write(chunk)
 
+def _format_error(error:Exception) -> str:
+    return "{}: {}".format(error.__class__.__name__, error)
 
-def main():
-    parser = argparse.ArgumentParser(prog="cobrascript",
-                                     description="Python to Javascript translator.")
-    parser.add_argument("files", metavar="input.py", type=str, nargs="+",
-                        help="A list of python files for translate.")
+
+def _compile_job(data:str, translate_options:dict, compile_options:dict) -> tuple:
+    """
+    Compile stage worker: compiles one source and returns a
+    tuple of compiled code and error message (one of them
+    is always None).
+    """
+    try:
+        return compile(data, translate_options, compile_options), None
+    except Exception as e:
+        return None, _format_error(e)
+
+
+def _iter_sources(paths:list, size:int):
+    """
+    Reader stage: reads files in a background thread, at most
+    size files ahead of the consumer, and yields (path, source,
+    error message) tuples in paths order.
+    """
+    sources = queue.Queue(maxsize=size)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                sources.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def reader():
+        for path in paths:
+            try:
+                item = (path, _read_file(path), None)
+            except Exception as e:
+                item = (path, None, _format_error(e))
+            if not put(item):
+                return
+        put(None)
+
+    thread = threading.Thread(target=reader, name="cobrascript-reader", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = sources.get()
+            if item is None:
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def _compile_worker(connection):
+    """
+    Compile worker process: runs the jobs received through
+    connection and sends back their results, until it
+    receives None.
+    """
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+
+        fn, args = job
+        connection.send(fn(*args))
+
+
+class _CompileWorkers(object):
+    """
+    Pool of compile worker processes.
+
+    Each worker has its own pipe and runs one job at a time,
+    so a worker that dies (os._exit, out of memory, segfault...)
+    fails only the job it was running and is replaced. A broken
+    ProcessPoolExecutor instead fails every job in flight, and
+    on python 3.6 it may deadlock on its queue locks.
+
+    Jobs are dispatched to the workers on submit and while
+    waiting for a result (see wait).
+    """
+
+    def __init__(self, max_workers:int):
+        self.max_workers = max_workers
+        self._idle = []
+        self._busy = {}
+        self._queue = collections.deque()
+
+    def submit(self, fn, *args) -> Future:
+        future = Future()
+        self._queue.append((future, fn, args))
+        self._dispatch()
+        return future
+
+    def _dispatch(self):
+        while self._queue and (self._idle or len(self._busy) < self.max_workers):
+            if self._idle:
+                connection, process = self._idle.pop()
+            else:
+                connection, child_connection = multiprocessing.Pipe()
+                process = multiprocessing.Process(target=_compile_worker, args=(child_connection,),
+                                                  daemon=True)
+                process.start()
+                child_connection.close()
+
+            future, fn, args = self._queue.popleft()
+            try:
+                connection.send((fn, args))
+            except OSError:
+                # The worker died while idle, the job is sent to a new one
+                self._queue.appendleft((future, fn, args))
+                self._close_worker(connection, process)
+                continue
+
+            self._busy[connection] = (process, future)
+
+    def _close_worker(self, connection, process):
+        connection.close()
+        process.join()
+
+    def _collect(self, connection):
+        process, future = self._busy.pop(connection)
+        try:
+            result = connection.recv()
+        except (EOFError, OSError):
+            self._close_worker(connection, process)
+            future.set_exception(RuntimeError("compile worker exited with code {}"
+                                              .format(process.exitcode)))
+        else:
+            self._idle.append((connection, process))
+            future.set_result(result)
+
+    def wait(self, future:Future):
+        """
+        Run the workers until future is done.
+        """
+        while not future.done():
+            waitables = {}
+            for connection, (process, _) in self._busy.items():
+                waitables[connection] = connection
+                waitables[process.sentinel] = connection
+
+            for ready in multiprocessing.connection.wait(list(waitables)):
+                connection = waitables[ready]
+                if connection in self._busy:
+                    self._collect(connection)
+            self._dispatch()
+
+    def shutdown(self):
+        workers = list(self._idle)
+        for connection, process in self._idle:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+        for connection, (process, _) in self._busy.items():
+            process.terminate()
+            workers.append((connection, process))
+
+        for connection, process in workers:
+            self._close_worker(connection, process)
+        self._idle, self._busy = [], {}
+
+
+def _submit_compile_job(executor, path:str, data:str, error:str, translate_options:dict,
+                        compile_options:dict, cache=None) -> tuple:
+    key = None
+    future = Future()
+
+    if error is not None:
+        future.set_result((None, error))
+    elif cache is not None:
+        key = cache.key(data, translate_options, compile_options)
+        result = cache.get(key)
+        if result is not None:
+            key = None
+            future.set_result((result, None))
+
+    if not future.done():
+        future = executor.submit(_compile_job, data, translate_options, compile_options)
+    return path, future, key
+
+
+def _collect_compile_job(path:str, future:Future, key, cache=None) -> tuple:
+    try:
+        result, error = future.result()
+    except Exception as e:
+        result, error = None, _format_error(e)
+
+    if key is not None and result is not None:
+        cache.set(key, result)
+    return path, result, error
+
+
+def _iter_compiled(sources, jobs:int=1, translate_options=None, compile_options=None,
+                   cache=None, window:int=None):
+    """
+    Compile stage: compiles (path, source, error message) tuples
+    and yields (path, compiled code, error message) tuples in
+    the same order.
+
+    With jobs greater than 1, sources are compiled by a pool of
+    processes with at most window sources in flight (see
+    _CompileWorkers).
+    """
+    if jobs <= 1:
+        for path, data, error in sources:
+            result = None
+            if error is None:
+                try:
+                    result = compile(data, translate_options, compile_options, cache=cache)
+                except Exception as e:
+                    error = _format_error(e)
+            yield path, result, error
+        return
+
+    if window is None:
+        window = jobs * 2
+
+    workers = _CompileWorkers(jobs)
+    try:
+        pending = collections.deque()
+        for path, data, error in sources:
+            pending.append(_submit_compile_job(workers, path, data, error, translate_options,
+                                               compile_options, cache))
+            if len(pending) >= window:
+                path, future, key = pending.popleft()
+                workers.wait(future)
+                yield _collect_compile_job(path, future, key, cache)
+
+        while pending:
+            path, future, key = pending.popleft()
+            workers.wait(future)
+            yield _collect_compile_job(path, future, key, cache)
+    finally:
+        workers.shutdown()
+
+
+def _write_compiled(compiled, output=None) -> str:
+    """
+    Writer stage: writes compiled code into output in order, as
+    soon as it is available. Failing files are skipped and raised
+    together at the end with a CompileError.
+    """
+    chunks = [] if output is None else output
+    flush = getattr(output, "flush", None)
+    errors = []
+    written = False
+
+    for path, result, error in compiled:
+        if error is not None:
+            errors.append((path, error))
+            continue
+
+        if written:
+            _write_chunk(chunks, "\n\n")
+        _write_chunk(chunks, result)
+        written = True
+
+        if flush is not None:
+            flush()
+
+    result = "".join(chunks) if output is None else None
+    if errors:
+        raise CompileError(errors, result)
+    return result
+
+
+def _compile_files(paths:list, join=False, translate_options=None, compile_options=None,
+                   output=None, cache=None, jobs=1) -> str:
+    """
+    Given a list of python file paths, returns the compiled
+    javascript code of all of them (or writes it into output).
+
+    Files are processed as a bounded pipeline: a reader thread
+    reads ahead a few files, the compile stage compiles them
+    (with jobs greater than 1 in a pool of processes) and the
+    output of each file is written as soon as it and all the
+    previous ones are compiled. The output does not depend on
+    jobs. Failing files are reported together at the end with a
+    CompileError instead of stopping the remaining files.
+    """
+    if join or len(paths) == 1:
+        _compile = functools.partial(compile, translate_options=translate_options,
+                                     compile_options=compile_options, cache=cache, jobs=jobs)
+        return _compile("\n".join(_read_file(path) for path in paths), output=output)
+
+    window = max(jobs, 1) * 2
+    sources = _iter_sources(paths, window)
+    compiled = _iter_compiled(sources, jobs, translate_options, compile_options,
+                              cache=cache, window=window)
+    try:
+        return _write_compiled(compiled, output)
+    finally:
+        compiled.close()
+        sources.close()
+
+
+def _iter_python_files(path:str):
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith(".py"):
+                yield os.path.join(dirpath, filename)
+
+
+def _add_compile_arguments(parser):
     parser.add_argument("-g", "--debug", action="store_true", default=False,
                         help="Activate debug mode (only for developers).")
-    parser.add_argument("-w", "--warnings", action="store_true", default=False,
-                        help="Show static analizer warnings.")
-    parser.add_argument("-o", "--output", action="store", type=str, metavar="outputfile.js",
-                        help="Set output file (by default is stdout).")
     parser.add_argument("-b", "--bare", action="store_true", default=False,
                         help="Compile without a toplevel closure.")
-    parser.add_argument("-j", "--join", action="store_true", default=False,
-                        help="Join python files before compile.")
     parser.add_argument("--indent", action="store", type=int, default=4,
                         help="Set default output indentation level.")
     parser.add_argument("--auto-camelcase", action="store_true", default=False,
                         dest="auto_camelcase", help="Convert all identifiers to camel case.")
+    parser.add_argument("-O", "--optimize", action="store_true", default=False,
+                        help="Optimize output (fold constant expressions).")
 
-    parsed = parser.parse_args()
 
-    reader_join = True if parsed.join else False
+def _add_cache_arguments(parser):
+    parser.add_argument("--cache-dir", action="store", type=str, dest="cache_dir",
+                        default=os.environ.get("COBRASCRIPT_CACHE_DIR"),
+                        help="Set compile cache directory (by default $COBRASCRIPT_CACHE_DIR).")
+    parser.add_argument("--cache-size", action="store", type=int, dest="cache_size",
+                        default=compile_cache.DEFAULT_MAX_SIZE,
+                        help="Set compile cache size limit in bytes.")
+
+
+def _get_options(parsed):
     translate_options = {"module_as_closure": not parsed.bare,
                          "debug": parsed.debug,
-                         "auto_camelcase": parsed.auto_camelcase}
+                         "auto_camelcase": parsed.auto_camelcase,
+                         "optimize": parsed.optimize}
     compile_options = {"indent_chars": int(parsed.indent/2)}
+    return translate_options, compile_options
+
+
+def _get_cache(parsed):
+    if getattr(parsed, "no_cache", False) or not parsed.cache_dir:
+        return None
+    return compile_cache.DiskCache(parsed.cache_dir, max_size=parsed.cache_size)
+
+
+def cache_main(argv:list) -> int:
+    parser = argparse.ArgumentParser(prog="cobrascript cache",
+                                     description="Manage the compile cache.")
+    parser.add_argument("command", choices=["stats", "clear", "warm"],
+                        help="Show cache stats, remove all entries or compile "
+                             "all python files of a directory into the cache.")
+    parser.add_argument("directory", nargs="?", type=str,
+                        help="Directory to warm the cache from.")
+    _add_cache_arguments(parser)
+    _add_compile_arguments(parser)
+
+    parsed = parser.parse_args(argv)
+    cache = _get_cache(parsed)
+    if cache is None:
+        parser.error("cache directory is not set (use --cache-dir)")
+
+    if parsed.command == "stats":
+        for key, value in sorted(cache.stats().items()):
+            print("{}: {}".format(key, value))
+
+    elif parsed.command == "clear":
+        cache.clear()
+
+    elif parsed.command == "warm":
+        if parsed.directory is None:
+            parser.error("warm requires a directory")
+
+        translate_options, compile_options = _get_options(parsed)
+        for path in _iter_python_files(parsed.directory):
+            compile(_read_file(path), translate_options, compile_options, cache=cache)
+        print("warmed: {} compiled, {} cached".format(cache.misses, cache.hits))
+
+    return 0
+
+
+def _report_errors(error:CompileError):
+    for path, message in error.errors:
+        sys.stderr.write("{}: {}\n".format(path, message))
+
+
+def _run_compile(_compile, output) -> int:
+    status = 0
+    try:
+        _compile(output=output)
+    except CompileError as e:
+        _report_errors(e)
+        status = 1
+
+    output.write("\n")
+    return status
+
+
+def _run_stats(parsed, translate_options:dict, compile_options:dict, output) -> int:
+    if parsed.join:
+        sources = [(", ".join(parsed.files), lambda: "\n".join(map(_read_file, parsed.files)))]
+    else:
+        sources = [(path, functools.partial(_read_file, path)) for path in parsed.files]
+
+    files = []
+    errors = []
+    for path, read in sources:
+        chunks = []
+        try:
+            result, stats = compile(read(), translate_options, compile_options,
+                                    output=chunks, stats=True)
+        except Exception as e:
+            errors.append((path, _format_error(e)))
+            continue
+
+        if files:
+            output.write("\n\n")
+        output.write("".join(chunks))
+        files.append(dict(stats, path=path))
+
+    output.write("\n")
+    sys.stderr.write(json.dumps({"files": files}, indent=2) + "\n")
+
+    if errors:
+        _report_errors(CompileError(errors))
+        return 1
+    return 0
+
+
+def _run_build(parsed, translate_options:dict, compile_options:dict) -> int:
+    # Can't import at module level as cobra.build
+    # depends on this module.
+    from . import build
+
+    try:
+        stats = build.build(parsed.files, parsed.outdir, translate_options, compile_options,
+                            cache=_get_cache(parsed), jobs=parsed.jobs)
+    except CompileError as e:
+        _report_errors(e)
+        return 1
+
+    print("compiled: {compiled}, written: {written}, unchanged: {unchanged}, "
+          "skipped: {skipped}".format(**stats))
+    return 0
+
+
+def serve_main(argv:list) -> int:
+    # Can't import at module level as cobra.server
+    # depends on this module.
+    from . import server
+
+    parser = argparse.ArgumentParser(prog="cobrascript serve",
+                                     description="Run a compile server.")
+    parser.add_argument("--socket", action="store", type=str, required=True, metavar="PATH",
+                        help="Unix domain socket path to listen on.")
+    parser.add_argument("--jobs", action="store", type=int, default=None, metavar="N",
+                        help="Number of compile worker processes (by default cpu count).")
+    parser.add_argument("--timeout", action="store", type=float, default=server.DEFAULT_TIMEOUT,
+                        help="Set the time limit of a request in seconds.")
+    parser.add_argument("--max-size", action="store", type=int, dest="max_size",
+                        default=server.DEFAULT_MAX_SIZE,
+                        help="Set the size limit of a request in bytes.")
+    parser.add_argument("--metrics", action="store_true", default=False,
+                        help="Show metrics of the running server and exit.")
+
+    parsed = parser.parse_args(argv)
+
+    if parsed.metrics:
+        with server.Client(parsed.socket) as client:
+            for key, value in sorted(client.metrics().items()):
+                print("{}: {}".format(key, value))
+        return 0
+
+    try:
+        server.serve(parsed.socket, jobs=parsed.jobs, timeout=parsed.timeout,
+                     max_size=parsed.max_size)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _run_client(parsed, translate_options:dict, compile_options:dict, output) -> int:
+    # Can't import at module level as cobra.server
+    # depends on this module.
+    from . import server
+
+    def compiled(client):
+        for path in parsed.files:
+            try:
+                response = client.compile(_read_file(path), translate_options,
+                                          compile_options)
+            except OSError as e:
+                yield path, None, _format_error(e)
+            else:
+                yield path, response["output"], response["error"]
+
+    with server.Client(parsed.socket) as client:
+        return _run_compile(functools.partial(_write_compiled, compiled(client)), output)
+
+
+def _run_watch(parsed, translate_options:dict, compile_options:dict) -> int:
+    # Can't import at module level as cobra.build and
+    # cobra.watch depend on this module.
+    from . import build
+    from . import watch
+
+    cache = _get_cache(parsed)
+
+    if parsed.outdir:
+        watcher = watch.Watcher([])
+
+        def poll():
+            watcher.paths = build.get_sources(parsed.files)[1]
+            return watcher.poll()
+
+        def rebuild(changed):
+            try:
+                build.build(parsed.files, parsed.outdir, translate_options, compile_options,
+                            cache=cache, jobs=parsed.jobs)
+            except CompileError as e:
+                _report_errors(e)
+    else:
+        watcher = watch.Watcher(parsed.files, parsed.join, translate_options,
+                                compile_options, cache=cache)
+        poll = watcher.poll
+
+        def rebuild(changed):
+            watcher.update(changed)
+            output = watcher.output() + "\n"
+            _report_errors(CompileError(sorted(watcher.errors.items())))
+
+            if parsed.output:
+                build.write_atomic(parsed.output, output)
+            else:
+                sys.stdout.write(output)
+                sys.stdout.flush()
+
+    try:
+        watch.watch(poll, rebuild)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
 
-    compiled_data = _compile_files(parsed.files, join=reader_join,
-                                   translate_options=translate_options,
-                                   compile_options=compile_options)
+def main(argv:list=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    if argv and argv[0] == "cache":
+        return cache_main(argv[1:])
+
+    if argv and argv[0] == "serve":
+        return serve_main(argv[1:])
+
+    parser = argparse.ArgumentParser(prog="cobrascript",
+                                     description="Python to Javascript translator.")
+    parser.add_argument("files", metavar="input.py", type=str, nargs="*",
+                        help="A list of python files for translate "
+                             "(or directories with --outdir).")
+    parser.add_argument("-w", "--warnings", action="store_true", default=False,
+                        help="Show static analizer warnings.")
+    parser.add_argument("-o", "--output", action="store", type=str, metavar="outputfile.js",
+                        help="Set output file (by default is stdout).")
+    parser.add_argument("--outdir", action="store", type=str, metavar="DIR",
+                        help="Compile each file into DIR mirroring the input tree, "
+                             "skipping unchanged files.")
+    parser.add_argument("--stats", action="store_true", default=False,
+                        help="Write json timing, memory and node statistics of each "
+                             "compiled file into stderr.")
+    parser.add_argument("--trace", action="store", type=str, metavar="trace.json",
+                        help="Write a chrome trace event file of the translation.")
+    parser.add_argument("--batch", action="store_true", default=False,
+                        help="Read json line compile jobs from stdin and write "
+                             "the results into stdout.")
+    parser.add_argument("--socket", action="store", type=str, metavar="PATH",
+                        help="Compile files using the compile server listening on PATH.")
+    parser.add_argument("--watch", action="store_true", default=False,
+                        help="Watch input files and recompile them when they change.")
+    parser.add_argument("-j", "--join", action="store_true", default=False,
+                        help="Join python files before compile.")
+    parser.add_argument("--jobs", action="store", type=int, default=1, metavar="N",
+                        help="Compile files (or chunks of a single or joined module) "
+                             "in parallel using N processes.")
+    parser.add_argument("--no-cache", action="store_true", default=False,
+                        dest="no_cache", help="Do not use the compile cache.")
+    _add_compile_arguments(parser)
+    _add_cache_arguments(parser)
+
+    parsed = parser.parse_args(argv)
+    if not parsed.files and not parsed.batch:
+        parser.error("the following arguments are required: input.py")
+    if parsed.outdir and (parsed.output or parsed.join):
+        parser.error("--outdir can not be used with --output or --join")
+    if parsed.socket and (parsed.outdir or parsed.join or parsed.watch):
+        parser.error("--socket can not be used with --outdir, --join or --watch")
+    if parsed.stats and (parsed.outdir or parsed.watch or parsed.socket or parsed.batch):
+        parser.error("--stats can not be used with --outdir, --watch, --socket or --batch")
+    if parsed.trace and (parsed.stats or parsed.outdir or parsed.watch or parsed.socket
+                         or parsed.batch):
+        parser.error("--trace can not be used with --stats, --outdir, --watch, --socket "
+                     "or --batch")
+
+    reader_join = True if parsed.join else False
+    translate_options, compile_options = _get_options(parsed)
+
+    if parsed.batch:
+        # Can't import at module level as cobra.batch
+        # depends on this module.
+        from . import batch
+        cache = _get_cache(parsed)
+        failed = batch.run(sys.stdin, sys.stdout, translate_options, compile_options,
+                           cache=cache if cache is not None else compile_cache.MemoryCache())
+        return 1 if failed else 0
+
+    if parsed.watch:
+        return _run_watch(parsed, translate_options, compile_options)
+
+    if parsed.stats:
+        if parsed.output:
+            with io.open(parsed.output, "wt") as f:
+                return _run_stats(parsed, translate_options, compile_options, f)
+        return _run_stats(parsed, translate_options, compile_options, sys.stdout)
+
+    if parsed.socket:
+        if parsed.output:
+            with io.open(parsed.output, "wt") as f:
+                return _run_client(parsed, translate_options, compile_options, f)
+        return _run_client(parsed, translate_options, compile_options, sys.stdout)
+
+    if parsed.outdir:
+        return _run_build(parsed, translate_options, compile_options)
+
+    # Tracing needs all the translation in this process
+    tracer = None
+    if parsed.trace:
+        tracer = translate_options["tracer"] = tracing.ChromeTracer()
+
+    _compile = functools.partial(_compile_files, parsed.files, join=reader_join,
+                                 translate_options=translate_options,
+                                 compile_options=compile_options,
+                                 cache=None if tracer else _get_cache(parsed),
+                                 jobs=1 if tracer else parsed.jobs)
 
     if parsed.output:
         with io.open(parsed.output, "wt") as f:
-            print(compiled_data, file=f)
+            status = _run_compile(_compile, f)
     else:
-        print(compiled_data, file=sys.stdout)
+        status = _run_compile(_compile, sys.stdout)
 
-    return 0
+    if tracer is not None:
+        tracer.dump(parsed.trace)
+
+    return status
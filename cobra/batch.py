@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import json
+import sys
+import time
+
+from . import base
+from . import cache as compile_cache
+
+
+def _diagnostic(error:Exception) -> dict:
+    diagnostic = {"level": "error",
+                  "type": error.__class__.__name__,
+                  "message": str(error)}
+
+    if isinstance(error, SyntaxError):
+        diagnostic["message"] = error.msg
+        diagnostic["line"] = error.lineno
+        diagnostic["column"] = error.offset
+    return diagnostic
+
+
+def run_job(job:dict, translate_options=None, compile_options=None, cache=None) -> dict:
+    """
+    Given a batch job, returns its result.
+
+    A job is a dict with an ``id``, a ``path`` or an inline
+    ``source`` and optional ``translate_options`` and
+    ``compile_options`` (that override the given defaults).
+    The result has the job ``id``, the compiled ``output``
+    (None on errors), a list of ``diagnostics`` and the
+    ``time`` in seconds.
+    """
+    started_at = time.perf_counter()
+    result = {"id": job.get("id"), "output": None, "diagnostics": []}
+
+    try:
+        options = dict(translate_options or {})
+        options.update(job.get("translate_options") or {})
+        job_compile_options = dict(compile_options or {})
+        job_compile_options.update(job.get("compile_options") or {})
+
+        if "source" in job:
+            data = job["source"]
+        elif "path" in job:
+            data = base._read_file(job["path"])
+        else:
+            raise ValueError("job without source or path")
+
+        result["output"] = base.compile(data, options, job_compile_options, cache=cache)
+    except Exception as e:
+        result["diagnostics"].append(_diagnostic(e))
+
+    result["time"] = time.perf_counter() - started_at
+    return result
+
+
+def run(input, output, translate_options=None, compile_options=None, cache=None) -> int:
+    """
+    Read json line jobs from input and write one json line
+    result per job into output, in the same order.
+
+    Returns the number of failed jobs.
+    """
+    if cache is None:
+        cache = compile_cache.MemoryCache()
+
+    failed = 0
+    for line in input:
+        if not line.strip():
+            continue
+
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError("job must be a json object")
+        except ValueError as e:
+            result = {"id": None, "output": None, "diagnostics": [_diagnostic(e)], "time": 0}
+        else:
+            # Keep debug prints of the translator out of results stream.
+            with contextlib.redirect_stdout(sys.stderr):
+                result = run_job(job, translate_options, compile_options, cache)
+
+        failed += 1 if result["output"] is None else 0
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+
+    return failed
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+from . import __version__
+from . import base
+
+
+MANIFEST_NAME = ".cobrascript-manifest.json"
+
+
+def hash_text(data:str) -> str:
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def hash_options(translate_options=None, compile_options=None) -> str:
+    return hash_text(json.dumps([__version__, translate_options or {}, compile_options or {}],
+                                sort_keys=True))
+
+
+def write_atomic(path:str, data:str) -> bool:
+    """
+    Write data into path replacing it atomically. If path
+    already has the same content, it is left untouched.
+
+    Returns True if the file has been written.
+    """
+    try:
+        with io.open(path, "rt", encoding="utf-8", newline="") as f:
+            if f.read() == data:
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+
+    dirname = os.path.dirname(path) or "."
+    os.makedirs(dirname, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dirname, suffix=".tmp")
+    try:
+        with io.open(fd, "wt", encoding="utf-8", newline="") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return True
+
+
+class Manifest(object):
+    """
+    Build manifest of an output directory.
+
+    Maps each output file name (relative to the output
+    directory) to the source path, the source hash, the
+    options hash and the output hash, size and mtime of
+    its last build.
+    """
+
+    def __init__(self, path:str):
+        self.path = path
+        self.entries = {}
+
+        try:
+            with io.open(path, "rt", encoding="utf-8") as f:
+                self.entries = json.load(f).get("files", {})
+        except (OSError, ValueError):
+            pass
+
+    def is_fresh(self, name:str, source_hash:str, options_hash:str, output_path:str) -> bool:
+        entry = self.entries.get(name)
+        if (entry is None or entry["source_hash"] != source_hash or
+                entry["options_hash"] != options_hash):
+            return False
+
+        try:
+            stat = os.stat(output_path)
+        except OSError:
+            return False
+
+        if (stat.st_size, stat.st_mtime_ns) == (entry.get("output_size"),
+                                                entry.get("output_mtime_ns")):
+            return True
+
+        # The output has been touched since the build, it
+        # is fresh only if its content did not change.
+        try:
+            with io.open(output_path, "rt", encoding="utf-8", newline="") as f:
+                return hash_text(f.read()) == entry["output_hash"]
+        except (OSError, UnicodeDecodeError):
+            return False
+
+    def set(self, name:str, source:str, source_hash:str, options_hash:str, output:str,
+            output_path:str):
+        stat = os.stat(output_path)
+        self.entries[name] = {"source": source,
+                              "source_hash": source_hash,
+                              "options_hash": options_hash,
+                              "output_hash": hash_text(output),
+                              "output_size": stat.st_size,
+                              "output_mtime_ns": stat.st_mtime_ns}
+
+    def save(self):
+        data = json.dumps({"version": __version__, "files": self.entries},
+                          sort_keys=True, indent=2)
+        write_atomic(self.path, data + "\n")
+
+
+def get_sources(paths:list) -> tuple:
+    """
+    Given a list of python files and directories, returns
+    the root directory of them and the list of python files
+    (directories are expanded recursively).
+    """
+    files = []
+    roots = []
+    for path in paths:
+        if os.path.isdir(path):
+            roots.append(path)
+            files.extend(base._iter_python_files(path))
+        else:
+            roots.append(os.path.dirname(path) or ".")
+            files.append(path)
+
+    root = os.path.commonpath([os.path.abspath(root) for root in roots]) if roots else "."
+    return root, files
+
+
+def get_output_name(path:str, root:str) -> str:
+    name = os.path.relpath(os.path.abspath(path), root)
+    return os.path.splitext(name)[0] + ".js"
+
+
+def build(paths:list, outdir:str, translate_options=None, compile_options=None,
+          cache=None, jobs=1) -> dict:
+    """
+    Compile python files and directories into outdir, mirroring
+    the input tree with one ``.js`` file per python file.
+
+    Files whose source and options did not change since the last
+    build (according to the manifest of outdir) are skipped, and
+    output files whose content did not change are not touched.
+
+    Returns a dict with the number of files compiled, written,
+    unchanged (compiled with identical output) and skipped.
+    Failing files are raised together with a CompileError after
+    all the others are built.
+    """
+
+    root, files = get_sources(paths)
+    manifest = Manifest(os.path.join(outdir, MANIFEST_NAME))
+    options_hash = hash_options(translate_options, compile_options)
+    stats = {"compiled": 0, "written": 0, "unchanged": 0, "skipped": 0}
+    pending = {}
+
+    def dirty_sources(sources):
+        for path, data, error in sources:
+            name = get_output_name(path, root)
+            if error is None:
+                source_hash = hash_text(data)
+                if manifest.is_fresh(name, source_hash, options_hash,
+                                     os.path.join(outdir, name)):
+                    stats["skipped"] += 1
+                    continue
+                pending[path] = (name, source_hash)
+            yield path, data, error
+
+    window = max(jobs, 1) * 2
+    sources = base._iter_sources(files, window)
+    compiled = base._iter_compiled(dirty_sources(sources), jobs, translate_options,
+                                   compile_options, cache=cache, window=window)
+    errors = []
+
+    try:
+        for path, result, error in compiled:
+            name = get_output_name(path, root)
+            if error is not None:
+                manifest.entries.pop(name, None)
+                errors.append((path, error))
+                continue
+
+            name, source_hash = pending.pop(path)
+            output = result + "\n"
+
+            output_path = os.path.join(outdir, name)
+            stats["compiled"] += 1
+            if write_atomic(output_path, output):
+                stats["written"] += 1
+            else:
+                stats["unchanged"] += 1
+
+            manifest.set(name, os.path.relpath(os.path.abspath(path), root), source_hash,
+                         options_hash, output, output_path)
+    finally:
+        compiled.close()
+        sources.close()
+        manifest.save()
+
+    if errors:
+        raise base.CompileError(errors)
+    return stats
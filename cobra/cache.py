@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import zlib
+
+from collections import OrderedDict
+
+from . import __version__
+from .utils import normalize
+
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_MAX_MEMORY_SIZE = 16 * 1024 * 1024
+
+
+def make_key(data:str, translate_options=None, compile_options=None) -> str:
+    """
+    Given a python source and compile options, returns
+    a content address for its compiled output.
+    """
+
+    options = json.dumps([translate_options or {}, compile_options or {}], sort_keys=True)
+    hasher = hashlib.sha256()
+    for part in (__version__, options, normalize(data)):
+        hasher.update(part.encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+class DiskCache(object):
+    """
+    Persistent compile cache stored in a directory.
+
+    Entries are zlib compressed files named by its key. Each
+    hit updates the entry mtime, and entries with the oldest
+    mtime are evicted when the total size exceeds max_size.
+    """
+
+    suffix = ".js.z"
+
+    def __init__(self, path:str, max_size:int=DEFAULT_MAX_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+
+    def key(self, data:str, translate_options=None, compile_options=None) -> str:
+        return make_key(data, translate_options, compile_options)
+
+    def _entry_path(self, key:str) -> str:
+        return os.path.join(self.path, key[:2], key + self.suffix)
+
+    def _entries(self):
+        if not os.path.isdir(self.path):
+            return
+
+        for dirpath, dirnames, filenames in os.walk(self.path):
+            for filename in filenames:
+                if filename.endswith(self.suffix):
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def get(self, key:str):
+        path = self._entry_path(key)
+        try:
+            with io.open(path, "rb") as f:
+                data = zlib.decompress(f.read()).decode("utf-8")
+        except (OSError, zlib.error):
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return data
+
+    def set(self, key:str, data:str):
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        compressed = zlib.compress(data.encode("utf-8"))
+        try:
+            replaced_size = os.stat(path).st_size
+        except OSError:
+            replaced_size = 0
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with io.open(fd, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        if self._size is None:
+            self._size = self.size()
+        else:
+            self._size += len(compressed) - replaced_size
+
+        if self._size > self.max_size:
+            self.evict()
+
+    def evict(self, max_size:int=None):
+        """
+        Remove least recently used entries until the total
+        size fits in max_size (by default the cache budget).
+        """
+        if max_size is None:
+            max_size = self.max_size
+
+        entries = sorted(self._entries(), key=lambda x: x[2])
+        total = sum(size for path, size, mtime in entries)
+
+        for path, size, mtime in entries:
+            if total <= max_size:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+
+        self._size = total
+
+    def size(self) -> int:
+        return sum(size for path, size, mtime in self._entries())
+
+    def stats(self) -> dict:
+        entries = list(self._entries())
+        return {"path": self.path,
+                "entries": len(entries),
+                "size": sum(size for path, size, mtime in entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses}
+
+    def clear(self):
+        self.evict(0)
+
+
+class MemoryCache(object):
+    """
+    Thread safe in-process compile cache.
+
+    Keeps the most recently used compiled outputs, bounded
+    both by number of entries and by total output size (in
+    characters). Keys are the raw source and option tuples,
+    so lookups do not need any hashing of the source beyond
+    the python one.
+    """
+
+    def __init__(self, max_entries:int=DEFAULT_MAX_ENTRIES,
+                 max_size:int=DEFAULT_MAX_MEMORY_SIZE):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, data:str, translate_options=None, compile_options=None) -> tuple:
+        return (data,
+                tuple(sorted((translate_options or {}).items())),
+                tuple(sorted((compile_options or {}).items())))
+
+    def get(self, key:tuple):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key:tuple, value:str):
+        value = str(value)
+        if len(value) > self.max_size:
+            return
+
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+
+            self._data[key] = value
+            self._size += len(value)
+
+            while len(self._data) > self.max_entries or self._size > self.max_size:
+                _, evicted = self._data.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._data)
+
+    def size(self) -> int:
+        return self._size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._data),
+                    "size": self._size,
+                    "max_entries": self.max_entries,
+                    "max_size": self.max_size,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions}
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._size = 0
@@ -25,374 +25,531 @@
 __author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
 
 from . import ast
+from .utils import DispatchMeta
+from .utils import node_classes
 
 
-class ECMAVisitor(object):
+class ECMAVisitor(object, metaclass=DispatchMeta):
+    dispatch_tables = {"_visit_table": ("visit_", "generic_visit")}
+    dispatch_node_classes = node_classes(ast, ast.Node)
 
     def __init__(self, indent_chars=2):
         self.indent_level = 0
         self.indent_value = " " * indent_chars
+        self._indent = ""
+        self._write = None
 
     def _make_indent(self):
-        return self.indent_value * self.indent_level
+        return self._indent
+
+    def _inc_indent(self):
+        self.indent_level += 2
+        self._indent += self.indent_value * 2
+
+    def _dec_indent(self):
+        self.indent_level -= 2
+        self._indent = self._indent[:len(self._indent) - len(self.indent_value) * 2]
 
     def visit(self, node):
-        method = 'visit_%s' % node.__class__.__name__
-        return getattr(self, method, self.generic_visit)(node)
+        chunks = []
+        self.write(node, chunks)
+        return ''.join(chunks)
+
+    def write(self, node, stream):
+        """
+        Compile node writing output fragments into stream
+        as soon as they are generated, without building the
+        whole program as one string.
+
+        The stream can be any text sink with ``write`` method
+        (an open file, io.StringIO, ...) or a list where
+        fragments are appended.
+        """
+        previous_write = self._write
+        if isinstance(stream, list):
+            self._write = stream.append
+        else:
+            self._write = stream.write
+
+        try:
+            self.emit(node)
+        finally:
+            self._write = previous_write
+
+    def emit(self, node):
+        """
+        Emit node without recursion. Visit methods of nodes
+        with childs are generators that write their own
+        fragments and yield each child to emit; an explicit
+        stack of these generators replaces the call stack.
+
+        Visit methods returning the compiled node as a string
+        (as subclasses written for previous versions do) are
+        supported too, the string is written as is.
+        """
+        pending = self._visit_node(node)
+        if pending is None:
+            return
+        if isinstance(pending, str):
+            self._write(pending)
+            return
+
+        stack = [pending]
+        while stack:
+            try:
+                child = next(stack[-1])
+            except StopIteration:
+                stack.pop()
+                continue
+
+            pending = self._visit_node(child)
+            if pending is None:
+                continue
+            if isinstance(pending, str):
+                self._write(pending)
+            else:
+                stack.append(pending)
+
+    def _visit_node(self, node):
+        return self._visit_table[node.__class__](self, node)
+
+    def emit_sequence(self, nodes, separator, indent=False):
+        write = self._write
+        first = True
+        for node in nodes:
+            if first:
+                first = False
+            else:
+                write(separator)
+            if indent:
+                write(self._indent)
+            yield node
+        return not first
 
     def generic_visit(self, node):
-        return 'GEN: %r' % node
+        self._write('GEN: %r' % node)
 
     def visit_Program(self, node):
-        return '\n'.join(self.visit(child) for child in node)
+        yield from self.emit_sequence(node, '\n')
 
     def visit_Block(self, node):
-        s = '{\n'
-        self.indent_level += 2
-        s += '\n'.join(
-            self._make_indent() + self.visit(child) for child in node)
-        self.indent_level -= 2
-        s += '\n' + self._make_indent() + '}'
-        return s
+        write = self._write
+        write('{\n')
+        self._inc_indent()
+        yield from self.emit_sequence(node, '\n', indent=True)
+        self._dec_indent()
+        write('\n')
+        write(self._indent)
+        write('}')
 
     def visit_VarStatement(self, node):
-        s = 'var %s;' % ', '.join(self.visit(child) for child in node)
-        return s
+        write = self._write
+        write('var ')
+        yield from self.emit_sequence(node, ', ')
+        write(';')
 
     def visit_VarDecl(self, node):
-        output = []
-        output.append(self.visit(node.identifier))
+        yield node.identifier
         if node.initializer is not None:
-            output.append(' = %s' % self.visit(node.initializer))
-        return ''.join(output)
+            self._write(' = ')
+            yield node.initializer
 
     def visit_Identifier(self, node):
-        return node.value
+        self._write(node.value)
 
     def visit_Assign(self, node):
+        write = self._write
+        parens = getattr(node, '_parens', False)
+        if parens:
+            write('(')
+        yield node.left
         if node.op == ':':
-            template = '%s%s %s'
+            write(node.op)
         else:
-            template = '%s %s %s'
-        if getattr(node, '_parens', False):
-            template = '(%s)' % template
-        return template % (
-            self.visit(node.left), node.op, self.visit(node.right))
+            write(' ')
+            write(node.op)
+        write(' ')
+        yield node.right
+        if parens:
+            write(')')
 
     def visit_GetPropAssign(self, node):
-        template = 'get %s() {\n%s\n%s}'
-        if getattr(node, '_parens', False):
-            template = '(%s)' % template
-        self.indent_level += 2
-        body = '\n'.join(
-            (self._make_indent() + self.visit(el))
-            for el in node.elements
-            )
-        self.indent_level -= 2
-        tail = self._make_indent()
-        return template % (self.visit(node.prop_name), body, tail)
+        write = self._write
+        parens = getattr(node, '_parens', False)
+        if parens:
+            write('(')
+        write('get ')
+        yield node.prop_name
+        write('() {\n')
+        self._inc_indent()
+        yield from self.emit_sequence(node.elements, '\n', indent=True)
+        self._dec_indent()
+        write('\n')
+        write(self._indent)
+        write('}')
+        if parens:
+            write(')')
 
     def visit_SetPropAssign(self, node):
-        template = 'set %s(%s) {\n%s\n%s}'
-        if getattr(node, '_parens', False):
-            template = '(%s)' % template
         if len(node.parameters) > 1:
             raise SyntaxError(
                 'Setter functions must have one argument: %s' % node)
-        params = ','.join(self.visit(param) for param in node.parameters)
-        self.indent_level += 2
-        body = '\n'.join(
-            (self._make_indent() + self.visit(el))
-            for el in node.elements
-            )
-        self.indent_level -= 2
-        tail = self._make_indent()
-        return template % (self.visit(node.prop_name), params, body, tail)
+        write = self._write
+        parens = getattr(node, '_parens', False)
+        if parens:
+            write('(')
+        write('set ')
+        yield node.prop_name
+        write('(')
+        yield from self.emit_sequence(node.parameters, ',')
+        write(') {\n')
+        self._inc_indent()
+        yield from self.emit_sequence(node.elements, '\n', indent=True)
+        self._dec_indent()
+        write('\n')
+        write(self._indent)
+        write('}')
+        if parens:
+            write(')')
 
     def visit_Number(self, node):
-        return node.value
+        self._write(node.value)
 
     def visit_Comma(self, node):
-        s = '%s, %s' % (self.visit(node.left), self.visit(node.right))
-        if getattr(node, '_parens', False):
-            s = '(' + s + ')'
-        return s
+        write = self._write
+        parens = getattr(node, '_parens', False)
+        if parens:
+            write('(')
+        yield node.left
+        write(', ')
+        yield node.right
+        if parens:
+            write(')')
 
     def visit_EmptyStatement(self, node):
-        return node.value
+        self._write(node.value)
 
     def visit_If(self, node):
-        s = 'if ('
+        write = self._write
+        write('if (')
         if node.predicate is not None:
-            s += self.visit(node.predicate)
-        s += ') '
-        s += self.visit(node.consequent)
+            yield node.predicate
+        write(') ')
+        yield node.consequent
         if node.alternative is not None:
-            s += ' else '
-            s += self.visit(node.alternative)
-        return s
+            write(' else ')
+            yield node.alternative
 
     def visit_Boolean(self, node):
-        return node.value
+        self._write(node.value)
 
     def visit_For(self, node):
-        s = 'for ('
+        write = self._write
+        write('for (')
         if node.init is not None:
-            s += self.visit(node.init)
+            yield node.init
         if node.init is None:
-            s += ' ; '
+            write(' ; ')
         elif isinstance(node.init, (ast.Assign, ast.Comma, ast.FunctionCall,
                                     ast.UnaryOp, ast.Identifier, ast.BinOp,
                                     ast.Conditional, ast.Regex, ast.NewExpr)):
-            s += '; '
+            write('; ')
         else:
-            s += ' '
+            write(' ')
         if node.cond is not None:
-            s += self.visit(node.cond)
-        s += '; '
+            yield node.cond
+        write('; ')
         if node.count is not None:
-            s += self.visit(node.count)
-        s += ') ' + self.visit(node.statement)
-        return s
+            yield node.count
+        write(') ')
+        yield node.statement
 
     def visit_ForIn(self, node):
+        write = self._write
         if isinstance(node.item, ast.VarDecl):
-            template = 'for (var %s in %s) '
+            write('for (var ')
         else:
-            template = 'for (%s in %s) '
-        s = template % (self.visit(node.item), self.visit(node.iterable))
-        s += self.visit(node.statement)
-        return s
+            write('for (')
+        yield node.item
+        write(' in ')
+        yield node.iterable
+        write(') ')
+        yield node.statement
 
     def visit_BinOp(self, node):
-        if getattr(node, '_parens', False):
-            template = '(%s %s %s)'
-        else:
-            template = '%s %s %s'
-        return template % (
-            self.visit(node.left), node.op, self.visit(node.right))
+        write = self._write
+        parens = getattr(node, '_parens', False)
+        if parens:
+            write('(')
+        yield node.left
+        write(' ')
+        write(node.op)
+        write(' ')
+        yield node.right
+        if parens:
+            write(')')
 
     def visit_UnaryOp(self, node):
-        s = self.visit(node.value)
+        write = self._write
+        parens = getattr(node, '_parens', False)
+        if parens:
+            write('(')
+        if not node.postfix:
+            write(node.op)
+            if node.op in ('delete', 'void', 'typeof'):
+                write(' ')
+        yield node.value
         if node.postfix:
-            s += node.op
-        elif node.op in ('delete', 'void', 'typeof'):
-            s = '%s %s' % (node.op, s)
-        else:
-            s = '%s%s' % (node.op, s)
-        if getattr(node, '_parens', False):
-            s = '(%s)' % s
-        return s
+            write(node.op)
+        if parens:
+            write(')')
 
     def visit_ExprStatement(self, node):
-        return '%s;' % self.visit(node.expr)
+        yield node.expr
+        self._write(';')
 
     def visit_DoWhile(self, node):
-        s = 'do '
-        s += self.visit(node.statement)
-        s += ' while (%s);' % self.visit(node.predicate)
-        return s
+        write = self._write
+        write('do ')
+        yield node.statement
+        write(' while (')
+        yield node.predicate
+        write(');')
 
     def visit_While(self, node):
-        s = 'while (%s) ' % self.visit(node.predicate)
-        s += self.visit(node.statement)
-        return s
+        write = self._write
+        write('while (')
+        yield node.predicate
+        write(') ')
+        yield node.statement
 
     def visit_Null(self, node):
-        return 'null'
+        self._write('null')
 
     def visit_String(self, node):
-        return node.value
+        self._write(node.value)
 
     def visit_Continue(self, node):
+        write = self._write
         if node.identifier is not None:
-            s = 'continue %s;' % self.visit_Identifier(node.identifier)
+            write('continue ')
+            self.visit_Identifier(node.identifier)
+            write(';')
         else:
-            s = 'continue;'
-        return s
+            write('continue;')
 
     def visit_Break(self, node):
+        write = self._write
         if node.identifier is not None:
-            s = 'break %s;' % self.visit_Identifier(node.identifier)
+            write('break ')
+            self.visit_Identifier(node.identifier)
+            write(';')
         else:
-            s = 'break;'
-        return s
+            write('break;')
 
     def visit_Return(self, node):
+        write = self._write
         if node.expr is None:
-            return 'return;'
+            write('return;')
         else:
-            return 'return %s;' % self.visit(node.expr)
+            write('return ')
+            yield node.expr
+            write(';')
 
     def visit_With(self, node):
-        s = 'with (%s) ' % self.visit(node.expr)
-        s += self.visit(node.statement)
-        return s
+        write = self._write
+        write('with (')
+        yield node.expr
+        write(') ')
+        yield node.statement
 
     def visit_Label(self, node):
-        s = '%s: %s' % (
-            self.visit(node.identifier), self.visit(node.statement))
-        return s
+        yield node.identifier
+        self._write(': ')
+        yield node.statement
 
     def visit_Switch(self, node):
-        s = 'switch (%s) {\n' % self.visit(node.expr)
-        self.indent_level += 2
+        write = self._write
+        write('switch (')
+        yield node.expr
+        write(') {\n')
+        self._inc_indent()
         for case in node.cases:
-            s += self._make_indent() + self.visit_Case(case)
+            write(self._indent)
+            yield case
         if node.default is not None:
-            s += self.visit_Default(node.default)
-        self.indent_level -= 2
-        s += self._make_indent() + '}'
-        return s
+            yield node.default
+        self._dec_indent()
+        write(self._indent)
+        write('}')
 
     def visit_Case(self, node):
-        s = 'case %s:\n' % self.visit(node.expr)
-        self.indent_level += 2
-        elements = '\n'.join(self._make_indent() + self.visit(element)
-                             for element in node.elements)
-        if elements:
-            s += elements + '\n'
-        self.indent_level -= 2
-        return s
+        write = self._write
+        write('case ')
+        yield node.expr
+        write(':\n')
+        self._inc_indent()
+        if (yield from self.emit_sequence(node.elements, '\n', indent=True)):
+            write('\n')
+        self._dec_indent()
 
     def visit_Default(self, node):
-        s = self._make_indent() + 'default:\n'
-        self.indent_level += 2
-        s += '\n'.join(self._make_indent() + self.visit(element)
-                       for element in node.elements)
+        write = self._write
+        write(self._indent)
+        write('default:\n')
+        self._inc_indent()
+        yield from self.emit_sequence(node.elements, '\n', indent=True)
         if node.elements is not None:
-            s += '\n'
-        self.indent_level -= 2
-        return s
+            write('\n')
+        self._dec_indent()
 
     def visit_Throw(self, node):
-        s = 'throw %s;' % self.visit(node.expr)
-        return s
+        self._write('throw ')
+        yield node.expr
+        self._write(';')
 
     def visit_Debugger(self, node):
-        return '%s;' % node.value
+        self._write(node.value)
+        self._write(';')
 
     def visit_Try(self, node):
-        s = 'try '
-        s += self.visit(node.statements)
+        write = self._write
+        write('try ')
+        yield node.statements
         if node.catch is not None:
-            s += ' ' + self.visit(node.catch)
+            write(' ')
+            yield node.catch
         if node.fin is not None:
-            s += ' ' + self.visit(node.fin)
-        return s
+            write(' ')
+            yield node.fin
 
     def visit_Catch(self, node):
-        s = 'catch (%s) %s' % (
-            self.visit(node.identifier), self.visit(node.elements))
-        return s
+        write = self._write
+        write('catch (')
+        yield node.identifier
+        write(') ')
+        yield node.elements
 
     def visit_Finally(self, node):
-        s = 'finally %s' % self.visit(node.elements)
-        return s
+        self._write('finally ')
+        yield node.elements
 
     def visit_FuncDecl(self, node):
-        self.indent_level += 2
-        elements = '\n'.join(self._make_indent() + self.visit(element)
-                             for element in node.elements)
-        self.indent_level -= 2
-
-        s = 'function %s(%s) {\n%s' % (
-            self.visit(node.identifier),
-            ', '.join(self.visit(param) for param in node.parameters),
-            elements,
-            )
-        s += '\n' + self._make_indent() + '}'
-        return s
+        write = self._write
+        write('function ')
+        yield node.identifier
+        write('(')
+        yield from self.emit_sequence(node.parameters, ', ')
+        write(') {\n')
+        self._inc_indent()
+        yield from self.emit_sequence(node.elements, '\n', indent=True)
+        self._dec_indent()
+        write('\n')
+        write(self._indent)
+        write('}')
 
     def visit_FuncExpr(self, node):
-        self.indent_level += 2
-        elements = '\n'.join(self._make_indent() + self.visit(element)
-                             for element in node.elements)
-        self.indent_level -= 2
-
-        ident = node.identifier
-        ident = '' if ident is None else ' %s' % self.visit(ident)
-
-        header = 'function%s(%s)'
-        if getattr(node, '_parens', False):
-            header = '(' + header
-        s = (header + ' {\n%s') % (
-            ident,
-            ', '.join(self.visit(param) for param in node.parameters),
-            elements,
-            )
-        s += '\n' + self._make_indent() + '}'
-        if getattr(node, '_parens', False):
-            s += ')'
-        return s
+        write = self._write
+        parens = getattr(node, '_parens', False)
+        if parens:
+            write('(')
+        write('function')
+        if node.identifier is not None:
+            write(' ')
+            yield node.identifier
+        write('(')
+        yield from self.emit_sequence(node.parameters, ', ')
+        write(') {\n')
+        self._inc_indent()
+        yield from self.emit_sequence(node.elements, '\n', indent=True)
+        self._dec_indent()
+        write('\n')
+        write(self._indent)
+        write('}')
+        if parens:
+            write(')')
 
     def visit_Conditional(self, node):
-        if getattr(node, '_parens', False):
-            template = '(%s ? %s : %s)'
-        else:
-            template = '%s ? %s : %s'
-
-        s = template % (
-            self.visit(node.predicate),
-            self.visit(node.consequent), self.visit(node.alternative))
-        return s
+        write = self._write
+        parens = getattr(node, '_parens', False)
+        if parens:
+            write('(')
+        yield node.predicate
+        write(' ? ')
+        yield node.consequent
+        write(' : ')
+        yield node.alternative
+        if parens:
+            write(')')
 
     def visit_Regex(self, node):
         if getattr(node, '_parens', False):
-            return '(%s)' % node.value
+            self._write('(%s)' % node.value)
         else:
-            return node.value
+            self._write(node.value)
 
     def visit_NewExpr(self, node):
-        s = 'new %s(%s)' % (
-            self.visit(node.identifier),
-            ', '.join(self.visit(arg) for arg in node.args)
-            )
-        return s
+        write = self._write
+        write('new ')
+        yield node.identifier
+        write('(')
+        yield from self.emit_sequence(node.args, ', ')
+        write(')')
 
     def visit_DotAccessor(self, node):
-        if getattr(node, '_parens', False):
-            template = '(%s.%s)'
-        else:
-            template = '%s.%s'
-        s = template % (self.visit(node.node), self.visit(node.identifier))
-        return s
+        write = self._write
+        parens = getattr(node, '_parens', False)
+        if parens:
+            write('(')
+        yield node.node
+        write('.')
+        yield node.identifier
+        if parens:
+            write(')')
 
     def visit_BracketAccessor(self, node):
-        s = '%s[%s]' % (self.visit(node.node), self.visit(node.expr))
-        return s
+        write = self._write
+        yield node.node
+        write('[')
+        yield node.expr
+        write(']')
 
     def visit_FunctionCall(self, node):
-        s = '%s(%s)' % (self.visit(node.identifier),
-                        ', '.join(self.visit(arg) for arg in node.args))
-        if getattr(node, '_parens', False):
-            s = '(' + s + ')'
-        return s
+        write = self._write
+        parens = getattr(node, '_parens', False)
+        if parens:
+            write('(')
+        yield node.identifier
+        write('(')
+        yield from self.emit_sequence(node.args, ', ')
+        write(')')
+        if parens:
+            write(')')
 
     def visit_Object(self, node):
-        s = '{\n'
-        self.indent_level += 2
-        s += ',\n'.join(self._make_indent() + self.visit(prop)
-                        for prop in node.properties)
-        self.indent_level -= 2
+        write = self._write
+        write('{\n')
+        self._inc_indent()
+        yield from self.emit_sequence(node.properties, ',\n', indent=True)
+        self._dec_indent()
         if node.properties:
-            s += '\n'
-        s += self._make_indent() + '}'
-        return s
+            write('\n')
+        write(self._indent)
+        write('}')
 
     def visit_Array(self, node):
-        s = '['
+        write = self._write
+        write('[')
         length = len(node.items) - 1
         for index, item in enumerate(node.items):
             if isinstance(item, ast.Elision):
-                s += ','
+                write(',')
             elif index != length:
-                s += self.visit(item) + ','
+                yield item
+                write(',')
             else:
-                s += self.visit(item)
-        s += ']'
-        return s
+                yield item
+        write(']')
 
     def visit_This(self, node):
-        return 'this'
-
+        self._write('this')
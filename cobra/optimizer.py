@@ -0,0 +1,739 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import math
+import re
+
+from . import ast as ecma_ast
+from .utils import DispatchMeta
+from .utils import node_classes
+
+
+# Javascript decimal number literals (as the translator
+# renders python numbers).
+NUMBER_RX = re.compile(r"^-?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$")
+
+# Max integer exactly representable by a javascript number.
+MAX_SAFE_INTEGER = 2 ** 53
+
+
+def transform(tree, fn):
+    """
+    Walk an ecma ast tree without recursion, replacing each
+    node (but the root) with the result of ``fn(node, parent)``
+    once its own childs are replaced. Nodes shared by several
+    parents are transformed only once.
+    """
+    # Nodes are kept referenced so that its ids are not reused
+    seen = {}
+    replaced = {}
+
+    def replace(node, parent):
+        key = id(node)
+        if key not in replaced:
+            replaced[key] = (node, fn(node, parent))
+        return replaced[key][1]
+
+    stack = [(tree, False)]
+
+    while stack:
+        node, leaving = stack.pop()
+        if not leaving:
+            if id(node) in seen:
+                continue
+            seen[id(node)] = node
+
+            stack.append((node, True))
+            stack.extend((child, False) for child in node if isinstance(child, ecma_ast.Node))
+            continue
+
+        for name in node._fields:
+            value = getattr(node, name)
+            if type(value) is list:
+                value[:] = [replace(child, node) if isinstance(child, ecma_ast.Node) else child
+                            for child in value]
+            elif isinstance(value, ecma_ast.Node):
+                setattr(node, name, replace(value, node))
+
+    return tree
+
+
+def _to_number(node):
+    """
+    Given an ecma node, returns its value as float if it is a
+    decimal number literal or None.
+    """
+    if isinstance(node, ecma_ast.Number) and NUMBER_RX.match(node.value):
+        return float(node.value)
+    return None
+
+
+def _format_number(value:float):
+    """
+    Given a float, returns its javascript literal or None if
+    it has no literal (NaN and infinities).
+    """
+    if math.isnan(value) or math.isinf(value):
+        return None
+
+    if value == 0 and math.copysign(1, value) < 0:
+        return "-0"
+
+    if value.is_integer() and abs(value) < 1e16:
+        return str(int(value))
+    return repr(value)
+
+
+def _to_int32(value:float) -> int:
+    if math.isinf(value):
+        return 0
+    value = int(value) % 2 ** 32
+    return value - 2 ** 32 if value >= 2 ** 31 else value
+
+
+def _to_uint32(value:float) -> int:
+    if math.isinf(value):
+        return 0
+    return int(value) % 2 ** 32
+
+
+def _is_string(node) -> bool:
+    """
+    Check if node is a double quoted string literal whose
+    value can be concatenated as text.
+    """
+    if not isinstance(node, ecma_ast.String):
+        return False
+
+    value = node.value
+    if len(value) < 2 or value[0] != '"' or value[-1] != '"':
+        return False
+
+    # An odd number of trailing backslashes escapes the quote
+    trailing = len(value[1:-1]) - len(value[1:-1].rstrip("\\"))
+    return trailing % 2 == 0
+
+
+def _to_string(node):
+    """
+    Given a constant ecma node, returns the body of its
+    string conversion literal or None.
+    """
+    if _is_string(node):
+        return node.value[1:-1]
+
+    if isinstance(node, (ecma_ast.Boolean, ecma_ast.Null)):
+        return "null" if isinstance(node, ecma_ast.Null) else node.value
+
+    value = _to_number(node)
+    if value is not None:
+        text = _format_number(value)
+        # Exponent thresholds of python and javascript differ
+        if text is not None and "e" not in text:
+            return "0" if text == "-0" else text
+    return None
+
+
+def _is_constant(node) -> bool:
+    return (_to_number(node) is not None or _is_string(node)
+            or isinstance(node, (ecma_ast.Boolean, ecma_ast.Null)))
+
+
+def _is_truthy(node) -> bool:
+    """
+    Given a constant ecma node, returns its javascript
+    boolean conversion.
+    """
+    if isinstance(node, ecma_ast.Boolean):
+        return node.value == "true"
+
+    if isinstance(node, ecma_ast.Null):
+        return False
+
+    if _is_string(node):
+        return len(node.value) > 2
+    return _to_number(node) != 0
+
+
+def _make_number(value:float):
+    text = _format_number(float(value))
+    return None if text is None else ecma_ast.Number(text)
+
+
+def _make_boolean(value:bool):
+    return ecma_ast.Boolean("true" if value else "false")
+
+
+def _arithmetic(op:str, left:float, right:float):
+    if op == "+":
+        return left + right
+    elif op == "-":
+        return left - right
+    elif op == "*":
+        return left * right
+    elif op == "/":
+        return left / right if right != 0 else None
+    elif op == "%":
+        # Javascript remainder has the sign of the dividend
+        return math.fmod(left, right) if right != 0 and not math.isinf(left) else None
+    return None
+
+
+def _bitwise(op:str, left:float, right:float):
+    if op == "|":
+        return _to_int32(left) | _to_int32(right)
+    elif op == "&":
+        return _to_int32(left) & _to_int32(right)
+    elif op == "^":
+        return _to_int32(left) ^ _to_int32(right)
+    elif op == "<<":
+        return _to_int32(_to_int32(left) << (_to_uint32(right) & 31))
+    elif op == ">>":
+        return _to_int32(left) >> (_to_uint32(right) & 31)
+    elif op == ">>>":
+        return _to_uint32(left) >> (_to_uint32(right) & 31)
+    return None
+
+
+def _compare(op:str, left:float, right:float):
+    if op == "<":
+        return left < right
+    elif op == "<=":
+        return left <= right
+    elif op == ">":
+        return left > right
+    elif op == ">=":
+        return left >= right
+    return None
+
+
+def _same_value(left, right):
+    """
+    Given two constant ecma nodes, returns the result of
+    its strict equality comparison (None if unknown).
+    """
+    if left.__class__ is not right.__class__:
+        return False
+
+    if isinstance(left, ecma_ast.Number):
+        return _to_number(left) == _to_number(right)
+
+    if isinstance(left, ecma_ast.Null):
+        return True
+
+    # Escape sequences may spell the same string differently
+    if isinstance(left, ecma_ast.String) and ("\\" in left.value or "\\" in right.value):
+        return None
+    return left.value == right.value
+
+
+def _is_math_call(node, name:str, arity:int) -> bool:
+    if not isinstance(node, ecma_ast.FunctionCall) or not isinstance(node.args, list):
+        return False
+
+    accessor = node.identifier
+    return (isinstance(accessor, ecma_ast.DotAccessor)
+            and isinstance(accessor.node, ecma_ast.Identifier) and accessor.node.value == "Math"
+            and isinstance(accessor.identifier, ecma_ast.Identifier)
+            and accessor.identifier.value == name and len(node.args) == arity)
+
+
+class ConstantFolder(object, metaclass=DispatchMeta):
+    """
+    Evaluate at compile time the operations of an ecma ast
+    tree whose operands are constants: arithmetic, bitwise,
+    comparison, boolean and string concatenation expressions
+    and ``Math.pow`` and ``Math.floor`` calls.
+
+    Results follow javascript semantics (double precision
+    arithmetic, int32 bitwise operations, remainder with the
+    sign of the dividend...), and expressions without a
+    literal result (like divisions by zero) are kept.
+
+    The ``counts`` attribute holds the number of folded
+    nodes by kind.
+    """
+
+    dispatch_tables = {"_fold_table": ("_fold_", None)}
+    dispatch_node_classes = node_classes(ecma_ast, ecma_ast.Node)
+
+    def __init__(self):
+        self.counts = collections.Counter()
+
+    def fold(self, tree):
+        return transform(tree, self._fold_node)
+
+    def _fold_node(self, node, parent):
+        fold = self._fold_table[node.__class__]
+        if fold is None:
+            return node
+
+        # A number literal can't be the object of a dot
+        # accessor (``1.toString``), keep the expression.
+        if isinstance(parent, ecma_ast.DotAccessor) and parent.node is node:
+            return node
+
+        result = fold(self, node)
+        return node if result is None else result
+
+    def _folded(self, kind:str, result):
+        if result is not None:
+            self.counts[kind] += 1
+        return result
+
+    def _fold_UnaryOp(self, node):
+        if node.postfix or not _is_constant(node.value):
+            return None
+
+        if node.op == "!":
+            return self._folded("boolean", _make_boolean(not _is_truthy(node.value)))
+
+        value = _to_number(node.value)
+        if value is None:
+            return None
+
+        # Negative number literals are translated as an
+        # unary minus operation: not counted as folded.
+        if node.op == "-":
+            return _make_number(-value)
+        elif node.op == "+":
+            return self._folded("arithmetic", _make_number(value))
+        elif node.op == "~":
+            return self._folded("bitwise", _make_number(~_to_int32(value)))
+        return None
+
+    def _fold_BinOp(self, node):
+        op, left, right = node.op, node.left, node.right
+
+        if op in ("&&", "||"):
+            return self._fold_logical(node)
+
+        if not _is_constant(left) or not _is_constant(right):
+            return None
+
+        if op in ("===", "!=="):
+            equal = _same_value(left, right)
+            if equal is None:
+                return None
+            return self._folded("comparison", _make_boolean(equal if op == "===" else not equal))
+
+        if op == "+" and (_is_string(left) or _is_string(right)):
+            left_text, right_text = _to_string(left), _to_string(right)
+            if left_text is None or right_text is None:
+                return None
+            return self._folded("string", ecma_ast.String('"{}{}"'.format(left_text, right_text)))
+
+        left_value, right_value = _to_number(left), _to_number(right)
+        if left_value is None or right_value is None:
+            return None
+
+        result = _arithmetic(op, left_value, right_value)
+        if result is not None:
+            return self._folded("arithmetic", _make_number(result))
+
+        result = _bitwise(op, left_value, right_value)
+        if result is not None:
+            return self._folded("bitwise", _make_number(result))
+
+        result = _compare(op, left_value, right_value)
+        if result is not None:
+            return self._folded("comparison", _make_boolean(result))
+        return None
+
+    def _fold_logical(self, node):
+        """
+        ``&&`` and ``||`` returns one of its operands: they
+        are folded when the left one is a constant.
+        """
+        if not _is_constant(node.left):
+            return None
+
+        truthy = _is_truthy(node.left)
+        if (node.op == "&&") != truthy:
+            return self._folded("boolean", node.left)
+
+        right = node.right
+        if _is_constant(right):
+            return self._folded("boolean", right)
+
+        if isinstance(right, (ecma_ast.BinOp, ecma_ast.UnaryOp, ecma_ast.Conditional,
+                              ecma_ast.Assign, ecma_ast.Comma)):
+            right._parens = True
+        return self._folded("boolean", right)
+
+    def _fold_FunctionCall(self, node):
+        if _is_math_call(node, "floor", 1):
+            value = _to_number(node.args[0])
+            if value is None:
+                return None
+            return self._folded("math", _make_number(math.floor(value)
+                                                     if not math.isinf(value) else value))
+
+        if _is_math_call(node, "pow", 2):
+            base, exponent = _to_number(node.args[0]), _to_number(node.args[1])
+            if base is None or exponent is None:
+                return None
+
+            # Only integer powers that are exactly representable:
+            # other results may differ by engine.
+            if not base.is_integer() or not exponent.is_integer() or exponent < 0:
+                return None
+            if exponent * math.log2(abs(base) or 1) > 53:
+                return None
+
+            result = int(base) ** int(exponent)
+            if abs(result) > MAX_SAFE_INTEGER:
+                return None
+            return self._folded("math", _make_number(result))
+        return None
+
+
+# Nodes holding statement lists and the attribute of the list.
+STATEMENT_LISTS = {ecma_ast.Program: "_children_list",
+                   ecma_ast.Block: "_children_list",
+                   ecma_ast.FuncExpr: "elements",
+                   ecma_ast.FuncDecl: "elements",
+                   ecma_ast.Case: "elements",
+                   ecma_ast.Default: "elements"}
+
+JUMP_STATEMENTS = (ecma_ast.Return, ecma_ast.Throw, ecma_ast.Break, ecma_ast.Continue)
+
+# Statements hoisted by javascript, kept even if unreachable.
+HOISTED_STATEMENTS = (ecma_ast.VarStatement, ecma_ast.FuncDecl)
+
+
+def get_module_scope(tree, module_as_closure:bool):
+    """
+    Given a translated program, returns the node holding
+    the module level statements: the program or the body
+    of the module closure.
+    """
+    if module_as_closure:
+        statements = [node for node in tree.children() if node is not None]
+        if (len(statements) == 1 and isinstance(statements[0], ecma_ast.ExprStatement)
+                and isinstance(statements[0].expr, ecma_ast.FunctionCall)
+                and isinstance(statements[0].expr.identifier, ecma_ast.DotAccessor)
+                and isinstance(statements[0].expr.identifier.node, ecma_ast.FuncExpr)):
+            return statements[0].expr.identifier.node
+    return tree
+
+
+def get_statements(node) -> list:
+    statements = getattr(node, STATEMENT_LISTS[node.__class__])
+
+    # Function bodies may be a block
+    if isinstance(statements, ecma_ast.Block):
+        return statements._children_list
+    return statements
+
+
+def _iter_scope(scope):
+    """
+    Given a function or program node, yields the nodes of
+    its own scope (nested functions are yielded but not
+    walked) with the node holding them.
+    """
+    stack = [(child, scope) for child in scope if isinstance(child, ecma_ast.Node)]
+    while stack:
+        node, parent = stack.pop()
+        yield node, parent
+        if not isinstance(node, ecma_ast.FuncBase):
+            stack.extend((child, node) for child in node if isinstance(child, ecma_ast.Node))
+
+
+def _get_assigned_name(statement):
+    """
+    Given a statement, returns the assigned identifier and
+    value if it is a plain assignment of a variable, or None.
+    """
+    if not isinstance(statement, ecma_ast.ExprStatement):
+        return None
+
+    expr = statement.expr
+    if isinstance(expr, ecma_ast.Assign) and expr.op == "=":
+        target, value = expr.left, expr.right
+    elif isinstance(expr, ecma_ast.VarDecl):
+        # Function definitions
+        target, value = expr.identifier, expr.initializer
+    else:
+        return None
+
+    if not isinstance(target, ecma_ast.Identifier):
+        return None
+    return target, value
+
+
+def _is_pure(node, names:set) -> bool:
+    """
+    Check if evaluating an expression node has no side
+    effects (names are the variables that can be read).
+    """
+    if _is_constant(node) or isinstance(node, (ecma_ast.This, ecma_ast.FuncExpr)):
+        return True
+
+    if isinstance(node, ecma_ast.Identifier):
+        return node.value in names
+
+    if isinstance(node, ecma_ast.Array):
+        return all(_is_pure(item, names) for item in node.items)
+
+    if isinstance(node, ecma_ast.Object):
+        return all(isinstance(prop, ecma_ast.Assign) and _is_pure(prop.right, names)
+                   for prop in node.properties)
+    return False
+
+
+class DeadCodeEliminator(object):
+    """
+    Remove from an ecma ast tree the code that has no effect:
+
+    - unreachable statements (after return, throw, break
+      and continue statements),
+    - branches of conditionals with constant predicates,
+    - assignments of function local variables that are never
+      read, when the assigned value has no side effects,
+    - declarations of variables that are never used.
+
+    Module level variables may be read by other scripts (they
+    are globals on bare mode), so on module level only unused
+    declarations are removed, and the statements are kept
+    (but for constant branches).
+
+    The ``counts`` attribute holds the number of removed
+    nodes by kind.
+    """
+
+    def __init__(self):
+        self.counts = collections.Counter()
+        self._free_names = {}
+
+    def eliminate(self, tree, module_scope=None):
+        if module_scope is None:
+            module_scope = tree
+
+        def reduce(node, parent):
+            self._reduce_node(node, node is module_scope)
+            return node
+
+        transform(tree, reduce)
+        self._reduce_node(tree, tree is module_scope)
+
+        functions = [node for node in self._iter_nodes(tree)
+                     if isinstance(node, ecma_ast.FuncBase) and node is not module_scope]
+        for function in reversed(functions):
+            self._eliminate_unused(function)
+
+        self.prune_declarations(module_scope, self.get_references(module_scope))
+        return tree
+
+    def _iter_nodes(self, tree):
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(child for child in node if isinstance(child, ecma_ast.Node))
+
+    # Unreachable statements and constant branches
+
+    def _reduce_node(self, node, module:bool):
+        if node.__class__ in STATEMENT_LISTS:
+            statements = get_statements(node)
+            statements[:] = self._reduce_statements(statements, module)
+
+        elif isinstance(node, ecma_ast.If) and isinstance(node.alternative, ecma_ast.If):
+            alternative = node.alternative
+            if _is_constant(alternative.predicate):
+                self.counts["constant_branch"] += 1
+                if _is_truthy(alternative.predicate):
+                    node.alternative = alternative.consequent
+                else:
+                    node.alternative = alternative.alternative
+
+    def _reduce_statements(self, statements:list, module:bool) -> list:
+        result = []
+        pending = list(reversed(statements))
+        terminated = False
+
+        while pending:
+            statement = pending.pop()
+
+            if terminated and not isinstance(statement, HOISTED_STATEMENTS):
+                self.counts["unreachable"] += 1
+                continue
+
+            if isinstance(statement, ecma_ast.If) and _is_constant(statement.predicate):
+                self.counts["constant_branch"] += 1
+                if _is_truthy(statement.predicate):
+                    branch = statement.consequent
+                else:
+                    branch = statement.alternative
+
+                if isinstance(branch, ecma_ast.Block):
+                    pending.extend(reversed(branch.children()))
+                elif branch is not None:
+                    pending.append(branch)
+                continue
+
+            if (isinstance(statement, ecma_ast.While) and _is_constant(statement.predicate)
+                    and not _is_truthy(statement.predicate)):
+                self.counts["constant_branch"] += 1
+                continue
+
+            result.append(statement)
+            if isinstance(statement, JUMP_STATEMENTS) and not module:
+                terminated = True
+
+        return result
+
+    # Unused variables
+
+    def _collect_names(self, scope) -> tuple:
+        """
+        Given a function or program node, returns a counter
+        of variables read and a counter of variables assigned
+        on its scope (variables read by nested functions
+        that they don't declare are counted as read).
+        """
+        reads = collections.Counter()
+        writes = collections.Counter()
+        skip = set()
+
+        for node, parent in _iter_scope(scope):
+            if isinstance(node, ecma_ast.FuncBase):
+                reads.update(self._get_free_names(node))
+
+            elif isinstance(node, ecma_ast.ExprStatement):
+                assigned = _get_assigned_name(node)
+                if assigned is not None:
+                    writes[assigned[0].value] += 1
+                    skip.add(id(assigned[0]))
+
+            elif isinstance(node, ecma_ast.VarStatement):
+                skip.update(id(decl.identifier) for decl in node
+                            if isinstance(decl, ecma_ast.VarDecl))
+
+            elif isinstance(node, ecma_ast.Identifier) and id(node) not in skip:
+                # Property names and labels are not variables
+                if isinstance(parent, ecma_ast.DotAccessor) and parent.identifier is node:
+                    continue
+                if isinstance(parent, ecma_ast.Assign) and parent.op == ":" and parent.left is node:
+                    continue
+                if isinstance(parent, (ecma_ast.Label, ecma_ast.Break, ecma_ast.Continue)):
+                    continue
+                reads[node.value] += 1
+
+        return reads, writes
+
+    def _get_declared(self, scope) -> set:
+        names = set()
+        for node, parent in _iter_scope(scope):
+            if isinstance(node, ecma_ast.VarStatement):
+                names.update(decl.identifier.value for decl in node
+                             if isinstance(decl, ecma_ast.VarDecl))
+        return names
+
+    def _get_parameters(self, function) -> set:
+        names = set(param.value for param in function.parameters
+                    if isinstance(param, ecma_ast.Identifier))
+        if function.identifier is not None:
+            names.add(function.identifier.value)
+        return names
+
+    def _get_free_names(self, function) -> set:
+        """
+        Given a function node, returns the names of variables
+        used by it that it doesn't declare. Nested functions
+        are eliminated before its parents, so the result is
+        computed once.
+        """
+        key = id(function)
+        if key not in self._free_names:
+            reads, writes = self._collect_names(function)
+            names = (set(reads) | set(writes)) - self._get_declared(function)
+            self._free_names[key] = (function, names - self._get_parameters(function))
+        return self._free_names[key][1]
+
+    def get_references(self, scope) -> set:
+        """
+        Given a function or program node, returns the names
+        of variables used on its scope.
+        """
+        reads, writes = self._collect_names(scope)
+        return set(reads) | set(writes)
+
+    def _iter_statement_lists(self, function):
+        yield get_statements(function)
+        for node, parent in _iter_scope(function):
+            if node.__class__ in STATEMENT_LISTS and not isinstance(node, ecma_ast.FuncBase):
+                yield get_statements(node)
+
+    def _eliminate_unused(self, function):
+        local_names = self._get_declared(function) - self._get_parameters(function)
+        names = local_names | self._get_parameters(function)
+
+        changed = True
+        while changed:
+            changed = False
+            reads, _ = self._collect_names(function)
+
+            # Evaluated code can read any local variable
+            if "eval" in reads:
+                return
+
+            for statements in list(self._iter_statement_lists(function)):
+                kept = []
+                for statement in statements:
+                    assigned = _get_assigned_name(statement)
+                    if (assigned is not None and assigned[0].value in local_names
+                            and reads[assigned[0].value] == 0 and _is_pure(assigned[1], names)):
+                        self.counts["unused_assignment"] += 1
+                        changed = True
+                        continue
+                    kept.append(statement)
+                statements[:] = kept
+
+        self.prune_declarations(function, self.get_references(function))
+
+    def prune_declarations(self, scope, references:set):
+        """
+        Given a function or program node and the names of
+        variables used on it, removes the declarations of
+        unused variables.
+        """
+        statements = get_statements(scope)
+        kept = []
+        for statement in statements:
+            if isinstance(statement, ecma_ast.VarStatement):
+                decls = statement._children_list
+                used = [decl for decl in decls
+                        if not isinstance(decl, ecma_ast.VarDecl) or decl.initializer is not None
+                        or decl.identifier.value in references]
+                if len(used) < len(decls):
+                    self.counts["unused_declaration"] += len(decls) - len(used)
+                if not used:
+                    continue
+                statement._children_list[:] = used
+            kept.append(statement)
+        statements[:] = kept
+
+
+def optimize(tree, counts=None, module_as_closure=False):
+    """
+    Given an ecma ast tree, returns it optimized (the tree is
+    changed in place): constant expressions are folded (see
+    ConstantFolder) and dead code is removed (see
+    DeadCodeEliminator).
+
+    If counts is specified (a dict), it is updated with the
+    number of optimized nodes by kind.
+    """
+    folder = ConstantFolder()
+    tree = folder.fold(tree)
+
+    eliminator = DeadCodeEliminator()
+    tree = eliminator.eliminate(tree, get_module_scope(tree, module_as_closure))
+
+    if counts is not None:
+        for kind, count in list(folder.counts.items()) + list(eliminator.counts.items()):
+            counts[kind] = counts.get(kind, 0) + count
+    return tree
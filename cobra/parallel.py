@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+
+import ast
+import re
+
+from concurrent.futures import ProcessPoolExecutor
+
+from . import ast as ecma_ast
+from . import compiler
+from . import optimizer
+from . import translator
+from .symbols import SymbolTable
+
+
+# Autogenerated names of a chunk are rendered as placeholders
+# holding its prefix and its rank (number of names with the same
+# prefix allocated before it in the chunk). The merge replaces
+# them with the real names, once the number of names allocated
+# by previous chunks is known.
+PLACEHOLDER_RX = re.compile("\x00([^\x00\x01]*)\x01([0-9]+)\x00")
+
+# Names of scope var statements are rendered unsorted, and
+# sorted by the merge once placeholders are replaced.
+DECLARATIONS_RX = re.compile("\x02([^\x02]*)\x02")
+
+MIN_CHUNK_STATEMENTS = 64
+
+
+def _make_placeholder(prefix:str, rank:int) -> str:
+    return "\x00{}\x01{}\x00".format(prefix, rank)
+
+
+class ScopeVarStatement(ecma_ast.VarStatement):
+    """
+    Var statement of a function scope of a chunk (see
+    DECLARATIONS_RX).
+    """
+
+
+class ChunkECMAVisitor(compiler.ECMAVisitor):
+    def visit_ScopeVarStatement(self, node):
+        names = "\x03".join(decl.identifier.value for decl in node)
+        self._write("var \x02{}\x02;".format(names))
+
+
+class ChunkTranslateVisitor(translator.TranslateVisitor):
+    """
+    Translator of a chunk of top level statements of a module.
+
+    Instead of the program, translating the module returns
+    the list of its translated statements. Autogenerated names
+    are allocated as placeholders (see PLACEHOLDER_RX).
+    """
+
+    def get_unique_identifier(self, prefix="ref"):
+        counters = self.scope.counters[-1]
+        rank = counters.get(prefix, 0)
+        counters[prefix] = rank + 1
+
+        placeholder = _make_placeholder(prefix, rank)
+        identifier = ecma_ast.Identifier(placeholder)
+        self.scope.set(placeholder, identifier)
+        return identifier
+
+    def _create_scope_var_statement(self, root=False):
+        scope_identifiers = self.scope.get_scope_identifiers(root=root)
+
+        if len(scope_identifiers) == 0:
+            return None
+
+        return ScopeVarStatement([ecma_ast.VarDecl(identifier) for identifier in scope_identifiers])
+
+    def _translate_Module(self, node, childs):
+        self.chunk_counters = dict(self.scope.counters[-1])
+        self.chunk_temporaries = [key for key in self.scope.scopes[-1] if key[:1] == "\x00"]
+        self.scope.drop_scope()
+        return childs
+
+
+def _translate_chunk(statements:list, scopes:dict, module_declared:dict,
+                     translate_options:dict, compile_options:dict) -> dict:
+    """
+    Process pool worker: translates and compiles a chunk of
+    top level statements with the symbols of the whole module.
+    """
+    module = ast.Module(body=statements)
+    symbols = SymbolTable(None, auto_camelcase=translate_options.get("auto_camelcase", False))
+    symbols.scopes = scopes
+    symbols.scopes[module] = module_declared
+
+    visitor = ChunkTranslateVisitor(**translate_options)
+    visitor.symbols = symbols
+    js_statements = visitor.visit(module)
+    js_statements = translator.inline_closures(ecma_ast.Program(js_statements)).children()
+
+    # Module level declarations are pruned by the merge,
+    # with the references of all chunks.
+    references = None
+    if visitor.meta_optimize:
+        program = optimizer.optimize(ecma_ast.Program(js_statements))
+        js_statements = program.children()
+        references = sorted(optimizer.DeadCodeEliminator().get_references(program))
+
+    emitter = ChunkECMAVisitor(**compile_options)
+    if visitor.meta_module_as_closure:
+        emitter._inc_indent()
+
+    return {"statements": [emitter.visit(statement) for statement in js_statements],
+            "references": references,
+            "counters": visitor.chunk_counters,
+            "temporaries": visitor.chunk_temporaries,
+            "global_object": visitor.meta_global_object,
+            "global_new": visitor.meta_global_new}
+
+
+def split_module(tree, chunks:int) -> list:
+    """
+    Split top level statements of a module in at most chunks
+    lists of consecutive statements with a similar number of
+    source lines.
+    """
+    body = tree.body
+    if not body:
+        return []
+
+    total_lines = max(body[-1].lineno - body[0].lineno, 1)
+    chunk_lines = total_lines / chunks
+
+    result = [[]]
+    for statement in body:
+        if len(result) < chunks and statement.lineno - body[0].lineno >= chunk_lines * len(result):
+            result.append([])
+        result[-1].append(statement)
+    return result
+
+
+def _chunk_scopes(statements:list, symbols:SymbolTable) -> dict:
+    scopes = {}
+    for statement in statements:
+        for node in ast.walk(statement):
+            if node in symbols.scopes:
+                scopes[node] = symbols.scopes[node]
+    return scopes
+
+
+class NameAllocator(object):
+    """
+    Allocates autogenerated names with the same sequence
+    that ScopeStack.next_name uses: names of each prefix are
+    numbered skipping reserved ones.
+    """
+
+    def __init__(self, reserved):
+        self.reserved = reserved
+        self._names = {}
+
+    def get(self, prefix:str, rank:int) -> str:
+        names = self._names.setdefault(prefix, [])
+        index = int(names[-1].rsplit("_", 1)[1]) + 1 if names else 0
+        while len(names) <= rank:
+            candidate = "{}_{}".format(prefix, index)
+            if candidate not in self.reserved:
+                names.append(candidate)
+            index += 1
+        return names[rank]
+
+
+def compile_parallel(data:str, translate_options=None, compile_options=None, jobs:int=2,
+                     min_chunk_statements:int=MIN_CHUNK_STATEMENTS, executor=None) -> str:
+    """
+    Given a string with normalized python source code, returns
+    the compiled javascript code, translating chunks of top
+    level statements in parallel.
+
+    The symbol table pre-pass runs over the whole module, chunks
+    are translated and compiled by a pool of jobs processes, and
+    the merge renames the autogenerated names of each chunk and
+    builds the module level var statement and special forms as
+    the serial translator does, so the output is identical.
+    """
+    translate_options = translate_options or {}
+    compile_options = compile_options or {}
+
+    tree = ast.parse(data)
+    chunks = split_module(tree, min(jobs * 4, max(len(tree.body) // min_chunk_statements, 1)))
+    if len(chunks) < 2:
+        ecma_tree = translator.TranslateVisitor(**translate_options).translate(tree)
+        return compiler.ECMAVisitor(**compile_options).visit(ecma_tree)
+
+    symbols = SymbolTable(tree, auto_camelcase=translate_options.get("auto_camelcase", False))
+    module_declared = symbols.declared(tree)
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+
+    try:
+        futures = [executor.submit(_translate_chunk, statements,
+                                   _chunk_scopes(statements, symbols), module_declared,
+                                   translate_options, compile_options)
+                   for statements in chunks]
+        results = [future.result() for future in futures]
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    return _merge_chunks(results, module_declared, symbols.reserved, translate_options,
+                         compile_options)
+
+
+def _sort_declarations(match) -> str:
+    return ", ".join(sorted(match.group(1).split("\x03")))
+
+
+def _merge_chunks(results:list, module_declared:dict, reserved:set, translate_options:dict,
+                  compile_options:dict) -> str:
+    visitor = translator.TranslateVisitor(**translate_options)
+    allocator = NameAllocator(reserved)
+    names = {}
+
+    def get_name(prefix, rank):
+        name = allocator.get(prefix, rank)
+        if name not in names:
+            names[name] = visitor.process_idf(ecma_ast.Identifier(name)).value
+        return name
+
+    visitor.scope.new_scope()
+    for key, name in module_declared.items():
+        visitor.scope.set(key, ecma_ast.Identifier(name))
+
+    statements = []
+    references = set()
+    starts = {}
+
+    for result in results:
+        chunk_starts = dict(starts)
+
+        def replace(match):
+            prefix, rank = match.group(1), int(match.group(2))
+            return names[get_name(prefix, chunk_starts.get(prefix, 0) + rank)]
+
+        for text in result["statements"]:
+            text = PLACEHOLDER_RX.sub(replace, text)
+            text = DECLARATIONS_RX.sub(_sort_declarations, text)
+            statements.append(ecma_ast.Identifier(text))
+
+        for name in result["references"] or ():
+            references.add(PLACEHOLDER_RX.sub(replace, name))
+
+        for placeholder in result["temporaries"]:
+            prefix, rank = PLACEHOLDER_RX.match(placeholder).groups()
+            name = get_name(prefix, chunk_starts.get(prefix, 0) + int(rank))
+            visitor.scope.set(name, ecma_ast.Identifier(names[name]))
+
+        for prefix, count in result["counters"].items():
+            starts[prefix] = starts.get(prefix, 0) + count
+
+        if result["global_object"] is not None:
+            visitor.meta_global_object = result["global_object"]
+        if result["global_new"] is not None:
+            visitor.meta_global_new = result["global_new"]
+
+    program = visitor._translate_Module(None, statements)
+    if visitor.meta_optimize:
+        eliminator = optimizer.DeadCodeEliminator()
+        module_scope = optimizer.get_module_scope(program, visitor.meta_module_as_closure)
+        references.update(eliminator.get_references(module_scope))
+        eliminator.prune_declarations(module_scope, references)
+
+    return compiler.ECMAVisitor(**compile_options).visit(program)
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import threading
+import time
+
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from . import base
+from . import cache as compile_cache
+
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_MAX_SIZE = 4 * 1024 * 1024
+
+
+class Metrics(object):
+    """
+    Thread safe request counters of the compile server.
+
+    Keeps the latencies of the last ``size`` requests
+    to compute percentiles.
+    """
+
+    def __init__(self, size:int=1000):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self._latencies = collections.deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finish(self, latency:float, error=False):
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            self.errors += 1 if error else 0
+            self._latencies.append(latency)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            snapshot = {"requests": self.requests,
+                        "errors": self.errors,
+                        "queue_depth": self.in_flight}
+
+        for percentile in (50, 90, 99):
+            value = None
+            if latencies:
+                index = min(len(latencies) - 1, len(latencies) * percentile // 100)
+                value = round(latencies[index] * 1000, 3)
+            snapshot["latency_p{}_ms".format(percentile)] = value
+        return snapshot
+
+
+class CompileHandler(socketserver.StreamRequestHandler):
+    """
+    Handles a client connection: each line is a json
+    request and gets a json response line.
+
+    Requests are ``{"source": ..., "translate_options": ...,
+    "compile_options": ...}`` (options are optional) and
+    responses ``{"output": ..., "error": ..., "time": ...}``.
+    A ``{"command": "metrics"}`` request gets the metrics
+    snapshot of the server.
+    """
+
+    def handle(self):
+        max_size = self.server.max_size
+
+        while True:
+            line = self.rfile.readline(max_size + 1)
+            if not line:
+                break
+
+            if len(line) > max_size and not line.endswith(b"\n"):
+                self._respond({"output": None, "time": 0,
+                               "error": "request exceeds {} bytes".format(max_size)})
+                break
+
+            try:
+                request = json.loads(line.decode("utf-8"))
+            except ValueError as e:
+                self._respond({"output": None, "time": 0, "error": base._format_error(e)})
+                continue
+
+            if request.get("command") == "metrics":
+                self._respond(self.server.metrics_snapshot())
+            else:
+                self._respond(self.server.compile_request(request))
+
+    def _respond(self, response:dict):
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+class CompileServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Compile daemon listening on an unix domain socket.
+
+    Each connection is handled in its own thread. Sources are
+    compiled by a pool of warm worker processes, so a request
+    exceeding the time limit can be abandoned (the pool is
+    replaced and its processes killed) without blocking other
+    clients. Requests waiting on a replaced pool are submitted
+    again to the new one, and workers dying while compiling
+    are replaced by the pool. Compiled code is kept in an
+    in-memory cache shared by all clients.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path:str, jobs:int=None, timeout:float=DEFAULT_TIMEOUT,
+                 max_size:int=DEFAULT_MAX_SIZE, cache=None):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.timeout = timeout
+        self.max_size = max_size
+        self.cache = compile_cache.MemoryCache() if cache is None else cache
+        self.metrics = Metrics()
+        self._pool = multiprocessing.Pool(self.jobs)
+        self._pending = {self._pool: set()}
+        self._pool_lock = threading.Lock()
+        super().__init__(path, CompileHandler)
+
+    def _submit(self, data:str, translate_options:dict, compile_options:dict) -> tuple:
+        """
+        Submit a compile job to the current pool, returns the
+        pool and a future of the job result.
+        """
+        future = Future()
+        with self._pool_lock:
+            pool = self._pool
+            self._pending[pool].add(future)
+            pool.apply_async(base._compile_job, (data, translate_options, compile_options),
+                             callback=future.set_result, error_callback=future.set_exception)
+        return pool, future
+
+    def _discard(self, pool, future):
+        with self._pool_lock:
+            self._pending.get(pool, set()).discard(future)
+
+    def _recycle(self, pool):
+        with self._pool_lock:
+            if self._pool is not pool:
+                return
+            self._pool = multiprocessing.Pool(self.jobs)
+            self._pending[self._pool] = set()
+            pending = self._pending.pop(pool)
+
+        # Once terminated the pool doesn't call back anymore,
+        # the jobs left are failed so that they are retried.
+        pool.terminate()
+        for future in pending:
+            if not future.done():
+                future.set_exception(BrokenProcessPool("compile pool replaced"))
+
+    def _compile(self, data:str, translate_options:dict, compile_options:dict) -> tuple:
+        while True:
+            pool, future = self._submit(data, translate_options, compile_options)
+            try:
+                return future.result(timeout=self.timeout)
+            except TimeoutError:
+                # Also the result of a job whose worker died
+                self._recycle(pool)
+                return None, "TimeoutError: compile exceeds {} seconds".format(self.timeout)
+            except BrokenProcessPool:
+                # The pool has been replaced by a timed out request,
+                # run it again on the new one.
+                pass
+            finally:
+                self._discard(pool, future)
+
+    def compile_request(self, request:dict) -> dict:
+        started_at = time.perf_counter()
+        self.metrics.start()
+
+        output = error = None
+        try:
+            data = request["source"]
+            translate_options = request.get("translate_options") or {}
+            compile_options = request.get("compile_options") or {}
+
+            key = self.cache.key(data, translate_options, compile_options)
+            output = self.cache.get(key)
+            if output is None:
+                output, error = self._compile(data, translate_options, compile_options)
+                if output is not None:
+                    self.cache.set(key, output)
+        except Exception as e:
+            output, error = None, base._format_error(e)
+
+        elapsed = time.perf_counter() - started_at
+        self.metrics.finish(elapsed, error is not None)
+        return {"output": output, "error": error, "time": elapsed}
+
+    def metrics_snapshot(self) -> dict:
+        snapshot = self.metrics.snapshot()
+        stats = self.cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        snapshot["cache_hit_rate"] = stats["hits"] / lookups if lookups else None
+        snapshot["cache_entries"] = stats["entries"]
+        return snapshot
+
+    def server_close(self):
+        super().server_close()
+        self._pool.terminate()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+class Client(object):
+    """
+    Thin client of the compile server.
+    """
+
+    def __init__(self, path:str, timeout:float=None):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(path)
+        self._file = self._socket.makefile("rwb")
+
+    def request(self, request:dict) -> dict:
+        self._file.write(json.dumps(request).encode("utf-8") + b"\n")
+        self._file.flush()
+
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("compile server closed the connection")
+        return json.loads(line.decode("utf-8"))
+
+    def compile(self, data:str, translate_options=None, compile_options=None) -> dict:
+        return self.request({"source": data,
+                             "translate_options": translate_options or {},
+                             "compile_options": compile_options or {}})
+
+    def metrics(self) -> dict:
+        return self.request({"command": "metrics"})
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def serve(path:str, jobs:int=None, timeout:float=DEFAULT_TIMEOUT,
+          max_size:int=DEFAULT_MAX_SIZE):
+    if os.path.exists(path):
+        os.unlink(path)
+
+    server = CompileServer(path, jobs=jobs, timeout=timeout, max_size=max_size)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+import ast
+import collections
+import contextlib
+import time
+import tracemalloc
+
+from . import ast as ecma_ast
+
+
+class CompileStats(object):
+    """
+    Statistics of a compilation: wall and cpu time and peak
+    memory of each stage, node counts per python and ecma
+    node type and output size.
+
+    Peak memory of a stage is the peak size of the memory
+    allocated during it, traced with tracemalloc (None if
+    tracemalloc was already tracing memory when it started).
+    Tracing slows down allocations several times, so times
+    and peak memory are measured in separate runs of the
+    stages (see stage and trace_memory).
+    """
+
+    def __init__(self):
+        self.stages = collections.OrderedDict()
+        self.python_nodes = {}
+        self.ecma_nodes = {}
+        self.optimized_nodes = {}
+        self.output_bytes = 0
+
+    @contextlib.contextmanager
+    def stage(self, name:str):
+        started_at, cpu_started_at = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.stages[name] = {"wall_time": time.perf_counter() - started_at,
+                                 "cpu_time": time.process_time() - cpu_started_at,
+                                 "peak_memory": None}
+
+    @contextlib.contextmanager
+    def trace_memory(self, name:str):
+        tracing = not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+
+        try:
+            yield
+        finally:
+            if tracing:
+                peak_memory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                self.stages[name]["peak_memory"] = peak_memory
+
+    def count_python_nodes(self, tree):
+        counter = collections.Counter(node.__class__.__name__ for node in ast.walk(tree))
+        self.python_nodes = dict(sorted(counter.items()))
+
+    def count_ecma_nodes(self, tree):
+        counter = collections.Counter()
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, ecma_ast.Node):
+                counter[node.__class__.__name__] += 1
+                stack.extend(node)
+        self.ecma_nodes = dict(sorted(counter.items()))
+
+    def as_dict(self) -> dict:
+        return {"stages": dict(self.stages),
+                "total": {"wall_time": sum(s["wall_time"] for s in self.stages.values()),
+                          "cpu_time": sum(s["cpu_time"] for s in self.stages.values())},
+                "python_nodes": self.python_nodes,
+                "ecma_nodes": self.ecma_nodes,
+                "optimized_nodes": dict(sorted(self.optimized_nodes.items())),
+                "output_bytes": self.output_bytes}
+
+
+class CountingWriter(object):
+    """
+    Text sink that counts the utf-8 size of written
+    fragments before passing them to write.
+    """
+
+    def __init__(self, write):
+        self._write = write
+        self.size = 0
+
+    def write(self, chunk:str):
+        self.size += len(chunk.encode("utf-8"))
+        self._write(chunk)
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+import ast
+
+from .utils import DispatchMeta
+from .utils import node_classes
+from .utils import to_camel_case
+
+
+class SymbolTable(object, metaclass=DispatchMeta):
+    """
+    Scope analysis pre-pass over a python ast tree.
+
+    Computes up front, for each scope node (module and
+    functions), the names that should be hoisted into its
+    ``var`` statement and the set of reserved names (all
+    user identifiers of the tree) that autogenerated
+    temporaries must never use.
+
+    Declaration rules follow lexical scope handling of the
+    translator: a name is declared in the innermost scope
+    where it is assigned only if it is not yet visible from
+    it at that point of the (post-order) translation.
+    """
+
+    dispatch_tables = {"_enter_table": ("_enter_", None),
+                       "_leave_table": ("_leave_", None)}
+    dispatch_node_classes = node_classes(ast, ast.AST)
+
+    def __init__(self, tree, auto_camelcase=False):
+        self.auto_camelcase = auto_camelcase
+        self.scopes = {}
+        self.reserved = set()
+        self._stack = []
+
+        if tree is not None:
+            self._analyze(tree)
+
+    def declared(self, node) -> dict:
+        """
+        Given a scope node, returns a dict of declared
+        scope keys and its identifier names.
+        """
+        return self.scopes.get(node, {})
+
+    def process_name(self, name:str) -> str:
+        if self.auto_camelcase:
+            return to_camel_case(name)
+        return name
+
+    def _analyze(self, tree):
+        stack = [(tree, None)]
+
+        while stack:
+            node, leave = stack.pop()
+            if leave is not None:
+                leave(self, node)
+                continue
+
+            enter = self._enter_table[node.__class__]
+            if enter:
+                enter(self, node)
+
+            leave = self._leave_table[node.__class__]
+            if leave:
+                stack.append((node, leave))
+
+            children = list(ast.iter_child_nodes(node))
+            children.reverse()
+            stack.extend((child, None) for child in children)
+
+    def _reserve(self, name):
+        if name is not None:
+            self.reserved.add(name)
+            self.reserved.add(self.process_name(name))
+
+    def _is_visible(self, key):
+        return any(key in scope for scope in self._stack)
+
+    def _declare(self, key, name):
+        if self._stack and not self._is_visible(key):
+            self._stack[-1][key] = name
+
+    def _declare_target(self, target):
+        if isinstance(target, ast.Name) and target.id not in ("None", "True", "False"):
+            name = self.process_name(target.id)
+            self._declare(name, name)
+
+    # Enter hooks
+
+    def _enter_Module(self, node):
+        scope = self.scopes[node] = {}
+        self._stack.append(scope)
+
+    def _enter_FunctionDef(self, node):
+        self._reserve(node.name)
+        self._enter_Module(node)
+
+    def _enter_ClassDef(self, node):
+        self._reserve(node.name)
+
+    def _enter_Name(self, node):
+        self._reserve(node.id)
+
+    def _enter_arg(self, node):
+        self._reserve(node.arg)
+
+    def _enter_alias(self, node):
+        self._reserve(node.name)
+        self._reserve(node.asname)
+
+    def _enter_ExceptHandler(self, node):
+        self._reserve(node.name)
+
+    # Leave hooks
+
+    def _leave_Module(self, node):
+        self._stack.pop()
+
+    def _leave_FunctionDef(self, node):
+        self._stack.pop()
+        self._declare(node.name, self.process_name(node.name))
+
+    def _leave_ClassDef(self, node):
+        for stmt in node.body:
+            if isinstance(stmt, ast.FunctionDef) and self.process_name(stmt.name) == "__init__":
+                if self._stack:
+                    self._stack[-1].pop("__init__", None)
+                break
+        self._declare(node.name, self.process_name(node.name))
+
+    def _leave_Assign(self, node):
+        for target in node.targets:
+            self._declare_target(target)
+
+    def _leave_AugAssign(self, node):
+        if not isinstance(node.op, (ast.Pow, ast.FloorDiv)):
+            self._declare_target(node.target)
+
+    def _leave_Delete(self, node):
+        for target in node.targets:
+            self._declare_target(target)
+
+    def _leave_For(self, node):
+        if isinstance(node.target, (ast.Tuple, ast.List)):
+            for target in node.target.elts:
+                self._declare_target(target)
+        else:
+            self._declare_target(node.target)
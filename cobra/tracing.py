@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import os
+import sys
+import threading
+
+
+class Tracer(object):
+    """
+    Base class of translation tracers.
+
+    A tracer installed on a TranslateVisitor (``tracer``
+    option) is called when the translator enters a python
+    node (before its childs are translated) and when it exits
+    it (with the translated result). Both callbacks receive
+    a ``time.perf_counter()`` timestamp.
+    """
+
+    def enter(self, node, timestamp:float):
+        pass
+
+    def exit(self, node, timestamp:float, result):
+        pass
+
+
+class DebugTracer(Tracer):
+    """
+    Print entered and exited nodes indented by depth
+    (the translator ``debug`` option).
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.depth = 0
+
+    def _print(self, *args):
+        print("    " * self.depth, *args, file=self.stream or sys.stdout)
+
+    def enter(self, node, timestamp:float):
+        self._print("enter:", node)
+        self.depth += 1
+
+    def exit(self, node, timestamp:float, result):
+        self.depth -= 1
+        self._print("result:", result)
+        self._print("exit:", node)
+
+
+class ChromeTracer(Tracer):
+    """
+    Record a duration event per translated node, exportable
+    as a chrome trace event json file (chrome://tracing or
+    https://ui.perfetto.dev).
+    """
+
+    def __init__(self):
+        self.events = []
+        self._pid = os.getpid()
+
+    def _event(self, node, timestamp:float, phase:str) -> dict:
+        return {"name": node.__class__.__name__,
+                "cat": "translate",
+                "ph": phase,
+                "ts": timestamp * 1e6,
+                "pid": self._pid,
+                "tid": threading.get_ident()}
+
+    def enter(self, node, timestamp:float):
+        event = self._event(node, timestamp, "B")
+        lineno = getattr(node, "lineno", None)
+        if lineno is not None:
+            event["args"] = {"lineno": lineno}
+        self.events.append(event)
+
+    def exit(self, node, timestamp:float, result):
+        self.events.append(self._event(node, timestamp, "E"))
+
+    def as_dict(self) -> dict:
+        return {"traceEvents": self.events, "displayTimeUnit": "ms"}
+
+    def dump(self, path:str):
+        with io.open(path, "wt") as f:
+            json.dump(self.as_dict(), f)
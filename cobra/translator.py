@@ -2,41 +2,149 @@
 
 import ast
 import re
+import time
 from collections import defaultdict
 
+from .utils import DispatchMeta
 from .utils import GenericStack
 from .utils import LeveledStack
 from .utils import ScopeStack
 from .utils import to_camel_case
 from .utils import normalize
+from .utils import node_classes
+from .symbols import SymbolTable
+from .tracing import DebugTracer
 
 from . import ast as ecma_ast
+from . import optimizer
+
+
+def _get_int_constant(node):
+    """
+    Given a python expression node, returns its value if it
+    is an integer literal (optionally negated) or None.
+    """
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        value = _get_int_constant(node.operand)
+        return None if value is None else -value
+
+    if isinstance(node, ast.Num) and isinstance(node.n, int):
+        return node.n
+    return None
+
+
+def _is_method_definition(node):
+    """
+    Check if a python class body statement only defines a
+    method (docstrings and ``pass`` define nothing).
+    """
+    if isinstance(node, ast.FunctionDef):
+        return not node.decorator_list
+    if isinstance(node, ast.Expr):
+        return isinstance(node.value, ast.Str)
+    return isinstance(node, ast.Pass)
+
+
+def _get_inlined_statements(statement):
+    """
+    Given a translated statement, returns the statements
+    replacing it if it can be inlined (see inline_closures),
+    else None.
+    """
+    inline_statements = getattr(statement, "_inline_statements", None)
+    if inline_statements is not None:
+        return inline_statements
+
+    if isinstance(statement, ecma_ast.Return):
+        holder, field = statement, "expr"
+    elif (isinstance(statement, ecma_ast.ExprStatement)
+            and isinstance(statement.expr, ecma_ast.Assign) and statement.expr.op == "="):
+        # Multiple targets are chained assignments
+        holder, field = statement.expr, "right"
+        while isinstance(holder.right, ecma_ast.Assign) and holder.right.op == "=":
+            holder = holder.right
+    else:
+        return None
+
+    comprehension = getattr(getattr(holder, field), "_comprehension", None)
+    if comprehension is None:
+        return None
+
+    comprehension_statements, results_idf = comprehension
+    setattr(holder, field, results_idf)
+    return comprehension_statements + [statement]
+
+
+def inline_closures(tree):
+    """
+    Replace the immediately invoked functions of translated
+    classes and list comprehensions with their statements,
+    in place.
+
+    Classes are inlined when they are translated with flat
+    prototype assignments, and comprehensions when they are
+    assigned or returned (elsewhere their statements can't
+    run before the enclosing expression). Comprehension
+    temporaries are already declared in the enclosing scope.
+    """
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if node.__class__ in optimizer.STATEMENT_LISTS:
+            pending = list(reversed(optimizer.get_statements(node)))
+            statements = []
+            while pending:
+                statement = pending.pop()
+                inlined_statements = _get_inlined_statements(statement)
+                if inlined_statements is None:
+                    statements.append(statement)
+                else:
+                    # Inlined statements may be inlined too
+                    pending.extend(reversed(inlined_statements))
+            optimizer.get_statements(node)[:] = statements
+
+        # Comprehensions left as functions keep their own
+        # temporaries, they are not walked.
+        stack.extend(child for child in node if isinstance(child, ecma_ast.Node)
+                         and getattr(child, "_comprehension", None) is None)
+    return tree
 
 
-class TranslateVisitor(ast.NodeVisitor):
-    def __init__(self, module_as_closure=False, auto_camelcase=False, debug=True):
+class TranslateVisitor(ast.NodeVisitor, metaclass=DispatchMeta):
+    dispatch_tables = {"_enter_table": ("_enter_", None),
+                       "_exit_table": ("_exit_", None),
+                       "_translate_table": ("_translate_", None)}
+    dispatch_node_classes = node_classes(ast, ast.AST)
+
+    def __init__(self, module_as_closure=False, auto_camelcase=False, debug=False,
+                 tracer=None, optimize=False):
         super().__init__()
 
         self.level_stack = LeveledStack()
         self.bin_op_stack = GenericStack()
+        self.loop_stack = GenericStack()
+        self.loop_labels = {}
         self.scope = ScopeStack()
+        self.symbols = None
 
         self.references = defaultdict(lambda: 0)
-        self.indentation = 0
 
+        if tracer is None and debug:
+            tracer = DebugTracer()
+
+        self.tracer = tracer
         self.meta_debug = debug
         self.meta_auto_camelcase = auto_camelcase
         self.meta_module_as_closure = module_as_closure
+        self.meta_optimize = optimize
         self.meta_global_object = None
         self.meta_global_new = None
 
-    def print(self, *args, **kwargs):
-        if self.meta_debug:
-            prefix = "    " * self.indentation
-            print(prefix, *args, **kwargs)
-
     def translate(self, tree):
-        return self.visit(tree, root=True)
+        program = inline_closures(self.visit(tree, root=True))
+        if self.meta_optimize:
+            program = optimizer.optimize(program, module_as_closure=self.meta_module_as_closure)
+        return program
 
     def process_idf(self, identifier):
         if self.meta_auto_camelcase:
@@ -44,49 +152,124 @@ class TranslateVisitor(ast.NodeVisitor):
         return identifier
 
     def visit(self, node, root=False):
-        self.level_stack.inc_level()
+        """
+        Translate a python ast tree without recursion: nodes
+        are walked in the same order as ``generic_visit`` does,
+        but driven by an explicit work stack so that very deep
+        trees do not hit the interpreter recursion limit.
+        """
+        if root or self.symbols is None:
+            self.symbols = SymbolTable(node, auto_camelcase=self.meta_auto_camelcase)
+
+        if self.tracer is not None:
+            return self._traced_visit(node)
+
+        js_node = None
+        stack = [(node, False)]
+
+        while stack:
+            node, leaving = stack.pop()
+            if leaving:
+                js_node = self._leave_node(node)
+                continue
+
+            self._enter_node(node)
+            stack.append((node, True))
+
+            children = list(ast.iter_child_nodes(node))
+            children.reverse()
+            stack.extend((child, False) for child in children)
 
-        self.print("enter:", node)
+        return js_node
+
+    def _traced_visit(self, node):
+        """
+        Same walk as visit, calling the tracer enter and
+        exit callbacks around each node. Kept apart so that
+        the untraced walk has no tracing overhead at all.
+        """
+        tracer = self.tracer
+        clock = time.perf_counter
+
+        js_node = None
+        stack = [(node, False)]
+
+        while stack:
+            node, leaving = stack.pop()
+            if leaving:
+                js_node = self._leave_node(node)
+                tracer.exit(node, clock(), js_node)
+                continue
+
+            tracer.enter(node, clock())
+            self._enter_node(node)
+            stack.append((node, True))
+
+            children = list(ast.iter_child_nodes(node))
+            children.reverse()
+            stack.extend((child, False) for child in children)
+
+        return js_node
+
+    def _enter_node(self, node):
+        self.level_stack.inc_level()
 
         if isinstance(node, (ast.Module, ast.FunctionDef)):
             self.scope.new_scope()
 
-        self.indentation += 1
+            # Hoisted names are computed by the symbol table pre-pass
+            for key, name in self.symbols.declared(node).items():
+                self.scope.set(key, ecma_ast.Identifier(name))
 
-        super().visit(node)
-        self.indentation -= 1
+        hook = self._enter_table[node.__class__]
+        if hook:
+            hook(self, node)
 
-        js_node = self._translate_node(node, self.level_stack.get_value())
+    def _leave_node(self, node):
+        hook = self._exit_table[node.__class__]
+        if hook:
+            hook(self, node)
 
-        self.print("childs:", self.level_stack.get_value())
-        self.print("exit:", node)
+        js_node = self._translate_node(node, self.level_stack.get_value())
 
         self.level_stack.dec_level()
-
-        if js_node is not None:
-            self.level_stack.append(js_node)
+        self.level_stack.append(js_node)
 
         return js_node
 
-    # Special visit fields
+    # Special enter/exit hooks
+    # (called before visiting childs and after visiting them)
 
-    def visit_BinOp(self, node):
+    def _enter_BinOp(self, node):
         self.bin_op_stack.push(node)
-        self.generic_visit(node)
+
+    def _exit_BinOp(self, node):
         self.bin_op_stack.pop()
 
-    def visit_BoolOp(self, node):
+    def _enter_BoolOp(self, node):
         self.bin_op_stack.push(node)
-        self.generic_visit(node)
+
+    def _exit_BoolOp(self, node):
         self.bin_op_stack.pop()
 
+    def _enter_For(self, node):
+        self.loop_stack.push((node, self.level_stack.level))
+
+    def _exit_For(self, node):
+        self.loop_stack.pop()
+
+    def _enter_While(self, node):
+        self.loop_stack.push((node, self.level_stack.level))
+
+    def _exit_While(self, node):
+        self.loop_stack.pop()
+
     # Compile methods
 
     def _translate_node(self, node, childs):
-        name = node.__class__.__name__
-        fn = getattr(self, "_translate_{}".format(name), None)
+        fn = self._translate_table[node.__class__]
         if fn:
-            return fn(node, childs)
+            return fn(self, node, childs)
 
     # Specific compile methods
 
@@ -183,8 +366,6 @@ class TranslateVisitor(ast.NodeVisitor):
     def _translate_Delete(self, node, childs):
         deletes = []
         for child in childs:
-            if child.value not in self.scope:
-                self.scope.set(child.value, child)
             deletes.append(ecma_ast.ExprStatement(ecma_ast.UnaryOp('delete', child)))
         return ecma_ast.SetOfNodes(deletes)
 
@@ -223,9 +404,6 @@ class TranslateVisitor(ast.NodeVisitor):
         # Drop inner scope (temporary is unused)
         self.scope.drop_scope()
 
-        if node.name not in self.scope:
-            self.scope.set(node.name, identifier)
-
         expr_stmt = ecma_ast.ExprStatement(var_decl)
 
         # Add fast link to func expression
@@ -309,6 +487,45 @@ class TranslateVisitor(ast.NodeVisitor):
     def _translate_alias(self, node, childs):
         return node.__dict__
 
+    def _translate_fields(self, node, childs, fields):
+        """
+        Map already translated childs to the node fields
+        they come from (absent fields are mapped to None).
+        """
+        translated = iter(childs)
+        return {field: next(translated) if getattr(node, field, None) is not None else None
+                    for field in fields}
+
+    def _group_childs(self, node, childs):
+        """
+        Group already translated childs by the node fields
+        they come from (statement list fields are mapped to
+        lists of statements).
+
+        A statement can be translated into no nodes (``pass``)
+        or into a set of nodes flattened into the childs, so
+        they are grouped by the number of nodes each python
+        child was translated into.
+        """
+        sizes = iter(self.level_stack.get_sizes())
+        translated = iter(childs)
+        groups = {}
+
+        for field, value in ast.iter_fields(node):
+            if isinstance(value, list):
+                groups[field] = [child for item in value if isinstance(item, ast.AST)
+                                     for _, child in zip(range(next(sizes)), translated)]
+            elif isinstance(value, ast.AST):
+                group = [child for _, child in zip(range(next(sizes)), translated)]
+                groups[field] = group[0] if group else None
+        return groups
+
+    def _translate_Slice(self, node, childs):
+        return self._translate_fields(node, childs, ("lower", "upper", "step"))
+
+    def _translate_comprehension(self, node, childs):
+        return {"target": childs[0], "iter": childs[1], "ifs": childs[2:]}
+
     def _translate_Expr(self, node, childs):
         return ecma_ast.ExprStatement(childs[0])
 
@@ -316,6 +533,12 @@ class TranslateVisitor(ast.NodeVisitor):
         return childs
 
     def _translate_Break(self, node, childs):
+        loop, depth = self._get_current_loop()
+
+        # Breaking a for loop with else clause also skips
+        # the else statements (see _translate_For)
+        if isinstance(loop, ast.For) and loop.orelse:
+            return ecma_ast.Break(self._get_loop_label(loop, depth))
         return ecma_ast.Break()
 
     def _translate_Continue(self, node, childs):
@@ -334,6 +557,11 @@ class TranslateVisitor(ast.NodeVisitor):
         name = node.id
         return self.process_idf(ecma_ast.Identifier(name))
 
+    def _translate_NameConstant(self, node, childs):
+        if node.value is None:
+            return ecma_ast.Null("None")
+        return ecma_ast.Boolean("true" if node.value else "false")
+
     def _translate_arg(self, node, childs):
         return self.process_idf(ecma_ast.Identifier(node.arg))
 
@@ -377,10 +605,6 @@ class TranslateVisitor(ast.NodeVisitor):
         else:
             op, value = childs[1], childs[2]
 
-            if isinstance(target, ecma_ast.Identifier):
-                if target.value not in self.scope:
-                    self.scope.set(target.value, target)
-
             if assign_decl is None:
                 assign_decl = ecma_ast.Assign(op + "=", target, value)
             else:
@@ -396,10 +620,6 @@ class TranslateVisitor(ast.NodeVisitor):
         extra_exprs = []
 
         for target in reversed(identifiers):
-            if isinstance(target, ecma_ast.Identifier):
-                if target.value not in self.scope:
-                    self.scope.set(target.value, target)
-
             # Multiple assignation
             if isinstance(target, ecma_ast.Array) and isinstance(value, ecma_ast.Array):
                 # Mock array target with identifier
@@ -431,18 +651,19 @@ class TranslateVisitor(ast.NodeVisitor):
     def _translate_Subscript(self, node, childs):
         node_identifier = childs[0]
 
-        if hasattr(node.slice, 'lower') or hasattr(node.slice, 'upper') or hasattr(node.slice, 'step'):
-            if hasattr(node.slice, 'step') and node.slice.step:
+        if isinstance(node.slice, ast.Slice):
+            slice_fields = childs[1]
+            if slice_fields["step"] is not None:
                 raise NotImplementedError(":D")
 
             slice_values = []
-            if hasattr(node.slice, 'lower') and node.slice.lower:
-                slice_values.append(self.translate(node.slice.lower))
+            if slice_fields["lower"] is not None:
+                slice_values.append(slice_fields["lower"])
             else:
                 slice_values.append(ecma_ast.Number("0"))
 
-            if hasattr(node.slice, 'upper') and node.slice.upper:
-                slice_values.append(self.translate(node.slice.upper))
+            if slice_fields["upper"] is not None:
+                slice_values.append(slice_fields["upper"])
 
             da = ecma_ast.DotAccessor(node_identifier, ecma_ast.Identifier("slice"))
             return ecma_ast.FunctionCall(da, slice_values)
@@ -476,19 +697,17 @@ class TranslateVisitor(ast.NodeVisitor):
         return ecma_ast.Object(properties)
 
     def _translate_If(self, node, childs):
-        predicate = childs[0]
+        groups = self._group_childs(node, childs)
+        predicate = groups["test"]
 
         # consecuent
-        consequent_blocks_size = len(node.body)
-        consequent_blocks = childs[1:consequent_blocks_size+1]
-        consequent = ecma_ast.Block(consequent_blocks)
+        consequent = ecma_ast.Block(groups["body"])
 
         # alternative
-        alternative_blocks_size = len(node.orelse)
-        alternative_blocks = childs[consequent_blocks_size+1:]
+        alternative_blocks = groups["orelse"]
 
-        if alternative_blocks_size > 0:
-            if alternative_blocks_size == 1 and isinstance(alternative_blocks[0], ecma_ast.If):
+        if node.orelse:
+            if len(alternative_blocks) == 1 and isinstance(alternative_blocks[0], ecma_ast.If):
                 alternative = alternative_blocks[0]
             else:
                 alternative = ecma_ast.Block(alternative_blocks)
@@ -505,24 +724,22 @@ class TranslateVisitor(ast.NodeVisitor):
         return binop
 
     def get_unique_identifier(self, prefix="ref"):
-        for i in range(100000000):
-            candidate = "{}_{}".format(prefix, i)
-            if candidate not in self.scope:
-                identifier = self.process_idf(ecma_ast.Identifier(candidate))
-                self.scope.set(candidate, identifier)
-                return identifier
+        candidate = self.scope.next_name(prefix, self.symbols.reserved)
+        identifier = self.process_idf(ecma_ast.Identifier(candidate))
+        self.scope.set(candidate, identifier)
+        return identifier
 
     def _translate_While(self, node, childs):
-        predicate = childs[0]
+        groups = self._group_childs(node, childs)
+        predicate = groups["test"]
 
         # consecuent
-        body_blocks_size = len(node.body)
-        body = childs[1:body_blocks_size+1]
+        body = groups["body"]
 
         else_body = None
         if node.orelse:
             else_condition_idf = self.get_unique_identifier()
-            else_body = childs[body_blocks_size+1:]
+            else_body = groups["orelse"]
 
         if else_body is None:
             return ecma_ast.While(predicate, ecma_ast.Block(body))
@@ -544,51 +761,63 @@ class TranslateVisitor(ast.NodeVisitor):
         if len(node.generators) != 1:
             raise RuntimeError("Only implemented 1 generator per comprehension")
 
-        generator = node.generators[0]
-        values = generator.iter
-        target = generator.target
-        expresion = childs
-        ifs = generator.ifs
+        # Childs are the translated element followed by
+        # the translated generators (see _translate_comprehension)
+        generator = childs[1]
+        values = generator["iter"]
+        ifs = generator["ifs"]
 
         counter_idf = self.get_unique_identifier("_i")
-        len_idf = self.get_unique_identifier("_len")
-        values_idf = self.get_unique_identifier("_values")
-        results_idf = self.get_unique_identifier("_results")
+        range_step = self._get_range_step(node.generators[0].iter)
+
+        if range_step is not None:
+            # Counting loop over range() values, without
+            # allocating the values array
+            init, cond, count, stop_idf = self._create_range_loop(
+                node.generators[0].iter, values.args, range_step, counter_idf)
+            results_idf = self.get_unique_identifier("_results")
+
+            var_idfs = [counter_idf, stop_idf, results_idf]
+            initialize_stmts = []
+            value = counter_idf
+        else:
+            len_idf = self.get_unique_identifier("_len")
+            values_idf = self.get_unique_identifier("_values")
+            results_idf = self.get_unique_identifier("_results")
 
-        counter_var_decl = ecma_ast.VarDecl(counter_idf)
-        len_var_decl = ecma_ast.VarDecl(len_idf)
-        values_var_decl = ecma_ast.VarDecl(values_idf)
-        results_var_decl = ecma_ast.VarDecl(results_idf)
+            var_idfs = [counter_idf, len_idf, values_idf, results_idf]
+            initialize_stmts = [ecma_ast.ExprStatement(ecma_ast.Assign("=", values_idf, values))]
+            value = ecma_ast.BracketAccessor(values_idf, counter_idf)
 
-        var_stmt = ecma_ast.VarStatement([counter_var_decl, len_var_decl, values_var_decl, results_var_decl])
+            # For init
+            init = ecma_ast.Comma(
+                ecma_ast.Assign("=", counter_idf, ecma_ast.Number("0")),
+                ecma_ast.Assign("=", len_idf, ecma_ast.DotAccessor(values_idf, ecma_ast.Identifier("length")))
+            )
 
-        initialize_values = ecma_ast.ExprStatement(ecma_ast.Assign("=", values_idf, self.translate(values)))
-        initialize_results = ecma_ast.ExprStatement(ecma_ast.Assign("=", results_idf, ecma_ast.Array([])))
+            # For condition
+            cond = ecma_ast.BinOp("<", counter_idf, len_idf)
 
-        # For init
-        init = ecma_ast.Comma(
-            ecma_ast.Assign("=", counter_idf, ecma_ast.Number("0")),
-            ecma_ast.Assign("=", len_idf, ecma_ast.DotAccessor(values_idf, ecma_ast.Identifier("length")))
-        )
+            # For count
+            count = ecma_ast.UnaryOp("++", counter_idf, postfix=True)
 
-        # For condition
-        cond = ecma_ast.BinOp("<", counter_idf, len_idf)
+        var_stmt = ecma_ast.VarStatement([ecma_ast.VarDecl(idf) for idf in var_idfs if idf is not None])
 
-        # For count
-        count = ecma_ast.UnaryOp("++", counter_idf, postfix=True)
+        initialize_results = ecma_ast.ExprStatement(ecma_ast.Assign("=", results_idf, ecma_ast.Array([])))
+        initialize_stmts.append(initialize_results)
 
         push_on_results = ecma_ast.FunctionCall(
             ecma_ast.DotAccessor(results_idf, ecma_ast.Identifier("push")),
-            ecma_ast.ExprStatement(ecma_ast.BracketAccessor(values_idf, counter_idf))
+            ecma_ast.ExprStatement(value)
         )
 
         if ifs:
             composed_condition = None
             for comprehension_cond in ifs:
                 if composed_condition is None:
-                    composed_condition = self.translate(comprehension_cond)
+                    composed_condition = comprehension_cond
                 else:
-                    composed_condition = ecma_ast.BinOp("&&", composed_condition, self.translate(comprehension_cond))
+                    composed_condition = ecma_ast.BinOp("&&", composed_condition, comprehension_cond)
             for_loop_block = ecma_ast.Block([ecma_ast.If(composed_condition, ecma_ast.Block([push_on_results]))])
         else:
             for_loop_block = ecma_ast.Block([push_on_results])
@@ -597,51 +826,182 @@ class TranslateVisitor(ast.NodeVisitor):
 
         return_results = ecma_ast.Return(results_idf)
 
-        func_block = ecma_ast.Block([var_stmt, initialize_values, initialize_results, for_stmt, return_results])
+        func_block = ecma_ast.Block([var_stmt] + initialize_stmts + [for_stmt, return_results])
 
         func_expr = ecma_ast.FuncExpr(None, None, func_block)
         func_expr._parens = True
 
         listcomp_stmt = ecma_ast.FunctionCall(func_expr)
 
+        # Add fast link to the comprehension statements,
+        # inlined where it is assigned or returned
+        # (see inline_closures)
+        listcomp_stmt._comprehension = (initialize_stmts + [for_stmt], results_idf)
+
         return listcomp_stmt
 
-    def _translate_For(self, node, childs):
-        counter_idf = self.get_unique_identifier()
-        iterable_idf = self.get_unique_identifier()
+    def _get_current_loop(self):
+        """
+        Returns the innermost python loop whose body is being
+        translated and its nesting depth (None, None if there
+        is not any).
+
+        Loops are kept on the loop stack while their else
+        clause is translated, but a break there applies to
+        the enclosing loop, so they are skipped once all
+        their body statements are translated.
+        """
+        loops = list(self.loop_stack)
+        for depth in range(len(loops) - 1, -1, -1):
+            node, level = loops[depth]
+            body_end = len(node.body) + (2 if isinstance(node, ast.For) else 1)
+            if len(self.level_stack.sizes[level]) < body_end:
+                return node, depth
+        return None, None
+
+    def _get_loop_label(self, node, depth):
+        """
+        Given a python loop node and its nesting depth,
+        returns its label identifier.
+
+        Labels are named by loop nesting depth: they only
+        have to be unique between enclosing statements and
+        do not clash with variable names.
+        """
+        if node not in self.loop_labels:
+            label = "_loop_{}".format(depth)
+            self.loop_labels[node] = ecma_ast.Identifier(label)
+        return self.loop_labels[node]
+
+    def _get_range_step(self, node):
+        """
+        Given the iterable of a python loop, returns the step
+        of the counting loop it can be translated into when it
+        is a ``range()`` call with a constant step, else None.
+        """
+        if (not isinstance(node, ast.Call) or not isinstance(node.func, ast.Name)
+                or node.func.id != "range" or "range" in self.scope):
+            return None
+
+        if node.keywords or not 1 <= len(node.args) <= 3:
+            return None
+
+        if any(isinstance(arg, ast.Starred) for arg in node.args):
+            return None
+
+        if len(node.args) < 3:
+            return 1
+
+        # A zero step raises an error on python, so it is
+        # left to the range() call.
+        return _get_int_constant(node.args[2]) or None
+
+    def _create_range_loop(self, node, args, step, counter_idf):
+        """
+        Given a python ``range()`` call (see _get_range_step),
+        its translated arguments, its step and the loop counter
+        identifier, returns the init, condition and count of the
+        counting loop and the identifier of the cached stop
+        value (None if it is a constant).
+        """
+        if len(args) == 1:
+            start, stop = ecma_ast.Number("0"), args[0]
+        else:
+            start, stop = args[0], args[1]
 
-        item_idf = childs[0]
-        iterable = childs[1]
-        main_body_expr = childs[2]
+        init = ecma_ast.Assign("=", counter_idf, start)
 
-        iterable_var_decl = ecma_ast.VarDecl(iterable_idf, iterable)
-        iterable_var_stmt = ecma_ast.VarStatement(iterable_var_decl)
+        stop_idf = None
+        if _get_int_constant(node.args[0 if len(args) == 1 else 1]) is None:
+            stop_idf = self.get_unique_identifier("_stop")
+            init = ecma_ast.Comma(init, ecma_ast.Assign("=", stop_idf, stop))
+            stop = stop_idf
 
         # For condition
-        cond_right_stmt = ecma_ast.DotAccessor(iterable_idf, ecma_ast.Identifier("length"))
-        cond = ecma_ast.BinOp("<", counter_idf, cond_right_stmt)
+        cond = ecma_ast.BinOp("<" if step > 0 else ">", counter_idf, stop)
 
         # For count
-        count = ecma_ast.UnaryOp("++", counter_idf, postfix=True)
+        if step == 1:
+            count = ecma_ast.UnaryOp("++", counter_idf, postfix=True)
+        elif step == -1:
+            count = ecma_ast.UnaryOp("--", counter_idf, postfix=True)
+        elif step > 0:
+            count = ecma_ast.Assign("+=", counter_idf, ecma_ast.Number(str(step)))
+        else:
+            count = ecma_ast.Assign("-=", counter_idf, ecma_ast.Number(str(-step)))
+
+        return init, cond, count, stop_idf
 
-        # For init
-        init_first = ecma_ast.Assign("=", counter_idf, ecma_ast.Number("0"))
-        init_second = ecma_ast.Assign("=", iterable_idf, iterable)
-        init = ecma_ast.Comma(init_first, init_second)
+    def _translate_For(self, node, childs):
+        counter_idf = self.get_unique_identifier()
+
+        groups = self._group_childs(node, childs)
+        item_idf = groups["target"]
+        iterable = groups["iter"]
+        body_blocks = groups["body"]
+        else_blocks = groups["orelse"]
+
+        range_step = None
+        if isinstance(item_idf, ecma_ast.Identifier):
+            range_step = self._get_range_step(node.iter)
+
+        if range_step is not None:
+            # Counting loop over range() values, without
+            # allocating the values array. The target is
+            # assigned from a separate counter so that
+            # reassigning it in the body does not alter
+            # the loop.
+            init, cond, count, _ = self._create_range_loop(node.iter, iterable.args,
+                                                           range_step, counter_idf)
+            item = counter_idf
+        else:
+            iterable_idf = self.get_unique_identifier()
+            len_idf = self.get_unique_identifier("_len")
+
+            # For init (the iterable is evaluated only once)
+            init = ecma_ast.Comma(
+                ecma_ast.Comma(
+                    ecma_ast.Assign("=", counter_idf, ecma_ast.Number("0")),
+                    ecma_ast.Assign("=", iterable_idf, iterable)),
+                ecma_ast.Assign("=", len_idf, ecma_ast.DotAccessor(iterable_idf, ecma_ast.Identifier("length")))
+            )
+
+            # For condition
+            cond = ecma_ast.BinOp("<", counter_idf, len_idf)
+
+            # For count
+            count = ecma_ast.UnaryOp("++", counter_idf, postfix=True)
+
+            item = ecma_ast.BracketAccessor(iterable_idf, counter_idf)
 
         # For body
-        accesor = ecma_ast.BracketAccessor(iterable_idf, counter_idf)
-        item_body_stmt = ecma_ast.ExprStatement(
-                            ecma_ast.Assign("=", item_idf, accesor))
-        if item_idf.value not in self.scope:
-            self.scope.set(item_idf.value, item_idf)
+        if isinstance(item_idf, ecma_ast.Array):
+            # Tuple target: each name is assigned from the item
+            # (see multiple assignation on _translate_Assign)
+            item_ref_idf = self.get_unique_identifier("_ref")
+            item_body_stmts = [ecma_ast.ExprStatement(ecma_ast.Assign("=", item_ref_idf, item))]
+            for i, target in enumerate(item_idf):
+                target_item = ecma_ast.BracketAccessor(item_ref_idf, ecma_ast.Number(str(i)))
+                item_body_stmts.append(ecma_ast.ExprStatement(
+                    ecma_ast.Assign("=", target, target_item)))
+        else:
+            item_body_stmts = [ecma_ast.ExprStatement(ecma_ast.Assign("=", item_idf, item))]
 
-        body_block = ecma_ast.Block([item_body_stmt, main_body_expr])
+        body_block = ecma_ast.Block(item_body_stmts + body_blocks)
 
         # For
         for_stmt = ecma_ast.For(init, cond, count, body_block)
 
-        return for_stmt
+        if not else_blocks:
+            return for_stmt
+
+        # For else: the loop and the else statements are
+        # wrapped in a labeled block, and breaks of the loop
+        # leave the block (see _translate_Break)
+        label = self.loop_labels.pop(node, None)
+        if label is None:
+            return ecma_ast.SetOfNodes([for_stmt] + else_blocks)
+        return ecma_ast.Label(label, ecma_ast.Block([for_stmt] + else_blocks))
 
     def _translate_Raise(self, node, childs):
         return ecma_ast.Throw(childs[0])
@@ -687,7 +1047,6 @@ class TranslateVisitor(ast.NodeVisitor):
         for fn in functions:
             if fn._identifier.value == "__init__":
                 constructor_func_expr = fn
-                self.scope.unset("__init__")
                 break
 
         if constructor_func_expr is None:
@@ -695,24 +1054,12 @@ class TranslateVisitor(ast.NodeVisitor):
         else:
             functions = list(filter(lambda x: x is not constructor_func_expr, functions))
 
+        main_identifier = self.process_idf(ecma_ast.Identifier(node.name))
+
         self.scope.new_scope()
         inner_class_idf = self.get_unique_identifier("classref")
 
-        assign_expr = ecma_ast.Assign("=", inner_class_idf, constructor_func_expr)
-        constructor_expr = ecma_ast.ExprStatement(assign_expr)
-
-        body_stmts = [constructor_expr]
-
-        # Functions definition
-        for fn in functions:
-            fn_dt_prototype = ecma_ast.DotAccessor(inner_class_idf,
-                                                   ecma_ast.Identifier("prototype"))
-            fn_dt_attr = ecma_ast.DotAccessor(fn_dt_prototype, fn._identifier)
-            fn_assign_expr = ecma_ast.Assign("=", fn_dt_attr, fn)
-            fn_expr = ecma_ast.ExprStatement(fn_assign_expr)
-
-            body_stmts.append(fn_expr)
-
+        body_stmts = self._create_class_statements(inner_class_idf, constructor_func_expr, functions)
         body_stmts.append(ecma_ast.Return(inner_class_idf))
 
         # Class closure
@@ -721,13 +1068,34 @@ class TranslateVisitor(ast.NodeVisitor):
         main_container_func = ecma_ast.FuncExpr(None, None, [scope_var_statement] + body_stmts)
         main_container_func._parens = True
         main_function_call = ecma_ast.FunctionCall(main_container_func)
-        main_identifier = self.process_idf(ecma_ast.Identifier(node.name))
         main_assign = ecma_ast.Assign("=", main_identifier, main_function_call)
         main_expr = ecma_ast.ExprStatement(main_assign)
 
         self.scope.drop_scope()
 
-        if node.name not in self.scope:
-            self.scope.set(node.name, main_identifier)
+        # Classes with methods only don't need the closure: add
+        # fast link to the flat definition (see inline_closures)
+        if all(map(_is_method_definition, node.body)):
+            main_expr._inline_statements = self._create_class_statements(
+                main_identifier, constructor_func_expr, functions)
 
         return main_expr
+
+    def _create_class_statements(self, class_idf, constructor_func_expr, functions):
+        """
+        Given the identifier holding a class, its constructor and
+        its methods function expressions, returns the statements
+        defining it.
+        """
+        assign_expr = ecma_ast.Assign("=", class_idf, constructor_func_expr)
+        body_stmts = [ecma_ast.ExprStatement(assign_expr)]
+
+        # Functions definition
+        for fn in functions:
+            fn_dt_prototype = ecma_ast.DotAccessor(class_idf,
+                                                   ecma_ast.Identifier("prototype"))
+            fn_dt_attr = ecma_ast.DotAccessor(fn_dt_prototype, fn._identifier)
+            fn_assign_expr = ecma_ast.Assign("=", fn_dt_attr, fn)
+            body_stmts.append(ecma_ast.ExprStatement(fn_assign_expr))
+
+        return body_stmts
@@ -2,8 +2,6 @@
 
 import textwrap
 
-from collections import defaultdict
-from collections import ChainMap
 from cobra.ast import SetOfNodes
 
 
@@ -18,6 +16,60 @@ def to_camel_case(snake_str):
     return components[0] + "".join(x.title() for x in components[1:])
 
 
+def node_classes(module, base) -> list:
+    """
+    Given a module and a base node class, returns
+    all node classes defined on the module.
+    """
+
+    return [obj for obj in vars(module).values()
+                if isinstance(obj, type) and issubclass(obj, base)]
+
+
+class DispatchTable(dict):
+    """
+    Mapping from node class to handler function of a visitor
+    class. Handlers are found by name (prefix + class name) only
+    once per node class; unknown classes are resolved on first
+    access and cached.
+    """
+
+    def __init__(self, owner, prefix, default=None, node_classes=()):
+        super().__init__()
+        self.owner = owner
+        self.prefix = prefix
+        self.default = default
+
+        for node_class in node_classes:
+            self[node_class] = self._resolve(node_class)
+
+    def _resolve(self, node_class):
+        return getattr(self.owner, self.prefix + node_class.__name__, self.default)
+
+    def __missing__(self, node_class):
+        handler = self[node_class] = self._resolve(node_class)
+        return handler
+
+
+class DispatchMeta(type):
+    """
+    Builds dispatch tables of a visitor class at class creation.
+
+    Visitor classes declares ``dispatch_tables`` as a mapping of
+    table attribute name to a (prefix, default method name) tuple
+    and ``dispatch_node_classes`` with known node classes. Tables
+    are rebuilt for each subclass, so overrides are honored.
+    """
+
+    def __init__(cls, name, bases, attrs):
+        super().__init__(name, bases, attrs)
+
+        for attr, (prefix, default_name) in cls.dispatch_tables.items():
+            default = getattr(cls, default_name) if default_name else None
+            table = DispatchTable(cls, prefix, default, cls.dispatch_node_classes)
+            setattr(cls, attr, table)
+
+
 class GenericStack(object):
     def __init__(self):
         self._data = []
@@ -34,79 +86,144 @@ class GenericStack(object):
         if len(self._data) == 0:
             raise ValueError("Stack is empty")
 
-        try:
-            return self._data[-1]
-        finally:
-            self._data = self._data[:-1]
+        return self._data.pop()
 
     def is_empty(self):
         return len(self._data) == 0
 
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self):
+        return iter(self._data)
+
 
 class LeveledStack(object):
+    """
+    Stack of translated childs per tree level.
+
+    Sets of nodes are flattened into the childs and None
+    values are dropped, so the number of nodes appended for
+    each child is kept too (see get_sizes).
+    """
+
     def __init__(self):
-        self.data = defaultdict(lambda: [])
+        self.data = [[]]
+        self.sizes = [[]]
         self.level = 0
 
     def inc_level(self):
         self.level += 1
+        self.data.append([])
+        self.sizes.append([])
 
     def dec_level(self):
-        del self.data[self.level]
-        self.level -= 1
-
-        if self.level < 0:
+        if self.level == 0:
             raise RuntimeError("invalid stack level")
 
+        self.data.pop()
+        self.sizes.pop()
+        self.level -= 1
+
     def append(self, value):
-        if type(value) == SetOfNodes:
-            self.data[self.level] += value
+        if value is None:
+            self.sizes[-1].append(0)
+        elif type(value) == SetOfNodes:
+            children = value.children()
+            self.data[-1] += children
+            self.sizes[-1].append(len(children))
         else:
-            self.data[self.level].append(value)
+            self.data[-1].append(value)
+            self.sizes[-1].append(1)
 
     def get_value(self):
-        return self.data[self.level]
+        return self.data[-1]
+
+    def get_sizes(self):
+        return self.sizes[-1]
 
 
 class ScopeStack(object):
+    """
+    Stack of lexical scopes. Each scope maps identifier
+    names to its ecma identifier nodes.
+
+    Besides of the scopes list, it keeps a counter of
+    scopes where each name is defined, so lookups and
+    special form conflicts are resolved in constant time.
+
+    Autogenerated names are allocated from per prefix
+    counters; each scope starts from its parent counters
+    so names of enclosing scopes are never reused.
+    """
+
     def __init__(self):
-        self.data = ChainMap({})
+        self.scopes = [{}]
+        self.counters = [{}]
+        self.visible = {}
         self.special_forms = {}
 
     def __contains__(self, key):
-        return key in self.data
+        return key in self.visible
 
     def set(self, key, value, special_form=False):
         if not special_form:
-            self.data[key] = value
+            if key in self.special_forms:
+                raise RuntimeError("Special form overwriten")
+
+            scope = self.scopes[-1]
+            if key not in scope:
+                self.visible[key] = self.visible.get(key, 0) + 1
+            scope[key] = value
         else:
-            self.special_forms[key] = value
+            if key in self.visible:
+                raise RuntimeError("Special form overwriten")
 
-        if not self.validate():
-            raise RuntimeError("Special form overwriten")
+            self.special_forms[key] = value
 
     def unset(self, key):
-        del self.data[key]
+        del self.scopes[-1][key]
+        self._forget(key)
 
     def is_empty(self):
-        return len(self.data) == 0
+        return len(self.visible) == 0
 
     def new_scope(self):
-        self.data = self.data.new_child()
+        self.scopes.append({})
+        self.counters.append(dict(self.counters[-1]))
 
     def drop_scope(self):
-        self.data = self.data.parents
+        for key in self.scopes.pop():
+            self._forget(key)
+        self.counters.pop()
+
+        if len(self.scopes) == 0:
+            self.scopes.append({})
+            self.counters.append({})
+
+    def next_name(self, prefix, reserved=()):
+        counters = self.counters[-1]
+        index = counters.get(prefix, 0)
+
+        candidate = "{}_{}".format(prefix, index)
+        while candidate in reserved or candidate in self.visible:
+            index += 1
+            candidate = "{}_{}".format(prefix, index)
+
+        counters[prefix] = index + 1
+        return candidate
+
+    def _forget(self, key):
+        counter = self.visible[key] - 1
+        if counter == 0:
+            del self.visible[key]
+        else:
+            self.visible[key] = counter
 
     def get_scope_identifiers(self, root=False):
-        first_level = self.data.maps[0] if len(self.data.maps) > 0 else {}
-        merged_stmts = list(first_level.values())
+        merged_stmts = list(self.scopes[-1].values())
 
         if root:
             merged_stmts = list(self.special_forms.values()) + merged_stmts
 
         return sorted(merged_stmts, key=lambda x: x.value)
-
-    def validate(self):
-        normal_scope = set(self.data.keys())
-        special_form_scope = set(self.special_forms.keys())
-        return len(normal_scope.intersection(special_form_scope)) == 0
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+import ast
+import os
+import sys
+import threading
+import time
+
+from . import base
+from . import compiler
+from . import utils
+
+
+POLL_INTERVAL = 0.5
+
+
+class Watcher(object):
+    """
+    Keeps the compiled state of a list of python files in
+    memory and recompiles only the files changed since the
+    last update.
+
+    Changes are detected polling file mtimes and sizes. In join
+    mode the parsed python tree of each file is kept and only
+    changed files are parsed again; otherwise the compiled code
+    of each file is kept and only changed files are compiled.
+    A join that fails to translate is reported as an error of
+    the file failing on its own (the first one if none does)
+    and the previous output is kept.
+    """
+
+    def __init__(self, paths:list, join=False, translate_options=None, compile_options=None,
+                 cache=None):
+        self.paths = list(paths)
+        self.join = join
+        self.translate_options = translate_options or {}
+        self.compile_options = compile_options or {}
+        self.cache = cache
+        self.errors = {}
+        self._stats = {}
+        self._trees = {}
+        self._outputs = {}
+        self._join_output = ""
+        self._join_error_path = None
+
+    def _stat(self, path:str):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def poll(self) -> list:
+        """
+        Returns the list of paths changed since the
+        previous poll (all of them on the first one).
+        """
+        changed = []
+        for path in self.paths:
+            stat = self._stat(path)
+            if path not in self._stats or self._stats[path] != stat:
+                self._stats[path] = stat
+                changed.append(path)
+        return changed
+
+    def update(self, paths:list):
+        for path in paths:
+            self.errors.pop(path, None)
+            self._trees.pop(path, None)
+            self._outputs.pop(path, None)
+
+            try:
+                data = base._read_file(path)
+                if self.join:
+                    self._trees[path] = base.parse(utils.normalize(data))
+                else:
+                    self._outputs[path] = base.compile(data, self.translate_options,
+                                                       self.compile_options, cache=self.cache)
+            except Exception as e:
+                self.errors[path] = base._format_error(e)
+
+    def output(self) -> str:
+        """
+        Returns the compiled code of all files, skipping
+        the ones that failed on the last update (in join mode,
+        the previous output if the join fails to translate).
+        """
+        if not self.join:
+            return "\n\n".join(self._outputs[path] for path in self.paths
+                               if path in self._outputs)
+
+        if self._join_error_path is not None:
+            self.errors.pop(self._join_error_path, None)
+            self._join_error_path = None
+
+        paths = [path for path in self.paths if path in self._trees]
+        body = []
+        for path in paths:
+            body.extend(self._trees[path].body)
+
+        try:
+            ecma_tree = base.translate(ast.Module(body=body), **self.translate_options)
+            self._join_output = compiler.ECMAVisitor(**self.compile_options).visit(ecma_tree)
+        except Exception as e:
+            self._join_error_path = self._find_failing_path(paths)
+            self.errors[self._join_error_path] = base._format_error(e)
+        return self._join_output
+
+    def _find_failing_path(self, paths:list) -> str:
+        for path in paths:
+            try:
+                base.translate(self._trees[path], **self.translate_options)
+            except Exception:
+                return path
+        return paths[0]
+
+
+def watch(poll, rebuild, interval:float=POLL_INTERVAL, stop:threading.Event=None,
+          log=None):
+    """
+    Run rebuild with the list of changed paths each time
+    poll returns some, until stop is set (or forever), and
+    report the latency of each rebuild into log.
+    """
+    if stop is None:
+        stop = threading.Event()
+
+    if log is None:
+        log = sys.stderr
+
+    while not stop.is_set():
+        changed = poll()
+        if changed:
+            started_at = time.perf_counter()
+            rebuild(changed)
+            elapsed = (time.perf_counter() - started_at) * 1000
+            log.write("rebuilt {} file(s) in {:.1f} ms\n".format(len(changed), elapsed))
+            log.flush()
+
+        stop.wait(interval)
@@ -5,7 +5,7 @@ from setuptools import setup
 setup(name='cobrascript',
       description='Python syntax translator to Javascript.',
       long_description='Python syntax translator to Javascript.',
-      version='0.1.2',
+      version='0.2.0',
       url='https://github.com/niwibe/cobrascript',
       license='BSD License',
       platforms=['unix', 'linux', 'osx', 'cygwin', 'win32'],
@@ -22,7 +22,9 @@ setup(name='cobrascript',
                    'Topic :: Software Development :: Libraries',
                    'Topic :: Utilities',
                    'Programming Language :: Python :: 3',
-                   'Programming Language :: Python :: 3.3',],
+                   'Programming Language :: Python :: 3.5',
+                   'Programming Language :: Python :: 3.6',],
+      python_requires='>=3.5',
       install_requires=[],
       packages=['cobra'],
       zip_safe=False)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+from cobra import aio
+from cobra import base
+from cobra.base import compile
+
+
+SOURCE = """
+def foo(a, b):
+    return [x + b for x in a]
+"""
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_compile_async():
+    assert _run(aio.compile_async(SOURCE)) == compile(SOURCE)
+    assert _run(aio.compile_many_async([SOURCE, "x = 1"], {"module_as_closure": True})) == \
+        [compile(SOURCE, {"module_as_closure": True}), compile("x = 1", {"module_as_closure": True})]
+
+
+def test_compile_async_with_process_executor():
+    compiler = aio.AsyncCompiler(ProcessPoolExecutor(max_workers=2))
+    try:
+        results = _run(compiler.compile_many(["x = {}".format(i) for i in range(4)]))
+    finally:
+        compiler.shutdown()
+    assert results == [compile("x = {}".format(i)) for i in range(4)]
+
+
+def test_compile_async_errors():
+    results = _run(aio.compile_many_async(["def foo(:", "x = 1"], return_exceptions=True))
+    assert isinstance(results[0], SyntaxError)
+    assert results[1] == compile("x = 1")
+
+
+def _slow_compile(calls, delay=0.1):
+    lock = threading.Lock()
+    compile = base.compile
+
+    def slow_compile(data, *args, **kwargs):
+        with lock:
+            calls.append(data)
+        time.sleep(delay)
+        return compile(data, *args, **kwargs)
+    return slow_compile
+
+
+def test_compile_async_single_flight(monkeypatch):
+    calls = []
+    monkeypatch.setattr(base, "compile", _slow_compile(calls))
+    compiler = aio.AsyncCompiler()
+
+    results = _run(compiler.compile_many([SOURCE] * 10 + ["x = 1"] * 10))
+    assert sorted(calls) == sorted([SOURCE, "x = 1"])
+    assert results == [compile(SOURCE)] * 10 + [compile("x = 1")] * 10
+
+
+def test_compile_async_backpressure(monkeypatch):
+    calls = []
+    monkeypatch.setattr(base, "compile", _slow_compile(calls))
+    compiler = aio.AsyncCompiler(max_pending=2)
+
+    async def check():
+        tasks = [asyncio.ensure_future(compiler.compile("x = {}".format(i))) for i in range(6)]
+        await asyncio.sleep(0.05)
+        assert len(calls) == 2
+        await asyncio.gather(*tasks)
+        assert len(calls) == 6
+
+    _run(check())
+
+
+def test_compile_async_cancellation(monkeypatch):
+    calls = []
+    monkeypatch.setattr(base, "compile", _slow_compile(calls))
+    compiler = aio.AsyncCompiler(max_pending=1)
+
+    async def check():
+        first = asyncio.ensure_future(compiler.compile("x = 1"))
+        second = asyncio.ensure_future(compiler.compile("x = 1"))
+        queued = asyncio.ensure_future(compiler.compile("y = 2"))
+        await asyncio.sleep(0.01)
+
+        # Cancelling one of the requests of a shared compilation
+        # does not affect the other one.
+        first.cancel()
+        # Cancelling the only request of a queued compilation
+        # cancels it before it reaches the executor.
+        queued.cancel()
+
+        assert await second == compile("x = 1")
+        await asyncio.sleep(0.2)
+        assert first.cancelled() and queued.cancelled()
+        assert calls == ["x = 1"]
+        assert compiler._inflight == {}
+
+    _run(check())
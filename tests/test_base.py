@@ -0,0 +1,483 @@
+# -*- coding: utf-8 -*-
+
+import ast
+import collections
+import io
+import json
+import os
+import signal
+import sys
+import threading
+import tracemalloc
+
+import pytest
+
+from cobra import ast as ecma_ast
+from cobra import base
+from cobra import cache as compile_cache
+from cobra import tracing
+from cobra.base import compile
+from cobra.base import parse
+from cobra.base import translate
+from cobra.base import _compile_files
+from cobra.base import main
+from cobra.base import CompileError
+from cobra.compiler import ECMAVisitor
+from cobra.translator import TranslateVisitor
+from .utils import norm
+
+
+SOURCE = """
+def foo(a, b):
+    for item in a:
+        console.log(item)
+    return a + b
+"""
+
+
+def test_compile_to_stream():
+    stream = io.StringIO()
+    assert compile(SOURCE, output=stream) is None
+    assert stream.getvalue() == compile(SOURCE)
+
+
+def test_compile_to_chunk_list():
+    chunks = []
+    compile(SOURCE, output=chunks)
+    assert len(chunks) > 1
+    assert "".join(chunks) == compile(SOURCE)
+
+
+def test_compile_files_to_stream(tmpdir):
+    path1 = tmpdir.join("file1.py")
+    path1.write("x = 2")
+    path2 = tmpdir.join("file2.py")
+    path2.write("y = 3")
+
+    paths = [str(path1), str(path2)]
+    stream = io.StringIO()
+    _compile_files(paths, output=stream)
+    assert stream.getvalue() == _compile_files(paths)
+    assert stream.getvalue() == norm("""
+    var x;
+    x = 2;
+
+    var y;
+    y = 3;
+    """)
+
+
+def _make_deep_chain(depth):
+    expr = ast.Name(id="a0", ctx=ast.Load())
+    for i in range(1, depth):
+        right = ast.Name(id="a{}".format(i), ctx=ast.Load())
+        expr = ast.BinOp(left=expr, op=ast.Add(), right=right)
+    return ast.Module(body=[ast.Expr(value=expr)])
+
+
+def test_translate_and_compile_very_deep_tree():
+    depth = 100000
+    assert depth > sys.getrecursionlimit()
+
+    ecma_tree = translate(_make_deep_chain(depth), debug=False)
+    result = ECMAVisitor().visit(ecma_tree)
+
+    assert result.startswith("(" * (depth - 2) + "a0 + a1) + a2)")
+    assert result.endswith(" + a{};".format(depth - 1))
+
+
+def test_visitor_subclass_overrides_are_dispatched():
+    class UpperCaseVisitor(ECMAVisitor):
+        def visit_Identifier(self, node):
+            self._write(node.value.upper())
+
+    ecma_tree = translate(parse("foo.bar(baz)"), debug=False)
+    assert ECMAVisitor().visit(ecma_tree) == "foo.bar(baz);"
+    assert UpperCaseVisitor().visit(ecma_tree) == "FOO.BAR(BAZ);"
+
+
+def test_visitor_subclass_returning_strings():
+    class StringVisitor(ECMAVisitor):
+        def visit_Identifier(self, node):
+            return node.value.upper()
+
+        def visit_DotAccessor(self, node):
+            return "{}['{}']".format(self.visit(node.node), node.identifier.value)
+
+    ecma_tree = translate(parse("foo.bar(baz)"), debug=False)
+    assert StringVisitor().visit(ecma_tree) == "FOO['bar'](BAZ);"
+
+
+def _translate_calls(statements):
+    source = "def func():\n" + "\n".join("    var_{0} = {0}".format(i)
+                                          for i in range(statements))
+    python_tree = parse(source)
+    calls = collections.Counter()
+
+    def profile(frame, event, arg):
+        calls[event] += 1
+
+    sys.setprofile(profile)
+    try:
+        translate(python_tree, debug=False)
+    finally:
+        sys.setprofile(None)
+    return calls["call"] + calls["c_call"]
+
+
+def test_translate_calls_grow_linearly_with_assignments():
+    # Wall clock scaling is measured by benchmarks/scaling.py;
+    # quadratic growth would be 10x more calls per assignment.
+    small = _translate_calls(500)
+    large = _translate_calls(5000)
+    assert (large / 5000) / (small / 500) < 1.1
+
+
+def test_translate_each_node_once_on_nested_comprehensions():
+    class CountingTranslateVisitor(TranslateVisitor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.translations = collections.Counter()
+
+        def _translate_node(self, node, childs):
+            self.translations[id(node)] += 1
+            return super()._translate_node(node, childs)
+
+    source = "x = [a for a in [b for b in [c for c in [d for d in [e for e in l if e] if d] if c] if b] if a]"
+    python_tree = parse(source)
+
+    visitor = CountingTranslateVisitor(debug=False)
+    visitor.translate(python_tree)
+
+    nodes = [node for node in ast.walk(python_tree)
+                if not isinstance(node, (ast.expr_context, ast.operator, ast.cmpop))]
+    assert len([node for node in nodes if isinstance(node, ast.ListComp)]) == 5
+    assert all(visitor.translations[id(node)] == 1 for node in nodes)
+
+
+def test_ecma_nodes_have_no_instance_dict():
+    for name, value in vars(ecma_ast).items():
+        if isinstance(value, type) and issubclass(value, ecma_ast.Node):
+            assert "__dict__" not in dir(value), name
+
+    # Only nodes holding a plain list of childs have its slot
+    assert not hasattr(ecma_ast.Identifier, "_children_list")
+    assert ecma_ast.Block([ecma_ast.Identifier("a")]).children()[0].value == "a"
+
+
+def test_ecma_node_children_iteration():
+    cls, arg1, arg2 = (ecma_ast.Identifier(name) for name in ("Cls", "a", "b"))
+    assert list(ecma_ast.NewExpr(cls, [arg1, None, arg2])) == [cls, arg1, arg2]
+
+    body = ecma_ast.Block([ecma_ast.Return(arg1)])
+    func_expr = ecma_ast.FuncExpr(None, [arg1], body)
+    assert func_expr.children() == [arg1, body]
+
+    assert list(ecma_ast.Return()) == []
+
+
+def test_disk_cache_hit_returns_compiled_code(tmpdir):
+    cache = compile_cache.DiskCache(str(tmpdir))
+    expected = compile(SOURCE)
+
+    assert compile(SOURCE, cache=cache) == expected
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    stream = io.StringIO()
+    compile("\n" + SOURCE + "\n", cache=cache, output=stream)
+    assert stream.getvalue() == expected
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_disk_cache_key_depends_on_options():
+    key = compile_cache.make_key(SOURCE)
+    assert key == compile_cache.make_key(SOURCE, {}, {})
+    assert key != compile_cache.make_key(SOURCE, {"module_as_closure": True})
+    assert key != compile_cache.make_key(SOURCE, None, {"indent_chars": 4})
+    assert key != compile_cache.make_key(SOURCE + "x = 1")
+
+
+def test_disk_cache_evicts_least_recently_used(tmpdir):
+    cache = compile_cache.DiskCache(str(tmpdir))
+    for i in range(4):
+        cache.set(str(i) * 64, "x = {};".format(i) * 100)
+        os.utime(cache._entry_path(str(i) * 64), (i, i))
+
+    cache.get("0" * 64)
+    cache.max_size = cache.size() - 1
+    cache.evict()
+
+    assert cache.get("0" * 64) is not None
+    assert cache.get("1" * 64) is None
+    assert cache.get("2" * 64) is not None
+
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+
+
+def test_disk_cache_overwrite_keeps_size(tmpdir):
+    cache = compile_cache.DiskCache(str(tmpdir))
+    for i in range(3):
+        cache.set("0" * 64, "x = {};".format(i) * 100)
+    assert cache._size == cache.size()
+
+    cache.max_size = cache.size() * 2
+    cache.set("1" * 64, "y = 1;" * 100)
+    cache.set("1" * 64, "y = 1;" * 100)
+    assert cache.get("0" * 64) is not None
+
+
+def test_cache_command_line(tmpdir, capsys):
+    cache_dir = str(tmpdir.join("cache"))
+    tmpdir.join("src", "module.py").write(SOURCE, ensure=True)
+
+    assert main(["cache", "warm", str(tmpdir.join("src")), "--cache-dir", cache_dir]) == 0
+    assert main(["cache", "stats", "--cache-dir", cache_dir]) == 0
+    assert "entries: 1" in capsys.readouterr()[0]
+
+    assert main(["cache", "clear", "--cache-dir", cache_dir]) == 0
+    assert compile_cache.DiskCache(cache_dir).stats()["entries"] == 0
+
+
+def test_memory_cache_hit_and_counters():
+    cache = compile_cache.MemoryCache()
+    expected = compile(SOURCE)
+
+    assert compile(SOURCE, cache=cache) == expected
+    assert compile(SOURCE, cache=cache) is compile(SOURCE, cache=cache)
+    assert compile(SOURCE, compile_options={"indent_chars": 4}, cache=cache) != expected
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 2, 2)
+
+
+def test_memory_cache_bounds():
+    cache = compile_cache.MemoryCache(max_entries=2, max_size=10)
+    cache.set("a", "1234")
+    cache.set("b", "1234")
+    cache.get("a")
+    cache.set("c", "1234")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1234"
+    assert cache.evictions == 1
+
+    cache.set("d", "12345678")
+    assert len(cache) == 1
+    assert cache.size() == 8
+    assert cache.evictions == 3
+
+    cache.set("e", "x" * 11)
+    assert cache.get("e") is None
+
+
+def test_memory_cache_is_thread_safe():
+    cache = compile_cache.MemoryCache(max_entries=8)
+
+    def worker(n):
+        for i in range(2000):
+            key = (n + i) % 16
+            if cache.get(key) is None:
+                cache.set(key, str(key))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats()
+    assert stats["entries"] == 8
+    assert stats["size"] == sum(len(value) for value in cache._data.values())
+    assert stats["hits"] + stats["misses"] == 8000
+
+
+def _write_modules(tmpdir, count):
+    paths = []
+    for i in range(count):
+        path = tmpdir.join("module{}.py".format(i))
+        path.write("def foo{0}(a):\n    return [x * {0} for x in a]\n".format(i))
+        paths.append(str(path))
+    return paths
+
+
+def test_compile_files_parallel_output_is_identical_to_serial(tmpdir):
+    paths = _write_modules(tmpdir, 6)
+    expected = _compile_files(paths)
+    assert _compile_files(paths, jobs=3) == expected
+
+    stream = io.StringIO()
+    _compile_files(paths, jobs=3, output=stream, cache=compile_cache.MemoryCache())
+    assert stream.getvalue() == expected
+
+
+def test_compile_files_parallel_reports_errors_per_file(tmpdir):
+    paths = _write_modules(tmpdir, 3)
+    broken = tmpdir.join("broken.py")
+    broken.write("def foo(:\n")
+    missing = str(tmpdir.join("missing.py"))
+    all_paths = paths[:1] + [str(broken)] + paths[1:] + [missing]
+
+    try:
+        _compile_files(all_paths, jobs=2)
+    except CompileError as e:
+        assert [path for path, message in e.errors] == [str(broken), missing]
+        assert e.errors[0][1].startswith("SyntaxError")
+        assert e.output == _compile_files(paths)
+    else:
+        assert False, "CompileError not raised"
+
+
+_compile_job = base._compile_job
+
+
+def _crashing_compile_job(data, translate_options, compile_options):
+    if data.startswith("# crash"):
+        os.kill(os.getpid(), signal.SIGKILL)
+    return _compile_job(data, translate_options, compile_options)
+
+
+def test_compile_files_parallel_survives_killed_workers(tmpdir, monkeypatch):
+    monkeypatch.setattr(base, "_compile_job", _crashing_compile_job)
+
+    paths = _write_modules(tmpdir, 12)
+    crashing = tmpdir.join("crashing.py")
+    crashing.write("# crash\nx = 1\n")
+    all_paths = paths[:5] + [str(crashing)] + paths[5:]
+
+    try:
+        _compile_files(all_paths, jobs=2)
+    except CompileError as e:
+        assert [path for path, message in e.errors] == [str(crashing)]
+        assert e.errors[0][1] == "RuntimeError: compile worker exited with code -9"
+        assert e.output == _compile_files(paths)
+    else:
+        assert False, "CompileError not raised"
+
+
+def test_compile_files_pipeline_writes_before_reading_all(tmpdir, monkeypatch):
+    paths = _write_modules(tmpdir, 20)
+    expected = _compile_files(paths)
+
+    reads = []
+    read_file = base._read_file
+    monkeypatch.setattr(base, "_read_file", lambda path: reads.append(path) or read_file(path))
+
+    class Output(io.StringIO):
+        reads_at_first_flush = None
+
+        def flush(self):
+            if self.reads_at_first_flush is None:
+                self.reads_at_first_flush = len(reads)
+
+    for jobs in (1, 2):
+        del reads[:]
+        output = Output()
+        _compile_files(paths, output=output, jobs=jobs)
+        assert output.getvalue() == expected
+        assert output.reads_at_first_flush <= jobs * 4 + 1
+
+
+def test_compile_stats():
+    result, stats = compile(SOURCE, stats=True)
+    assert result == compile(SOURCE)
+
+    assert list(stats["stages"]) == ["normalize", "parse", "translate", "emit"]
+    for stage in stats["stages"].values():
+        assert stage["wall_time"] >= 0 and stage["cpu_time"] >= 0
+        assert stage["peak_memory"] > 0
+    assert stats["total"]["wall_time"] == sum(stage["wall_time"]
+                                              for stage in stats["stages"].values())
+
+    assert stats["python_nodes"]["FunctionDef"] == 1
+    assert stats["python_nodes"]["Name"] == 6
+    assert stats["ecma_nodes"]["For"] == 1
+    assert stats["output_bytes"] == len(result.encode("utf-8"))
+
+    stream = io.StringIO()
+    assert compile(SOURCE, output=stream, stats=True)[0] is None
+    assert stream.getvalue() == result
+    json.dumps(stats)
+
+
+def test_compile_stats_times_are_not_traced(monkeypatch):
+    tracing = []
+
+    def _translate(*args, **kwargs):
+        tracing.append(tracemalloc.is_tracing())
+        return translate(*args, **kwargs)
+
+    monkeypatch.setattr(base, "translate", _translate)
+    result, stats = compile(SOURCE, stats=True)
+    assert result == compile(SOURCE)
+    assert tracing == [False, True, False]
+    assert stats["stages"]["translate"]["peak_memory"] > 0
+
+
+def test_stats_command_line(tmpdir, capsys):
+    path = tmpdir.join("module.py")
+    path.write(SOURCE)
+
+    assert main([str(path), "--stats"]) == 0
+    out, err = capsys.readouterr()
+    stats = json.loads(err)
+    assert stats["files"][0]["path"] == str(path)
+    assert stats["files"][0]["output_bytes"] == len(out.encode("utf-8")) - 1
+
+
+def test_translate_tracer_hooks():
+    events = []
+
+    class Tracer(tracing.Tracer):
+        def enter(self, node, timestamp):
+            events.append(("enter", node.__class__.__name__, timestamp))
+
+        def exit(self, node, timestamp, result):
+            events.append(("exit", node.__class__.__name__, timestamp))
+
+    tree = parse(SOURCE)
+    assert ECMAVisitor().visit(translate(tree, tracer=Tracer())) == compile(SOURCE)
+
+    nodes = list(ast.walk(tree))
+    assert len(events) == len(nodes) * 2
+    assert events[0][:2] == ("enter", "Module")
+    assert events[-1][:2] == ("exit", "Module")
+    assert [event[2] for event in events] == sorted(event[2] for event in events)
+
+
+def test_translate_debug_is_disabled_by_default(capsys):
+    translate(parse(SOURCE))
+    assert capsys.readouterr()[0] == ""
+
+    translate(parse(SOURCE), debug=True)
+    # The node repr depends on the python version
+    first_line = capsys.readouterr()[0].split("\n")[0]
+    assert first_line.strip().startswith("enter: <")
+    assert ".Module object at" in first_line
+
+
+def test_chrome_trace_command_line(tmpdir, capsys):
+    path = tmpdir.join("module.py")
+    path.write(SOURCE)
+    trace_path = str(tmpdir.join("trace.json"))
+
+    assert main([str(path), "--trace", trace_path]) == 0
+    with open(trace_path) as f:
+        trace = json.load(f)
+
+    events = trace["traceEvents"]
+    assert len(events) == len(list(ast.walk(parse(SOURCE)))) * 2
+    assert [event["ph"] for event in events[:2]] == ["B", "B"]
+    assert events[0]["name"] == "Module" and events[-1]["name"] == "Module"
+    assert events[1]["args"] == {"lineno": 1}
+
+
+def test_chrome_trace_can_not_be_used_with_stats(tmpdir, capsys):
+    path = tmpdir.join("module.py")
+    path.write(SOURCE)
+    trace_path = tmpdir.join("trace.json")
+
+    with pytest.raises(SystemExit):
+        main([str(path), "--stats", "--trace", str(trace_path)])
+    assert "--trace can not be used with --stats" in capsys.readouterr()[1]
+    assert not trace_path.exists()
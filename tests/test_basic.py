@@ -440,8 +440,8 @@ def test_basic_for():
     """
 
     expected = """
-    var item, ref_0, ref_1;
-    for (ref_0 = 0, ref_1 = [1,2,3,4,5]; ref_0 < ref_1.length; ref_0++) {
+    var _len_0, item, ref_0, ref_1;
+    for (ref_0 = 0, ref_1 = [1,2,3,4,5], _len_0 = ref_1.length; ref_0 < _len_0; ref_0++) {
         item = ref_1[ref_0];
         console.log(item);
     }
@@ -457,10 +457,10 @@ def test_nested_for():
     """
 
     expected = """
-    var item1, item2, ref_0, ref_1, ref_2, ref_3;
-    for (ref_2 = 0, ref_3 = [1,2,3,4,5]; ref_2 < ref_3.length; ref_2++) {
+    var _len_0, _len_1, item1, item2, ref_0, ref_1, ref_2, ref_3;
+    for (ref_2 = 0, ref_3 = [1,2,3,4,5], _len_1 = ref_3.length; ref_2 < _len_1; ref_2++) {
         item1 = ref_3[ref_2];
-        for (ref_0 = 0, ref_1 = [10,20,34]; ref_0 < ref_1.length; ref_0++) {
+        for (ref_0 = 0, ref_1 = [10,20,34], _len_0 = ref_1.length; ref_0 < _len_0; ref_0++) {
             item2 = ref_1[ref_0];
             console.log(item1, item2);
         }
@@ -470,6 +470,346 @@ def test_nested_for():
     assert compiled == norm(expected)
 
 
+def test_for_evaluates_iterable_once():
+    input = """
+    for item in fetch_items():
+        console.log(item)
+        console.log(item * 2)
+    """
+
+    expected = """
+    var _len_0, item, ref_0, ref_1;
+    for (ref_0 = 0, ref_1 = fetch_items(), _len_0 = ref_1.length; ref_0 < _len_0; ref_0++) {
+        item = ref_1[ref_0];
+        console.log(item);
+        console.log(item * 2);
+    }
+    """
+    compiled = compile(input)
+    assert compiled == norm(expected)
+    assert compiled.count("fetch_items()") == 1
+
+
+def test_for_break():
+    input = """
+    for item in items:
+        if item:
+            break
+        console.log(item)
+    """
+
+    expected = """
+    var _len_0, item, ref_0, ref_1;
+    for (ref_0 = 0, ref_1 = items, _len_0 = ref_1.length; ref_0 < _len_0; ref_0++) {
+        item = ref_1[ref_0];
+        if (item) {
+            break;
+        }
+        console.log(item);
+    }
+    """
+    assert compile(input) == norm(expected)
+
+
+def test_for_else():
+    input = """
+    for item in items:
+        console.log(item)
+    else:
+        console.log("done")
+    """
+
+    expected = """
+    var _len_0, item, ref_0, ref_1;
+    for (ref_0 = 0, ref_1 = items, _len_0 = ref_1.length; ref_0 < _len_0; ref_0++) {
+        item = ref_1[ref_0];
+        console.log(item);
+    }
+    console.log("done");
+    """
+    assert compile(input) == norm(expected)
+
+
+def test_for_else_break():
+    input = """
+    for item1 in items:
+        for item2 in item1:
+            while item2:
+                break
+            if item2:
+                break
+        else:
+            console.log("inner")
+        if item1:
+            break
+    else:
+        console.log("outer")
+    """
+
+    expected = """
+    var _len_0, _len_1, item1, item2, ref_0, ref_1, ref_2, ref_3;
+    _loop_0: {
+        for (ref_2 = 0, ref_3 = items, _len_1 = ref_3.length; ref_2 < _len_1; ref_2++) {
+            item1 = ref_3[ref_2];
+            _loop_1: {
+                for (ref_0 = 0, ref_1 = item1, _len_0 = ref_1.length; ref_0 < _len_0; ref_0++) {
+                    item2 = ref_1[ref_0];
+                    while (item2) {
+                        break;
+                    }
+                    if (item2) {
+                        break _loop_1;
+                    }
+                }
+                console.log("inner");
+            }
+            if (item1) {
+                break _loop_0;
+            }
+        }
+        console.log("outer");
+    }
+    """
+    assert compile(input) == norm(expected)
+
+
+def test_break_on_inner_for_else():
+    input = """
+    for item1 in items:
+        for item2 in item1:
+            console.log(item2)
+        else:
+            break
+    else:
+        console.log("outer")
+    """
+
+    expected = """
+    var _len_0, _len_1, item1, item2, ref_0, ref_1, ref_2, ref_3;
+    _loop_0: {
+        for (ref_2 = 0, ref_3 = items, _len_1 = ref_3.length; ref_2 < _len_1; ref_2++) {
+            item1 = ref_3[ref_2];
+            for (ref_0 = 0, ref_1 = item1, _len_0 = ref_1.length; ref_0 < _len_0; ref_0++) {
+                item2 = ref_1[ref_0];
+                console.log(item2);
+            }
+            break _loop_0;
+        }
+        console.log("outer");
+    }
+    """
+    assert compile(input) == norm(expected)
+
+
+def test_break_on_inner_while_else():
+    input = """
+    for item in items:
+        while item:
+            item = item.next
+        else:
+            break
+    else:
+        console.log("outer")
+    """
+
+    expected = """
+    var _len_0, item, ref_0, ref_1, ref_2;
+    _loop_0: {
+        for (ref_1 = 0, ref_2 = items, _len_0 = ref_2.length; ref_1 < _len_0; ref_1++) {
+            item = ref_2[ref_1];
+            ref_0 = true;
+            while (item) {
+                ref_0 = false;
+                item = item.next;
+            }
+            if (ref_0) {
+                break _loop_0;
+            }
+        }
+        console.log("outer");
+    }
+    """
+    assert compile(input) == norm(expected)
+
+
+def test_for_tuple_target():
+    input = """
+    for key, value in items:
+        console.log(key, value)
+    """
+
+    expected = """
+    var _len_0, _ref_0, key, ref_0, ref_1, value;
+    for (ref_0 = 0, ref_1 = items, _len_0 = ref_1.length; ref_0 < _len_0; ref_0++) {
+        _ref_0 = ref_1[ref_0];
+        key = _ref_0[0];
+        value = _ref_0[1];
+        console.log(key, value);
+    }
+    """
+    assert compile(input) == norm(expected)
+
+
+def test_for_body_with_multiple_and_empty_statements():
+    input = """
+    for item in items:
+        a, b = [item, 1]
+        del a, b
+    else:
+        pass
+
+    for item in items:
+        pass
+    else:
+        console.log("done")
+    """
+
+    expected = """
+    var _len_0, _len_1, _ref_0, a, b, item, ref_0, ref_1, ref_2, ref_3;
+    for (ref_0 = 0, ref_1 = items, _len_0 = ref_1.length; ref_0 < _len_0; ref_0++) {
+        item = ref_1[ref_0];
+        _ref_0 = [item,1];
+        a = _ref_0[0];
+        b = _ref_0[1];
+        delete a;
+        delete b;
+    }
+    for (ref_2 = 0, ref_3 = items, _len_1 = ref_3.length; ref_2 < _len_1; ref_2++) {
+        item = ref_3[ref_2];
+    }
+    console.log("done");
+    """
+    assert compile(input) == norm(expected)
+
+
+def test_nested_for_else():
+    input = """
+    for item1 in items:
+        for item2 in item1:
+            console.log(item2)
+        else:
+            console.log("inner")
+        console.log(item1)
+    """
+
+    expected = """
+    var _len_0, _len_1, item1, item2, ref_0, ref_1, ref_2, ref_3;
+    for (ref_2 = 0, ref_3 = items, _len_1 = ref_3.length; ref_2 < _len_1; ref_2++) {
+        item1 = ref_3[ref_2];
+        for (ref_0 = 0, ref_1 = item1, _len_0 = ref_1.length; ref_0 < _len_0; ref_0++) {
+            item2 = ref_1[ref_0];
+            console.log(item2);
+        }
+        console.log("inner");
+        console.log(item1);
+    }
+    """
+    assert compile(input) == norm(expected)
+
+
+def test_if_body_with_multiple_and_empty_statements():
+    input = """
+    if x:
+        pass
+    else:
+        del a, b
+    """
+
+    expected = """
+    var a, b;
+    if (x) {
+
+    } else {
+        delete a;
+        delete b;
+    }
+    """
+    assert compile(input) == norm(expected)
+
+
+def test_for_range():
+    input = """
+    for i in range(10):
+        console.log(i)
+    """
+
+    expected = """
+    var i, ref_0;
+    for (ref_0 = 0; ref_0 < 10; ref_0++) {
+        i = ref_0;
+        console.log(i);
+    }
+    """
+    assert compile(input) == norm(expected)
+
+
+def test_for_range_start_stop():
+    input = """
+    for i in range(start, get_stop()):
+        console.log(i)
+    """
+
+    expected = """
+    var _stop_0, i, ref_0;
+    for (ref_0 = start, _stop_0 = get_stop(); ref_0 < _stop_0; ref_0++) {
+        i = ref_0;
+        console.log(i);
+    }
+    """
+    assert compile(input) == norm(expected)
+
+
+def test_for_range_step():
+    input = """
+    for i in range(0, size, 2):
+        console.log(i)
+    for j in range(size, 0, -1):
+        console.log(j)
+    for k in range(10, 0, -3):
+        console.log(k)
+    """
+
+    expected = """
+    var _stop_0, i, j, k, ref_0, ref_1, ref_2;
+    for (ref_0 = 0, _stop_0 = size; ref_0 < _stop_0; ref_0 += 2) {
+        i = ref_0;
+        console.log(i);
+    }
+    for (ref_1 = size; ref_1 > 0; ref_1--) {
+        j = ref_1;
+        console.log(j);
+    }
+    for (ref_2 = 10; ref_2 > 0; ref_2 -= 3) {
+        k = ref_2;
+        console.log(k);
+    }
+    """
+    assert compile(input) == norm(expected)
+
+
+def test_for_range_not_specialized():
+    input = """
+    for i in range(0, size, step):
+        console.log(i)
+    """
+
+    expected = """
+    var _len_0, i, ref_0, ref_1;
+    for (ref_0 = 0, ref_1 = range(0, size, step), _len_0 = ref_1.length; ref_0 < _len_0; ref_0++) {
+        i = ref_1[ref_0];
+        console.log(i);
+    }
+    """
+    assert compile(input) == norm(expected)
+
+    input = """
+    range = get_range()
+    for i in range(10):
+        console.log(i)
+    """
+    assert "ref_1 = range(10)" in compile(input)
+
+
 def test_basic_while():
     input = """
     while True:
@@ -534,19 +874,80 @@ def test_basic_list_comprehensions():
 
     expected = """
     var _i_0, _len_0, _results_0, _values_0, count;
-    count = (function() {
+    _values_0 = [1,2,3,4];
+    _results_0 = [];
+    for (_i_0 = 0, _len_0 = _values_0.length; _i_0 < _len_0; _i_0++) {
+        _results_0.push(_values_0[_i_0])
+    }
+    count = _results_0;
+    """
+    compiled = compile(input)
+    print(compiled)
+    assert compiled == norm(expected)
+
+
+def test_range_list_comprehensions():
+    input = """
+    count = [num for num in range(1, size)]
+    """
+
+    expected = """
+    var _i_0, _results_0, _stop_0, count;
+    _results_0 = [];
+    for (_i_0 = 1, _stop_0 = size; _i_0 < _stop_0; _i_0++) {
+        _results_0.push(_i_0)
+    }
+    count = _results_0;
+    """
+    assert compile(input) == norm(expected)
+
+
+def test_returned_and_nested_list_comprehensions():
+    input = """
+    def evens(values):
+        return [num for num in [x for x in values] if num % 2 == 0]
+    """
+
+    expected = """
+    var evens;
+    evens = function(values) {
+        var _i_0, _i_1, _len_0, _len_1, _results_0, _results_1, _values_0, _values_1;
+        _values_0 = values;
+        _results_0 = [];
+        for (_i_0 = 0, _len_0 = _values_0.length; _i_0 < _len_0; _i_0++) {
+            _results_0.push(_values_0[_i_0])
+        }
+        _values_1 = _results_0;
+        _results_1 = [];
+        for (_i_1 = 0, _len_1 = _values_1.length; _i_1 < _len_1; _i_1++) {
+            if (num % 2 === 0) {
+                _results_1.push(_values_1[_i_1])
+            }
+        }
+        return _results_1;
+    };
+    """
+    assert compile(input) == norm(expected)
+
+
+def test_list_comprehensions_in_expressions():
+    input = """
+    console.log([num for num in values])
+    """
+
+    expected = """
+    var _i_0, _len_0, _results_0, _values_0;
+    console.log((function() {
         var _i_0, _len_0, _values_0, _results_0;
-        _values_0 = [1,2,3,4];
+        _values_0 = values;
         _results_0 = [];
         for (_i_0 = 0, _len_0 = _values_0.length; _i_0 < _len_0; _i_0++) {
             _results_0.push(_values_0[_i_0])
         }
         return _results_0;
-    })();
+    })());
     """
-    compiled = compile(input)
-    print(compiled)
-    assert compiled == norm(expected)
+    assert compile(input) == norm(expected)
 
 
 def test_exceptions_raise():
@@ -569,17 +970,14 @@ def test_conditional_list_comprehensions():
 
     expected = """
     var _i_0, _len_0, _results_0, _values_0, count;
-    count = (function() {
-        var _i_0, _len_0, _values_0, _results_0;
-        _values_0 = [1,2,3,4];
-        _results_0 = [];
-        for (_i_0 = 0, _len_0 = _values_0.length; _i_0 < _len_0; _i_0++) {
-            if (num !== 4) {
-                _results_0.push(_values_0[_i_0])
-            }
+    _values_0 = [1,2,3,4];
+    _results_0 = [];
+    for (_i_0 = 0, _len_0 = _values_0.length; _i_0 < _len_0; _i_0++) {
+        if (num !== 4) {
+            _results_0.push(_values_0[_i_0])
         }
-        return _results_0;
-    })();
+    }
+    count = _results_0;
     """
     compiled = compile(input)
     print(compiled)
@@ -593,17 +991,14 @@ def test_multiple_conditional_list_comprehensions():
 
     expected = """
     var _i_0, _len_0, _results_0, _values_0, count;
-    count = (function() {
-        var _i_0, _len_0, _values_0, _results_0;
-        _values_0 = [1,2,3,4];
-        _results_0 = [];
-        for (_i_0 = 0, _len_0 = _values_0.length; _i_0 < _len_0; _i_0++) {
-            if (num !== 4 && num !== 3) {
-                _results_0.push(_values_0[_i_0])
-            }
+    _values_0 = [1,2,3,4];
+    _results_0 = [];
+    for (_i_0 = 0, _len_0 = _values_0.length; _i_0 < _len_0; _i_0++) {
+        if (num !== 4 && num !== 3) {
+            _results_0.push(_values_0[_i_0])
         }
-        return _results_0;
-    })();
+    }
+    count = _results_0;
     """
     compiled = compile(input)
     print(compiled)
@@ -774,10 +1169,33 @@ def test_basic_class():
 
     expected = """
     var MyClass, foo;
+    MyClass = function(x) {
+        this.x = x;
+    };
+    MyClass.prototype.foo = function() {
+        return this.x;
+    };
+    """
+    compiled = compile(input)
+    print(compiled)
+    assert compiled == norm(expected)
+
+
+def test_class_with_class_level_statements():
+    input = """
+    class MyClass:
+        x = 1
+
+        def foo():
+            return this.x
+    """
+
+    expected = """
+    var MyClass, foo, x;
     MyClass = (function() {
         var classref_0;
-        classref_0 = function(x) {
-            this.x = x;
+        classref_0 = function() {
+
         };
         classref_0.prototype.foo = function() {
             return this.x;
@@ -785,9 +1203,7 @@ def test_basic_class():
         return classref_0;
     })();
     """
-    compiled = compile(input)
-    print(compiled)
-    assert compiled == norm(expected)
+    assert compile(input) == norm(expected)
 
 
 def test_simple_decorator():
@@ -934,3 +1350,22 @@ def test_multiple_assignation():
     compiled = compile(input)
     print(compiled)
     assert compiled == norm(expected)
+
+
+def test_unique_identifiers_skip_user_names():
+    input = """
+    for item in items:
+        console.log(item)
+    ref_0 = 1
+    """
+    expected = """
+    var _len_0, item, ref_0, ref_1, ref_2;
+    for (ref_1 = 0, ref_2 = items, _len_0 = ref_2.length; ref_1 < _len_0; ref_1++) {
+        item = ref_2[ref_1];
+        console.log(item);
+    }
+    ref_0 = 1;
+    """
+    compiled = compile(input)
+    print(compiled)
+    assert compiled == norm(expected)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+
+from cobra import batch
+from cobra.base import compile
+
+
+def _run(lines, **kwargs):
+    output = io.StringIO()
+    failed = batch.run(io.StringIO("\n".join(lines) + "\n"), output, **kwargs)
+    return failed, [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_batch_jobs_with_source_and_path(tmpdir):
+    path = tmpdir.join("module.py")
+    path.write("y = 2")
+
+    failed, results = _run([json.dumps({"id": 1, "source": "x = 1"}),
+                            json.dumps({"id": "b", "path": str(path),
+                                        "translate_options": {"module_as_closure": True}})])
+    assert failed == 0
+    assert [result["id"] for result in results] == [1, "b"]
+    assert results[0]["output"] == compile("x = 1")
+    assert results[1]["output"] == compile("y = 2", {"module_as_closure": True})
+    assert all(result["diagnostics"] == [] for result in results)
+    assert all(result["time"] >= 0 for result in results)
+
+
+def test_batch_default_options_are_overridden_by_jobs():
+    failed, results = _run([json.dumps({"id": 1, "source": "x = 1"}),
+                            json.dumps({"id": 2, "source": "x = 1",
+                                        "translate_options": {"module_as_closure": False}})],
+                           translate_options={"module_as_closure": True})
+    assert results[0]["output"] == compile("x = 1", {"module_as_closure": True})
+    assert results[1]["output"] == compile("x = 1", {"module_as_closure": False})
+
+
+def test_batch_diagnostics():
+    failed, results = _run([json.dumps({"id": 1, "source": "def foo(:"}),
+                            "not json",
+                            json.dumps({"id": 3}),
+                            json.dumps({"id": 4, "source": "x = 1"})])
+    assert failed == 3
+    assert results[0]["output"] is None
+    assert results[0]["diagnostics"][0]["type"] == "SyntaxError"
+    assert results[0]["diagnostics"][0]["line"] == 1
+    assert results[1]["id"] is None
+    assert results[2]["diagnostics"][0]["message"] == "job without source or path"
+    assert results[3]["output"] == compile("x = 1")
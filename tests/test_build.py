@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+
+from cobra import build
+from cobra.base import CompileError
+from cobra.base import compile
+from cobra.base import main
+
+
+def _write_tree(tmpdir):
+    src = tmpdir.mkdir("src")
+    src.join("a.py").write("x = 1")
+    src.mkdir("pkg").join("b.py").write("y = 2")
+    return src
+
+
+def _mtimes(outdir):
+    return {name: os.stat(os.path.join(outdir, name)).st_mtime_ns
+            for name in ("a.js", os.path.join("pkg", "b.js"))}
+
+
+def test_build_mirrors_input_tree(tmpdir):
+    src = _write_tree(tmpdir)
+    outdir = str(tmpdir.join("out"))
+
+    stats = build.build([str(src)], outdir)
+    assert stats == {"compiled": 2, "written": 2, "unchanged": 0, "skipped": 0}
+    assert tmpdir.join("out", "a.js").read() == compile("x = 1") + "\n"
+    assert tmpdir.join("out", "pkg", "b.js").read() == compile("y = 2") + "\n"
+
+    manifest = json.loads(tmpdir.join("out", build.MANIFEST_NAME).read())
+    entry = manifest["files"]["a.js"]
+    assert entry["source"] == "a.py"
+    assert entry["source_hash"] == build.hash_text("x = 1")
+    assert entry["options_hash"] == build.hash_options()
+    assert entry["output_hash"] == build.hash_text(compile("x = 1") + "\n")
+
+
+def test_build_skips_unchanged_sources(tmpdir):
+    src = _write_tree(tmpdir)
+    outdir = str(tmpdir.join("out"))
+    build.build([str(src)], outdir)
+    mtimes = _mtimes(outdir)
+
+    stats = build.build([str(src)], outdir)
+    assert stats == {"compiled": 0, "written": 0, "unchanged": 0, "skipped": 2}
+
+    src.join("a.py").write("x = 1\n\n")
+    stats = build.build([str(src)], outdir)
+    assert stats == {"compiled": 1, "written": 0, "unchanged": 1, "skipped": 1}
+    assert _mtimes(outdir) == mtimes
+
+    stats = build.build([str(src)], outdir, {"module_as_closure": True})
+    assert stats == {"compiled": 2, "written": 2, "unchanged": 0, "skipped": 0}
+
+
+def test_build_rebuilds_modified_outputs(tmpdir):
+    src = _write_tree(tmpdir)
+    outdir = str(tmpdir.join("out"))
+    build.build([str(src)], outdir)
+
+    output = tmpdir.join("out", "a.js")
+    expected = output.read()
+    output.write("")
+    stats = build.build([str(src)], outdir)
+    assert stats == {"compiled": 1, "written": 1, "unchanged": 0, "skipped": 1}
+    assert output.read() == expected
+
+    # Touched outputs with the same content are not rebuilt
+    output.setmtime(output.mtime() + 10)
+    stats = build.build([str(src)], outdir)
+    assert stats == {"compiled": 0, "written": 0, "unchanged": 0, "skipped": 2}
+
+
+def test_build_reports_failing_files(tmpdir):
+    src = _write_tree(tmpdir)
+    src.join("broken.py").write("def foo(:")
+    outdir = str(tmpdir.join("out"))
+
+    try:
+        build.build([str(src)], outdir, jobs=2)
+    except CompileError as e:
+        assert [path for path, message in e.errors] == [str(src.join("broken.py"))]
+    else:
+        assert False, "CompileError not raised"
+
+    assert tmpdir.join("out", "a.js").check()
+    assert not tmpdir.join("out", "broken.js").check()
+
+
+def test_build_command_line(tmpdir, capsys):
+    src = _write_tree(tmpdir)
+    outdir = str(tmpdir.join("out"))
+
+    assert main([str(src.join("a.py")), "--outdir", outdir, "--bare"]) == 0
+    assert "written: 1" in capsys.readouterr()[0]
+    assert tmpdir.join("out", "a.js").read() == compile("x = 1", {"module_as_closure": False}) + "\n"
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+from cobra import parallel
+from cobra.base import compile
+from cobra.base import main
+from cobra.utils import normalize
+from .utils import norm
+
+
+OPTIMIZE = {"optimize": True}
+
+
+def _expr(source):
+    return compile("x = " + source, OPTIMIZE).split("\n")[-1]
+
+
+def test_fold_arithmetic():
+    assert _expr("(1 + 2) * 3 - 4 / 8") == "x = 8.5;"
+    assert _expr("0.1 + 0.2") == "x = 0.30000000000000004;"
+    assert _expr("-(2 - 5)") == "x = 3;"
+    assert _expr("1e300 * 1e10") == "x = 1e+300 * 10000000000.0;"
+
+
+def test_fold_follows_javascript_semantics():
+    # Remainder has the sign of the dividend
+    assert _expr("-7 % 3") == "x = -1;"
+    # Bitwise operations on int32 values
+    assert _expr("1 << 40 | 3") == "x = 259;"
+    assert _expr("~5") == "x = -6;"
+    assert _expr("2 ** 31 | 0") == "x = -2147483648;"
+    # Strict equality
+    assert _expr("1 == 1.0") == "x = true;"
+    assert _expr("'1' == 1") == "x = false;"
+    # No literal for infinity
+    assert _expr("1 / 0") == "x = 1 / 0;"
+
+
+def test_fold_math_calls():
+    assert _expr("2 ** 10") == "x = 1024;"
+    assert _expr("7 // 2") == "x = 3;"
+    assert _expr("-7 // 2") == "x = -4;"
+    assert _expr("2 ** 0.5") == "x = Math.pow(2, 0.5);"
+    assert _expr("10 ** 20") == "x = Math.pow(10, 20);"
+    assert _expr("2 ** 3 + y") == "x = 8 + y;"
+
+
+def test_fold_strings():
+    assert _expr("'a' + 'b' + 1") == 'x = "ab1";'
+    assert _expr("'a' + 1.5") == 'x = "a1.5";'
+    assert _expr("'a' + 1e21") == 'x = "a" + 1e+21;'
+    assert _expr("'a' + y") == 'x = "a" + y;'
+
+
+def test_fold_boolean():
+    assert _expr("not 0") == "x = true;"
+    assert _expr("3 > 2 and 'yes'") == 'x = "yes";'
+    assert _expr("0 and y") == "x = 0;"
+    assert _expr("1 and y") == "x = y;"
+    assert _expr("0 or a < b") == "x = (a < b);"
+    assert _expr("y and 1 + 1") == "x = y && 2;"
+
+
+def test_fold_keeps_dot_accessor_objects():
+    assert _expr("(2 ** 3).toFixed(2)") == "x = Math.pow(2, 3).toFixed(2);"
+
+
+def test_optimize_is_disabled_by_default():
+    assert compile("x = 2 ** 10") == norm("""
+    var x;
+    x = Math.pow(2, 10);
+    """)
+
+
+def test_optimize_stats():
+    source = "x = 2 ** 10 + 3\ny = 'a' + 'b'\nz = 1 < 2"
+    result, stats = compile(source, OPTIMIZE, stats=True)
+    assert result == compile(source, OPTIMIZE)
+    assert list(stats["stages"]) == ["normalize", "parse", "translate", "optimize", "emit"]
+    assert stats["optimized_nodes"] == {"arithmetic": 1, "comparison": 1, "math": 1, "string": 1}
+
+    assert compile(source, stats=True)[1]["optimized_nodes"] == {}
+
+
+def test_optimize_parallel():
+    source = "\n".join("x{0} = [{0} * 2, 2 ** {0}]".format(i) for i in range(20))
+    options = dict(OPTIMIZE, debug=False)
+    assert parallel.compile_parallel(normalize(source), options, jobs=2,
+                                     min_chunk_statements=1) == compile(source, options)
+
+
+def test_optimize_command_line(tmpdir, capsys):
+    path = tmpdir.join("module.py")
+    path.write("x = 2 ** 10")
+
+    assert main([str(path), "-b", "-O"]) == 0
+    assert capsys.readouterr()[0] == "var x;\nx = 1024;\n"
+
+
+def test_eliminate_unreachable_statements():
+    source = """
+    def f(a):
+        while a:
+            break
+            a = 1
+        return a
+        a = 2
+    """
+    assert compile(source, OPTIMIZE) == norm("""
+    var f;
+    f = function(a) {
+        var a;
+        while (a) {
+            break;
+        }
+        return a;
+    };
+    """)
+
+
+def test_eliminate_constant_branches():
+    source = """
+    def f(a):
+        if False:
+            a = 3
+        elif 1:
+            a = 4
+        else:
+            a = 5
+        return a
+    """
+    assert compile(source, OPTIMIZE) == norm("""
+    var f;
+    f = function(a) {
+        var a;
+        a = 4;
+        return a;
+    };
+    """)
+
+
+def test_eliminate_unused_locals():
+    source = """
+    def f(a):
+        x = 1
+        z = a
+        def g():
+            return x
+        return len([i for i in a])
+    """
+    assert compile(source, OPTIMIZE) == norm("""
+    var f;
+    f = function(a) {
+        return len((function() {
+            var _i_0, _len_0, _values_0, _results_0;
+            _values_0 = a;
+            _results_0 = [];
+            for (_i_0 = 0, _len_0 = _values_0.length; _i_0 < _len_0; _i_0++) {
+                _results_0.push(_values_0[_i_0])
+            }
+            return _results_0;
+        })());
+    };
+    """)
+
+
+def test_eliminate_keeps_module_assignments():
+    source = "x = 1\ny = len([i for i in x])\nraise x\nz = 2"
+    for options in [OPTIMIZE, dict(OPTIMIZE, module_as_closure=True)]:
+        result = compile(source, options)
+        assert "var x, y, z;" in result
+        assert "x = 1;" in result
+        assert "z = 2;" in result
+
+
+def test_eliminate_keeps_locals_used_by_eval():
+    assert compile("def f(a):\n    x = 1\n    return eval('x')", OPTIMIZE) == norm("""
+    var f;
+    f = function(a) {
+        var x;
+        x = 1;
+        return eval("x");
+    };
+    """)
+
+
+def test_eliminate_stats():
+    source = "def f(a):\n    x = 1\n    return a\n    a = 2\nif 0:\n    f(1)"
+    result, stats = compile(source, OPTIMIZE, stats=True)
+    assert stats["optimized_nodes"] == {"constant_branch": 1, "unreachable": 1,
+                                        "unused_assignment": 1, "unused_declaration": 1}
+
+
+def test_eliminate_parallel():
+    source = "\n".join("def f{0}(a):\n    t = [i for i in a]\n    return a\n    a = {0}\n"
+                       "x{0} = [i for i in f{0}(x{0})]".format(i) for i in range(20))
+    for options in [dict(OPTIMIZE, debug=False), dict(OPTIMIZE, debug=False, module_as_closure=True)]:
+        assert parallel.compile_parallel(normalize(source), options, jobs=2,
+                                         min_chunk_statements=1) == compile(source, options)
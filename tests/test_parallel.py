@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+import ast
+
+from cobra import parallel
+from cobra.base import compile
+from cobra.utils import normalize
+
+
+def _make_module(size):
+    parts = ["import _global as g", "ref_1 = 3", "_i_2 = 1"]
+    for i in range(size):
+        parts.append("a{0}, b{0} = [1, 2]".format(i))
+        parts.append("for item in [1, 2]:\n    console.log(item)")
+        parts.append("x{0} = [y for y in a{0} if y > {0}]".format(i))
+        parts.append("def f{0}(a):\n"
+                     "    for z in a:\n"
+                     "        ref_5 = z\n"
+                     "    return [q for q in a]".format(i))
+        parts.append("class C{0}:\n"
+                     "    def __init__(self):\n"
+                     "        self.v = [r for r in x{0}]\n"
+                     "    def get_value(self):\n"
+                     "        return self.v".format(i))
+        if i == 3:
+            parts.append("import _new")
+    return "\n".join(parts)
+
+
+def test_split_module():
+    tree = ast.parse(_make_module(10))
+    chunks = parallel.split_module(tree, 4)
+    assert len(chunks) == 4
+    assert sum(chunks, []) == tree.body
+
+
+def test_compile_parallel_output_is_identical_to_serial():
+    source = _make_module(10)
+    for options in ({}, {"module_as_closure": True}, {"auto_camelcase": True}):
+        options = dict(options, debug=False)
+        expected = compile(source, options, {"indent_chars": 4})
+        assert parallel.compile_parallel(normalize(source), options, {"indent_chars": 4},
+                                         jobs=3, min_chunk_statements=1) == expected
+
+
+def test_compile_with_jobs():
+    source = _make_module(40)
+    options = {"module_as_closure": True, "debug": False}
+    assert compile(source, options, jobs=2) == compile(source, options)
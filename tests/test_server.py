@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+import os
+import signal
+import threading
+
+import pytest
+
+from cobra import base
+from cobra import server
+from cobra.base import compile
+from cobra.base import main
+
+
+SOURCE = """
+def foo(a, b):
+    return [x + b for x in a]
+"""
+
+
+_compile_job = base._compile_job
+
+
+def _crashing_compile_job(data, translate_options, compile_options):
+    if data == "crash":
+        os.kill(os.getpid(), signal.SIGKILL)
+    return _compile_job(data, translate_options, compile_options)
+
+
+@pytest.fixture
+def compile_server(tmpdir, monkeypatch):
+    # Workers are forked with the patched job
+    monkeypatch.setattr(base, "_compile_job", _crashing_compile_job)
+
+    path = str(tmpdir.join("cobrascript.sock"))
+    instance = server.CompileServer(path, jobs=2, timeout=5, max_size=1024)
+    thread = threading.Thread(target=instance.serve_forever)
+    thread.start()
+    try:
+        yield instance
+    finally:
+        instance.shutdown()
+        instance.server_close()
+        thread.join()
+
+
+def test_server_compiles_requests(compile_server):
+    with server.Client(compile_server.server_address) as client:
+        response = client.compile(SOURCE)
+        assert response["error"] is None
+        assert response["output"] == compile(SOURCE)
+
+        response = client.compile(SOURCE, {"module_as_closure": True}, {"indent_chars": 4})
+        assert response["output"] == compile(SOURCE, {"module_as_closure": True},
+                                             {"indent_chars": 4})
+
+        response = client.compile("def foo(:")
+        assert response["output"] is None
+        assert response["error"].startswith("SyntaxError")
+
+
+def test_server_handles_concurrent_clients(compile_server):
+    sources = ["x{0} = {0}".format(i) for i in range(8)]
+    results = {}
+
+    def worker(source):
+        with server.Client(compile_server.server_address) as client:
+            for i in range(5):
+                results[source] = client.compile(source)["output"]
+
+    threads = [threading.Thread(target=worker, args=(source,)) for source in sources]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {source: compile(source) for source in sources}
+
+    with server.Client(compile_server.server_address) as client:
+        metrics = client.metrics()
+    assert metrics["requests"] == 40
+    assert metrics["queue_depth"] == 0
+    assert metrics["cache_hit_rate"] == 32 / 40
+    assert metrics["latency_p50_ms"] <= metrics["latency_p99_ms"]
+
+
+def test_server_size_limit(compile_server):
+    with server.Client(compile_server.server_address) as client:
+        response = client.compile("x = 1\n" * 1024)
+    assert response["error"] == "request exceeds 1024 bytes"
+
+    with server.Client(compile_server.server_address) as client:
+        assert client.compile("x = 1")["error"] is None
+
+
+def test_server_time_limit(compile_server):
+    compile_server.timeout = 0.2
+    compile_server.max_size = 1024 * 1024
+    source = "".join("x{0} = {0}\n".format(i) for i in range(30000))
+
+    with server.Client(compile_server.server_address) as client:
+        response = client.compile(source)
+        assert response["error"].startswith("TimeoutError")
+        assert client.compile("x = 1")["output"] == compile("x = 1")
+
+
+def test_server_survives_killed_workers(compile_server):
+    compile_server.timeout = 1
+
+    with server.Client(compile_server.server_address) as client:
+        for i in range(3):
+            response = client.compile("crash")
+            assert response["output"] is None
+            assert response["error"].startswith("TimeoutError")
+            assert client.compile("x = {}".format(i))["output"] == compile("x = {}".format(i))
+
+
+def test_client_command_line(compile_server, tmpdir):
+    path = tmpdir.join("module.py")
+    path.write(SOURCE)
+    output = str(tmpdir.join("output.js"))
+
+    assert main([str(path), "--socket", compile_server.server_address, "-o", output]) == 0
+    assert tmpdir.join("output.js").read() == compile(SOURCE, {"module_as_closure": True},
+                                                     {"indent_chars": 2}) + "\n"
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import threading
+
+from cobra import base
+from cobra import watch
+from cobra.base import _compile_files
+
+
+def _write_files(tmpdir):
+    paths = []
+    for i in range(3):
+        path = tmpdir.join("module{}.py".format(i))
+        path.write("x{0} = {0}\ndef foo{0}(a):\n    return a + x{0}\n".format(i))
+        paths.append(str(path))
+    return paths
+
+
+def _touch(path, data):
+    with open(path, "w") as f:
+        f.write(data)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_watcher_recompiles_only_changed_files(tmpdir, monkeypatch):
+    paths = _write_files(tmpdir)
+    watcher = watch.Watcher(paths)
+    expected = [_compile_files([path]) for path in paths]
+
+    compiled = []
+    compile = base.compile
+    monkeypatch.setattr(base, "compile", lambda data, *args, **kwargs:
+                        compiled.append(data) or compile(data, *args, **kwargs))
+
+    watcher.update(watcher.poll())
+    assert len(compiled) == 3
+    assert watcher.output() == "\n\n".join(expected)
+    assert watcher.poll() == []
+
+    _touch(paths[1], "y = 2")
+    assert watcher.poll() == [paths[1]]
+    watcher.update([paths[1]])
+    assert compiled[3:] == ["y = 2"]
+    assert watcher.output() == "\n\n".join([expected[0], compile("y = 2"), expected[2]])
+
+
+def test_watcher_join_mode(tmpdir):
+    paths = _write_files(tmpdir)
+    watcher = watch.Watcher(paths, join=True, translate_options={"module_as_closure": True})
+    watcher.update(watcher.poll())
+    assert watcher.output() == _compile_files(paths, join=True,
+                                              translate_options={"module_as_closure": True})
+
+    _touch(paths[0], "def foo(:")
+    watcher.update(watcher.poll())
+    assert list(watcher.errors) == [paths[0]]
+    assert watcher.output() == _compile_files(paths[1:], join=True,
+                                              translate_options={"module_as_closure": True})
+
+
+def test_watcher_join_mode_translation_errors(tmpdir):
+    paths = _write_files(tmpdir)
+    watcher = watch.Watcher(paths, join=True)
+    watcher.update(watcher.poll())
+    expected = watcher.output()
+
+    _touch(paths[1], "y = [a for a in b for b in c]")
+    watcher.update(watcher.poll())
+    assert watcher.output() == expected
+    assert list(watcher.errors) == [paths[1]]
+    assert watcher.errors[paths[1]].startswith("RuntimeError")
+
+    _touch(paths[1], "y = 2")
+    watcher.update(watcher.poll())
+    assert watcher.output() == _compile_files(paths, join=True)
+    assert watcher.errors == {}
+
+
+def test_watch_loop_reports_rebuild_latency():
+    stop = threading.Event()
+    changes = [["a.py", "b.py"], []]
+    rebuilds = []
+    log = io.StringIO()
+
+    def poll():
+        if len(changes) == 1:
+            stop.set()
+        return changes.pop(0)
+
+    watch.watch(poll, rebuilds.append, interval=0, stop=stop, log=log)
+    assert rebuilds == [["a.py", "b.py"]]
+    assert log.getvalue().startswith("rebuilt 2 file(s) in ")